@@ -0,0 +1,9 @@
+import pytest
+
+from yatube.testing import temporary_cache
+
+
+@pytest.fixture(scope='session', autouse=True)
+def _temporary_cache():
+    with temporary_cache():
+        yield
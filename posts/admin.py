@@ -1,15 +1,82 @@
-from django.contrib import admin
+import datetime
 
-from .models import Group, Post
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import ORDER_VAR, PAGE_VAR
+from django.db.models import Sum
+
+from . import bulk, counters, search
+from .models import Group, Post, PostMonth
+from .paginator import EstimatedCountPaginator
 
 
 class PostAdmin(admin.ModelAdmin):
 
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
+    list_select_related = ("author", "group")
     search_fields = ('text',)
     list_filter = ("pub_date",)
+    # годы и месяцы берутся из PostMonth, см. post_month_hierarchy
+    date_hierarchy = "pub_date"
+    # без второго COUNT(*) по всей таблице на каждой странице
+    show_full_result_count = False
+    actions = ("delete_posts", "clear_group")
     empty_value_display = "-пусто-"
 
+    def get_actions(self, request):
+        actions = super().get_actions(request)
+        # стандартное удаление сохраняет посты по одному
+        actions.pop("delete_selected", None)
+        return actions
+
+    def get_paginator(self, request, queryset, per_page, orphans=0,
+                      allow_empty_first_page=True):
+        return EstimatedCountPaginator(
+            queryset, per_page, orphans, allow_empty_first_page,
+            estimate=lambda: self.estimate_count(request))
+
+    def estimate_count(self, request):
+        """Число постов из счётчиков, если фильтр позволяет."""
+        params = {key: value for key, value in request.GET.items()
+                  if key not in (ORDER_VAR, PAGE_VAR)}
+        if not params:
+            return counters.estimate_posts()
+        year = params.pop("pub_date__year", None)
+        month = params.pop("pub_date__month", None)
+        if params or not year:
+            return None
+        try:
+            months = PostMonth.objects.filter(month__year=int(year))
+            if month:
+                months = months.filter(
+                    month=datetime.date(int(year), int(month), 1))
+        except ValueError:
+            return None
+        return months.aggregate(total=Sum("posts_count"))["total"] or 0
+
+    def delete_posts(self, request, queryset):
+        deleted = bulk.delete_posts(queryset)
+        self.message_user(request, f"Удалено записей: {deleted}",
+                          messages.SUCCESS)
+    delete_posts.short_description = "Удалить выбранные записи"
+    delete_posts.allowed_permissions = ("delete",)
+
+    def clear_group(self, request, queryset):
+        updated = bulk.clear_group(queryset)
+        self.message_user(request, f"Убрано из групп: {updated}",
+                          messages.SUCCESS)
+    clear_group.short_description = "Убрать выбранные записи из групп"
+    clear_group.allowed_permissions = ("change",)
+
+    def get_search_results(self, request, queryset, search_term):
+        # вместо LIKE '%...%' по всей таблице — индекс FTS5
+        if not search_term or not search.is_available():
+            return super().get_search_results(request, queryset,
+                                              search_term)
+        if not search.match_query(search_term):
+            return queryset.none(), False
+        ids = search.matching_ids(search_term)
+        return queryset.filter(pk__in=ids), False
+
 
 class GroupAdmin(admin.ModelAdmin):
     list_display = ('title', 'slug', 'description')
@@ -0,0 +1,188 @@
+"""JSON API только для чтения: посты, группы, профили, комментарии.
+
+Строки выбираются через values() без создания моделей, списки
+листаются курсором (как ленты на сайте), а ?fields=id,text
+оставляет в ответе только нужные поля — и только их выбирает
+из базы. Ответы поддерживают ETag: для лент, профиля и комментариев
+он считается по состоянию из posts/conditional.py до выборки
+страницы, для списка групп — по содержимому ответа.
+
+Бюджет запросов к базе на один анонимный запрос
+(с сессией — ещё два: сессия и пользователь):
+
+* api_posts, api_group_posts, api_user_posts — 2
+  (состояние для ETag и страница; пустая страница группы
+  или автора — ещё один, проверка, что они есть);
+* api_comments — 2;
+* api_user — 2;
+* api_groups — 1.
+
+Тесты проверяют бюджет через QUERY_BUDGET.
+"""
+from functools import wraps
+
+from django.db.models import F
+from django.http import Http404, JsonResponse
+from django.middleware.http import ConditionalGetMiddleware
+from django.utils.decorators import decorator_from_middleware
+
+from . import conditional
+from .models import Comment, Group, Post, User
+from .paginator import CursorPaginator
+from .settings import API_PAGE_SIZE
+
+QUERY_BUDGET = {
+    "api_posts": 2,
+    "api_group_posts": 2,
+    "api_user_posts": 2,
+    "api_comments": 2,
+    "api_user": 2,
+    "api_groups": 1,
+}
+
+# поле ответа -> путь для values()
+POST_FIELDS = {
+    "id": "id",
+    "text": "text",
+    "pub_date": "pub_date",
+    "modified": "modified",
+    "author": "author__username",
+    "group": "group__slug",
+    "image": "image",
+    "comments_count": "comments_count",
+}
+COMMENT_FIELDS = {
+    "id": "id",
+    "post": "post_id",
+    "author": "author__username",
+    "text": "text",
+    "created": "created",
+}
+GROUP_FIELDS = {
+    "id": "id",
+    "slug": "slug",
+    "title": "title",
+    "description": "description",
+    "posts_count": "posts_count",
+}
+
+content_etag = decorator_from_middleware(ConditionalGetMiddleware)
+
+
+class ApiError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def api_view(view):
+    """Ошибки API отдаются в JSON, а не страницами сайта."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        try:
+            return view(request, *args, **kwargs)
+        except ApiError as error:
+            return JsonResponse({"error": str(error)}, status=error.status)
+        except Http404:
+            return JsonResponse({"error": "not found"}, status=404)
+    return wrapper
+
+
+def _fields(request, available):
+    """Поля из ?fields= в порядке запроса; по умолчанию все."""
+    raw = request.GET.get("fields")
+    if not raw:
+        return list(available)
+    names = list(dict.fromkeys(
+        name.strip() for name in raw.split(",") if name.strip()))
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ApiError(f"unknown fields: {', '.join(unknown)}; available: "
+                       f"{', '.join(available)}")
+    return names
+
+
+def _convert(name, value):
+    if name != "image":
+        return value
+    return Post._meta.get_field("image").storage.url(value) if value else None
+
+
+def _page(request, queryset, available, ordering):
+    """Страница values()-строк с курсором и только запрошенными полями."""
+    fields = _fields(request, available)
+    keys = {field.lstrip("-") for field in ordering}
+    lookups = {available[name] for name in fields} | keys
+    paginator = CursorPaginator(queryset.values(*lookups), API_PAGE_SIZE,
+                                ordering=ordering)
+    page = paginator.get_page(request.GET)
+    results = [{name: _convert(name, row[available[name]])
+                for name in fields} for row in page]
+    links = {}
+    for link, query in (("next", page.next_query),
+                        ("previous", page.previous_query)):
+        links[link] = f"{request.path}?{query}" if query else None
+    return page, {"results": results, **links}
+
+
+def _posts(request, queryset):
+    return _page(request, queryset, POST_FIELDS, ("-pub_date", "-id"))
+
+
+@conditional.conditional_page(conditional.index_state)
+@api_view
+def posts(request):
+    page, data = _posts(request, Post.objects.all())
+    return JsonResponse(data)
+
+
+@conditional.conditional_page(conditional.group_state)
+@api_view
+def group_posts(request, slug):
+    page, data = _posts(request, Post.objects.filter(group__slug=slug))
+    if not page and not Group.objects.filter(slug=slug).exists():
+        raise Http404
+    return JsonResponse(data)
+
+
+@conditional.conditional_page(conditional.profile_state)
+@api_view
+def user_posts(request, username):
+    page, data = _posts(request,
+                        Post.objects.filter(author__username=username))
+    if not page and not User.objects.filter(username=username).exists():
+        raise Http404
+    return JsonResponse(data)
+
+
+@conditional.conditional_page(conditional.post_id_state)
+@api_view
+def comments(request, post_id):
+    page, data = _page(request, Comment.objects.filter(post_id=post_id),
+                       COMMENT_FIELDS, ("created", "id"))
+    if not page and not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    return JsonResponse(data)
+
+
+@content_etag
+@api_view
+def groups(request):
+    page, data = _page(request, Group.objects.all(), GROUP_FIELDS, ("id",))
+    return JsonResponse(data)
+
+
+@conditional.conditional_page(conditional.profile_state)
+@api_view
+def user(request, username):
+    # статистики у автора без постов и подписок ещё может не быть
+    stats = {field: F(f"stats__{field}") for field in
+             ("posts_count", "followers_count", "following_count")}
+    row = (User.objects.filter(username=username)
+           .values("username", "first_name", "last_name")
+           .annotate(**stats).first())
+    if row is None:
+        raise Http404
+    for field in stats:
+        row[field] = row[field] or 0
+    return JsonResponse(row)
@@ -0,0 +1,15 @@
+from django.urls import path
+
+from . import api
+
+urlpatterns = [
+    path("posts/", api.posts, name="api_posts"),
+    path("posts/<int:post_id>/comments/", api.comments,
+         name="api_comments"),
+    path("groups/", api.groups, name="api_groups"),
+    path("groups/<slug:slug>/posts/", api.group_posts,
+         name="api_group_posts"),
+    path("users/<str:username>/", api.user, name="api_user"),
+    path("users/<str:username>/posts/", api.user_posts,
+         name="api_user_posts"),
+]
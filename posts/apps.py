@@ -1,8 +1,21 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 from django.utils.translation import gettext_lazy as _
 
 
+def install_search(sender, using, **kwargs):
+    # миграции, пересоздающие posts_post, удаляют триггеры поиска
+    from django.db import connections
+    from . import search
+    search.install(connections[using])
+
+
 class PostsConfig(AppConfig):
     name = 'posts'
     verbose_name = _('Посты')
+
+    def ready(self):
+        # подключаем обработчики сигналов счётчиков
+        from . import signals  # noqa: F401
+        post_migrate.connect(install_search, sender=self)
@@ -0,0 +1,86 @@
+"""Массовые операции над постами для админки.
+
+Django удаляет и меняет выбранные объекты по одному, чтобы отправить
+сигналы для каждого, — на тысячах постов это тысячи запросов.
+Здесь выборка обрабатывается несколькими UPDATE/DELETE по подзапросу,
+а счётчики и поколения кеша меняются сразу на всю группу постов.
+"""
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from . import counters, generations, sitemaps
+from .models import Comment, Post, ThumbnailJob, TimelineEntry
+
+
+def _count_by(queryset, field):
+    rows = queryset.order_by().values(field).annotate(total=Count("pk"))
+    return {row[field]: row["total"] for row in rows}
+
+
+def _bump(authors, groups):
+    scopes = {generations.GLOBAL_SCOPE}
+    scopes.update(generations.author_scope(pk) for pk in authors)
+    scopes.update(generations.group_scope(pk) for pk in groups
+                  if pk is not None)
+    transaction.on_commit(lambda: generations.bump(*scopes))
+
+
+def delete_posts(queryset):
+    """Удаляет посты выборки вместе с комментариями и записями лент.
+
+    Сигналы post_delete не отправляются: счётчики уменьшаются
+    по агрегатам выборки. Возвращает число удалённых постов.
+    """
+    with transaction.atomic():
+        posts = Post.objects.filter(pk__in=queryset.values("pk"))
+        authors = _count_by(posts, "author")
+        groups = _count_by(posts, "group")
+        months = counters.count_posts_by_month(posts)
+        sitemaps.bump_chunks(posts)
+        # _raw_delete — один DELETE без выборки объектов и сигналов
+        for model in (Comment, ThumbnailJob, TimelineEntry):
+            model.objects.filter(post__in=posts.values("pk"))._raw_delete(
+                model.objects.db)
+        posts._raw_delete(Post.objects.db)
+        for author_id, total in authors.items():
+            counters.change_author_posts(author_id, -total)
+        for group_id, total in groups.items():
+            counters.change_group_posts(group_id, -total)
+        for month, total in months.items():
+            counters.change_month_posts(month, -total)
+        _bump(authors, groups)
+    return sum(authors.values())
+
+
+def touch_posts(queryset):
+    """Новое modified у постов выборки одним UPDATE.
+
+    Для правок группы или автора, которые видны в карточках постов
+    (название и slug группы, имя пользователя), хотя сами посты
+    не меняются: карточки кешируются под modified поста.
+    """
+    with transaction.atomic():
+        posts = Post.objects.filter(pk__in=queryset.values("pk"))
+        authors = _count_by(posts, "author")
+        groups = _count_by(posts, "group")
+        sitemaps.bump_chunks(posts)
+        updated = posts.update(modified=timezone.now())
+        _bump(authors, groups)
+    return updated
+
+
+def clear_group(queryset):
+    """Убирает посты выборки из групп одним UPDATE."""
+    with transaction.atomic():
+        posts = Post.objects.filter(pk__in=queryset.values("pk"),
+                                    group__isnull=False)
+        authors = _count_by(posts, "author")
+        groups = _count_by(posts, "group")
+        sitemaps.bump_chunks(posts)
+        # modified входит в ключ кеша карточки поста
+        updated = posts.update(group=None, modified=timezone.now())
+        for group_id, total in groups.items():
+            counters.change_group_posts(group_id, -total)
+        _bump(authors, groups)
+    return updated
@@ -0,0 +1,84 @@
+"""Кеш отрендеренных карточек постов.
+
+Карточка (post_item.html) кешируется под ключом из id поста и времени
+его последнего изменения; вся страница достаётся одним get_many.
+Части, зависящие от зрителя (кнопка редактирования), в кеш не
+попадают: на их месте в карточке стоит метка, которая заменяется
+при каждом показе. Если карточки сами входят в общий для всех
+зрителей фрагмент, метка сохраняет автора и id поста, а кнопку
+вставляет fill_edit_slots уже после кеша фрагмента.
+"""
+import re
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import thumbnails
+from .models import Post
+
+EDIT_SLOT = mark_safe("<!-- post-edit-slot -->")
+POST_EDIT_SLOT = re.compile(r"<!-- post-edit-slot:(\d+):(\d+) -->")
+
+
+def card_key(post):
+    return f"post_card:{post.pk}:{post.modified.timestamp()}"
+
+
+def _viewer_id(user):
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def _fill_viewer(card, post, user):
+    button = ""
+    viewer = _viewer_id(user)
+    if viewer is not None and viewer == post.author_id:
+        button = render_to_string("post_edit_button.html", {"post": post})
+    return mark_safe(card.replace(EDIT_SLOT, button))
+
+
+def _mark_post(card, post):
+    return mark_safe(card.replace(
+        EDIT_SLOT, f"<!-- post-edit-slot:{post.author_id}:{post.pk} -->"))
+
+
+def fill_edit_slots(html, user):
+    """Вставляет кнопки редактирования в метки карточек своих постов
+    зрителя, остальные метки убирает."""
+    viewer = _viewer_id(user)
+
+    def button(match):
+        if viewer is None or int(match[1]) != viewer:
+            return ""
+        # автор поста — сам зритель, больше для кнопки ничего не нужно
+        post = Post(pk=int(match[2]), author=user)
+        return render_to_string("post_edit_button.html", {"post": post})
+
+    return mark_safe(POST_EDIT_SLOT.sub(button, html))
+
+
+def render_cards(posts, user=None, shared=False):
+    """Возвращает HTML карточек постов в порядке posts.
+
+    shared=True — для фрагмента, общего для всех зрителей: вместо
+    кнопки редактирования в карточке остаётся метка для
+    fill_edit_slots.
+    """
+    keys = [card_key(post) for post in posts]
+    cards = cache.get_many(keys)
+    # миниатюры нужны только карточкам, которых нет в кеше
+    thumbnails.prefetch([post for key, post in zip(keys, posts)
+                         if key not in cards])
+    missing = {
+        key: render_to_string("post_item.html",
+                              {"post": post, "edit_slot": EDIT_SLOT})
+        for key, post in zip(keys, posts) if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, timeout=None)
+        cards.update(missing)
+    if shared:
+        return [_mark_post(cards[key], post)
+                for key, post in zip(keys, posts)]
+    return [_fill_viewer(cards[key], post, user)
+            for key, post in zip(keys, posts)]
@@ -0,0 +1,102 @@
+"""Условные GET-запросы (ETag) для лент и поста.
+
+До выборки страницы и рендера одним индексным запросом находится
+время последнего изменения постов области. Вместе с поколением
+кеша области (оно меняется и при удалениях, подписках, правках
+группы и автора), зрителем и строкой запроса оно даёт ETag; если
+клиент прислал тот же ETag, отвечаем 304 Not Modified.
+
+Last-Modified не отдаётся: время изменения постов не меняется ни от
+удалений, ни от подписок, ни от входа зрителя, и клиент, который
+проверяет только If-Modified-Since, получал бы устаревшую страницу.
+"""
+import hashlib
+
+from django.db.models import Max
+from django.views.decorators.http import condition
+from django.views.decorators.vary import vary_on_cookie
+
+from . import generations
+from .models import Group, Post, User
+
+
+def _one(queryset):
+    """Строка выборки по уникальному ключу или None.
+
+    В отличие от first() — без ORDER BY: строка и так одна,
+    а сортировка сгруппированной выборки стоит временного B-дерева.
+    """
+    return next(iter(queryset.order_by()[:1]), None)
+
+
+def index_state(request):
+    latest = Post.objects.aggregate(latest=Max("modified"))["latest"]
+    return latest, generations.GLOBAL_SCOPE
+
+
+def group_state(request, slug):
+    group = _one(Group.objects.filter(slug=slug)
+                 .annotate(latest=Max("posts__modified"))
+                 .values("pk", "latest"))
+    if group is None:
+        return None
+    return group["latest"], generations.group_scope(group["pk"])
+
+
+def profile_state(request, username):
+    author = _one(User.objects.filter(username=username)
+                  .annotate(latest=Max("posts__modified"))
+                  .values("pk", "latest"))
+    if author is None:
+        return None
+    return author["latest"], generations.author_scope(author["pk"])
+
+
+def _post_state(**lookups):
+    post = _one(Post.objects.filter(**lookups)
+                .values("modified", "author_id"))
+    if post is None:
+        return None
+    return post["modified"], generations.author_scope(post["author_id"])
+
+
+def post_state(request, username, post_id):
+    return _post_state(pk=post_id, author__username=username)
+
+
+def post_id_state(request, post_id):
+    return _post_state(pk=post_id)
+
+
+def page_state(request, state, args, kwargs):
+    """Результат state для запроса; state вызывается один раз."""
+    if not hasattr(request, "_conditional_state"):
+        request._conditional_state = state(request, *args, **kwargs)
+    return request._conditional_state
+
+
+def _etag(request, state, args, kwargs):
+    """ETag страницы; None, если объекта нет."""
+    result = page_state(request, state, args, kwargs)
+    if result is None:
+        return None
+    latest, scope = result
+    viewer = (request.user.pk if request.user.is_authenticated
+              else "guest")
+    raw = (f"{latest}:{generations.get_generation(scope)}:"
+           f"{viewer}:{request.get_full_path()}")
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def conditional_page(state):
+    """Декоратор: 304 Not Modified, если страница не менялась.
+
+    state(request, *args, **kwargs) возвращает (время последнего
+    изменения, область кеша) или None, если объекта нет.
+    """
+    def etag(request, *args, **kwargs):
+        return _etag(request, state, args, kwargs)
+
+    def decorator(view):
+        return vary_on_cookie(condition(etag_func=etag)(view))
+    return decorator
@@ -0,0 +1,160 @@
+"""Денормализованные счётчики постов и комментариев.
+
+Счётчики меняются одним UPDATE ... SET n = n + 1, без чтения
+значения в Python, поэтому параллельные запросы не теряют изменений.
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, TruncMonth
+from django.utils import timezone
+
+from . import sitemaps
+from .models import (AuthorStats, Comment, Follow, Group, Post, PostMonth,
+                     User)
+
+
+def _shifted(field, delta):
+    # счётчик может отставать от данных (строки, созданные до его
+    # заполнения, удаления через _raw_delete): ниже нуля он не уходит,
+    # иначе CHECK >= 0 сорвал бы удаление; точные значения
+    # восстанавливает rebuild_counters
+    if delta < 0:
+        return Greatest(F(field) + delta, 0)
+    return F(field) + delta
+
+
+def _add(queryset, field, delta):
+    return queryset.update(**{field: _shifted(field, delta)})
+
+
+def change_group_posts(group_id, delta):
+    if group_id is not None:
+        _add(Group.objects.filter(pk=group_id), "posts_count", delta)
+
+
+def change_author_stats(user_id, field, delta):
+    updated = _add(AuthorStats.objects.filter(user_id=user_id), field, delta)
+    # строки статистики создаются лениво; при удалении автора
+    # её уже может не быть — тогда и создавать нечего
+    if not updated and delta > 0:
+        AuthorStats.objects.get_or_create(
+            user_id=user_id, defaults={field: delta})
+
+
+def change_author_posts(user_id, delta):
+    change_author_stats(user_id, "posts_count", delta)
+
+
+def change_follows(user_id, author_id, delta):
+    change_author_stats(author_id, "followers_count", delta)
+    change_author_stats(user_id, "following_count", delta)
+
+
+def post_month(pub_date):
+    """Месяц поста: первое число месяца по местному времени."""
+    return timezone.localtime(pub_date).date().replace(day=1)
+
+
+def change_month_posts(month, delta):
+    if _add(PostMonth.objects.filter(month=month), "posts_count", delta):
+        return
+    if delta > 0:
+        try:
+            with transaction.atomic():
+                PostMonth.objects.create(month=month, posts_count=delta)
+        except IntegrityError:
+            # строку месяца успел создать параллельный запрос
+            _add(PostMonth.objects.filter(month=month), "posts_count", delta)
+
+
+def change_post_comments(post_id, delta):
+    # счётчик виден на карточке поста, поэтому обновляем и modified
+    Post.objects.filter(pk=post_id).update(
+        comments_count=_shifted("comments_count", delta),
+        modified=timezone.now())
+    sitemaps.bump_posts([post_id])
+
+
+def _count(model, field, outer="pk"):
+    """Подзапрос: сколько строк model ссылаются на внешнюю строку."""
+    rows = (model.objects.filter(**{field: OuterRef(outer)})
+            .order_by().values(field)
+            .annotate(total=Count("pk")).values("total"))
+    return Coalesce(Subquery(rows), 0)
+
+
+# (модель, поле-счётчик, подзапрос с фактическим значением)
+COUNTERS = (
+    (Post, "comments_count", lambda: _count(Comment, "post")),
+    (Group, "posts_count", lambda: _count(Post, "group")),
+    (AuthorStats, "posts_count",
+     lambda: _count(Post, "author", outer="user_id")),
+    (AuthorStats, "followers_count",
+     lambda: _count(Follow, "author", outer="user_id")),
+    (AuthorStats, "following_count",
+     lambda: _count(Follow, "user", outer="user_id")),
+)
+
+
+def count_posts_by_month(queryset):
+    """{месяц: число постов} для выборки постов."""
+    rows = (queryset.order_by()
+            .annotate(month=TruncMonth("pub_date"))
+            .values("month").annotate(total=Count("pk")))
+    return {timezone.localtime(row["month"]).date(): row["total"]
+            for row in rows}
+
+
+def rebuild_months():
+    """Заново заполняет PostMonth по таблице постов."""
+    PostMonth.objects.all().delete()
+    months = count_posts_by_month(Post.objects.all())
+    PostMonth.objects.bulk_create(
+        [PostMonth(month=month, posts_count=total)
+         for month, total in months.items()], batch_size=1000)
+    return len(months)
+
+
+def estimate_posts():
+    """Число постов по счётчикам авторов, без COUNT(*) по постам."""
+    return (AuthorStats.objects.aggregate(total=Sum("posts_count"))["total"]
+            or 0)
+
+
+def create_missing_stats(batch_size=1000):
+    """Создаёт строки AuthorStats для авторов, у которых их ещё нет."""
+    missing = (User.objects.filter(stats__isnull=True)
+               .order_by("pk").values_list("pk", flat=True))
+    created, last = 0, 0
+    while True:
+        batch = list(missing.filter(pk__gt=last)[:batch_size])
+        if not batch:
+            return created
+        AuthorStats.objects.bulk_create(
+            [AuthorStats(user_id=user_id) for user_id in batch],
+            ignore_conflicts=True)
+        created += len(batch)
+        last = batch[-1]
+
+
+def _drifted(model, field, actual):
+    return (model.objects.annotate(actual=actual())
+            .exclude(**{field: F("actual")}))
+
+
+def find_drift():
+    """Возвращает {(модель, поле): число строк с неверным счётчиком}."""
+    return {(model.__name__, field): _drifted(model, field, actual).count()
+            for model, field, actual in COUNTERS}
+
+
+def rebuild_counters():
+    """Пересчитывает разошедшиеся счётчики set-based UPDATE'ами."""
+    updated = {}
+    for model, field, actual in COUNTERS:
+        drifted = _drifted(model, field, actual).values("pk")
+        updated[model.__name__, field] = (
+            model.objects.filter(pk__in=drifted)
+            .update(**{field: actual()})
+        )
+    return updated
@@ -0,0 +1,110 @@
+"""Потоковая выгрузка постов в JSONL или CSV.
+
+Строки берутся через values().iterator(): модели не создаются,
+а в памяти держится одна пачка строк курсора, сколько бы постов
+ни выгружалось. Поля — все поля Post; автор и группа выгружаются
+по имени пользователя и slug, поэтому файл JSONL или CSV можно
+снова загрузить через manage.py import_posts. По желанию поток
+сжимается gzip на лету.
+"""
+import csv
+import json
+import zlib
+
+from .models import Post
+
+FORMATS = {"jsonl": "application/x-ndjson", "csv": "text/csv"}
+# внешние ключи выгружаются естественными ключами
+NATURAL_KEYS = {"author": "username", "group": "slug"}
+ITERATOR_CHUNK_SIZE = 2000
+# строки склеиваются в блоки примерно такого размера
+BLOCK_SIZE = 64 * 1024
+
+
+def _lookups():
+    """{имя столбца: путь для values()} по полям модели Post."""
+    lookups = {}
+    for field in Post._meta.concrete_fields:
+        if field.is_relation:
+            lookups[field.name] = f"{field.name}__{NATURAL_KEYS[field.name]}"
+        else:
+            lookups[field.name] = field.name
+    return lookups
+
+
+FIELDS = tuple(_lookups())
+
+
+def rows(queryset):
+    """Словари постов выборки по порядку id, без создания моделей."""
+    lookups = _lookups()
+    values = (queryset.order_by("pk").values(*lookups.values())
+              .iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+    for row in values:
+        yield {name: row[lookup] for name, lookup in lookups.items()}
+
+
+def _isoformat(value):
+    # DjangoJSONEncoder обрезал бы время до миллисекунд
+    return value.isoformat()
+
+
+def _jsonl(rows):
+    for row in rows:
+        yield json.dumps(row, ensure_ascii=False, default=_isoformat) + "\n"
+
+
+class _Line:
+    """Файл для csv.writer, который просто возвращает записанное."""
+
+    def write(self, value):
+        return value
+
+
+def _cell(value):
+    if value is None:
+        return ""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return value
+
+
+def _csv(rows):
+    writer = csv.writer(_Line())
+    yield writer.writerow(FIELDS)
+    for row in rows:
+        yield writer.writerow([_cell(row[name]) for name in FIELDS])
+
+
+def _blocks(lines):
+    block, size = [], 0
+    for line in lines:
+        data = line.encode()
+        block.append(data)
+        size += len(data)
+        if size >= BLOCK_SIZE:
+            yield b"".join(block)
+            block, size = [], 0
+    if block:
+        yield b"".join(block)
+
+
+def _gzip(blocks):
+    # wbits=31 — формат gzip (заголовок и контрольная сумма)
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for block in blocks:
+        data = compressor.compress(block)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(queryset, file_format="jsonl", compress=False):
+    """Байты выгрузки блоками по ~BLOCK_SIZE."""
+    encode = _csv if file_format == "csv" else _jsonl
+    blocks = _blocks(encode(rows(queryset)))
+    return _gzip(blocks) if compress else blocks
+
+
+def filename(name, file_format, compress=False):
+    return f"{name}.{file_format}" + (".gz" if compress else "")
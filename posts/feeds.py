@@ -0,0 +1,121 @@
+"""RSS- и Atom-ленты: вся лента, группа и автор.
+
+Ленты опрашиваются роботами, поэтому ответ строится так же, как
+страницы лент: сначала одним запросом находится состояние области
+(posts/conditional.py) и, если клиент прислал тот же ETag,
+отдаётся 304. Иначе тело ленты берётся из кеша под ключом
+с поколением области: новое поколение начинают сигналы при
+изменении постов. Старые версии тела вытесняются по сроку
+FEED_CACHE_TIMEOUT.
+"""
+from django.contrib.syndication.views import Feed
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.text import Truncator
+
+from . import conditional, generations
+from .models import Group, Post, User
+from .settings import FEED_CACHE_TIMEOUT, FEED_ITEMS
+
+
+class PostsFeed(Feed):
+    title = "Yatube: новые записи"
+    description = "Последние записи всех авторов"
+
+    def link(self, obj=None):
+        return reverse("index")
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+    def items(self, obj=None):
+        return (self.posts(obj).for_list()
+                .order_by("-pub_date", "-id")[:FEED_ITEMS])
+
+    def item_title(self, item):
+        return Truncator(item.text).chars(60)
+
+    def item_description(self, item):
+        return item.text
+
+    def item_link(self, item):
+        return reverse("post", args=[item.author.username, item.pk])
+
+    def item_author_name(self, item):
+        return item.author.get_full_name() or item.author.username
+
+    def item_pubdate(self, item):
+        return item.pub_date
+
+    def item_updateddate(self, item):
+        return item.modified
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, obj):
+        return f"Yatube: {obj.title}"
+
+    def description(self, obj):
+        return obj.description
+
+    def link(self, obj):
+        return reverse("group_posts", args=[obj.slug])
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+class AuthorFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, obj):
+        return f"Yatube: записи {obj.username}"
+
+    def description(self, obj):
+        return f"Последние записи автора {obj.username}"
+
+    def link(self, obj):
+        return reverse("profile", args=[obj.username])
+
+    def posts(self, obj):
+        return obj.posts.all()
+
+
+def _atom(feed_class):
+    return type(f"Atom{feed_class.__name__}", (feed_class,),
+                {"feed_type": Atom1Feed, "subtitle": feed_class.description})
+
+
+def cached_feed(feed, state):
+    """Представление ленты с ETag и кешем тела."""
+    @conditional.conditional_page(state)
+    def view(request, *args, **kwargs):
+        result = conditional.page_state(request, state, args, kwargs)
+        if result is None:
+            # объекта нет — лента сама ответит 404
+            return feed(request, *args, **kwargs)
+        scope = result[1]
+        key = f"feed:{request.path}:{generations.get_generation(scope)}"
+        cached = cache.get(key)
+        if cached is None:
+            response = feed(request, *args, **kwargs)
+            cached = (response["Content-Type"], response.content)
+            cache.set(key, cached, timeout=FEED_CACHE_TIMEOUT)
+        content_type, content = cached
+        return HttpResponse(content, content_type=content_type)
+    return view
+
+
+posts_rss = cached_feed(PostsFeed(), conditional.index_state)
+posts_atom = cached_feed(_atom(PostsFeed)(), conditional.index_state)
+group_rss = cached_feed(GroupFeed(), conditional.group_state)
+group_atom = cached_feed(_atom(GroupFeed)(), conditional.group_state)
+author_rss = cached_feed(AuthorFeed(), conditional.profile_state)
+author_atom = cached_feed(_atom(AuthorFeed)(), conditional.profile_state)
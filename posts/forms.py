@@ -3,12 +3,14 @@ from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
 
 from .models import Comment, Group, Post
+from .uploads import PostImageField
 
 
 class PostForm(forms.ModelForm):
     class Meta:
         model = Post
         fields = ('text', 'group', 'image')
+        field_classes = {'image': PostImageField}
         labels = {
             'group': _('Вы можете выбрать группу'),
             'text': _('Напишите сообщение')
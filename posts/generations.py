@@ -0,0 +1,109 @@
+"""Поколения кеша.
+
+У каждой области (вся лента, группа, автор) есть счётчик поколения.
+Он входит в ключи закешированных фрагментов и увеличивается при
+сохранении и удалении постов и комментариев этой области, поэтому
+фрагменты хранятся без срока и устаревают ровно тогда, когда
+меняются их данные. Запросы, которые читают с реплик, добавляют
+к поколению эпоху реплик (yatube/replicas.py), но только для
+областей, изменённых после последнего обновления реплик: bump
+запоминает эпоху, при которой началось поколение.
+"""
+import time
+
+from django.core.cache import cache
+
+from yatube import replicas
+
+from .settings import FRAGMENT_LOCK_TIMEOUT
+
+GLOBAL_SCOPE = "global"
+
+
+def group_scope(group_id):
+    return f"group:{group_id}"
+
+
+def author_scope(user_id):
+    return f"author:{user_id}"
+
+
+def sitemap_scope(chunk):
+    return f"sitemap:{chunk}"
+
+
+def post_scopes(author_id, group_id=None):
+    """Области, которые затрагивает изменение поста."""
+    scopes = [GLOBAL_SCOPE, author_scope(author_id)]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def _key(scope):
+    return f"generation:{scope}"
+
+
+def _epoch_key(scope):
+    return f"generation:{scope}:epoch"
+
+
+def _initial():
+    # начинаем с текущего времени: если ключ вытеснят из кеша,
+    # новое поколение не совпадёт ни с одним из прежних
+    return int(time.time() * 1000)
+
+
+def get_generation(scope):
+    key = _key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _initial(), timeout=None)
+        generation = cache.get(key)
+    epoch = replicas.read_epoch()
+    if epoch is not None:
+        bumped = cache.get(_epoch_key(scope))
+        # реплика могла ещё не получить изменение, которое начало
+        # это поколение: копия эпохи bumped + 1 могла сниматься
+        # одновременно с ним, и только bumped + 2 его точно содержит
+        if bumped is not None and epoch <= bumped + 1:
+            return f"{generation}.{epoch}"
+    return generation
+
+
+def bump(*scopes):
+    """Начинает новое поколение для каждой из областей."""
+    epoch = replicas.epoch() if replicas.replicas() else None
+    for scope in scopes:
+        key = _key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial(), timeout=None)
+    if epoch is not None:
+        cache.set_many({_epoch_key(scope): epoch for scope in scopes},
+                       timeout=None)
+
+
+def single_flight(key, stale_key, render, timeout=None):
+    """Возвращает фрагмент, перестраивая его только в одном воркере.
+
+    Воркер, взявший блокировку, рендерит фрагмент и сохраняет его
+    под ключом поколения и под stale_key на timeout секунд (None —
+    без срока). Остальные тем временем отдают предыдущую версию
+    из stale_key, а если её нет — рендерят фрагмент сами, не
+    записывая его в кеш.
+    """
+    lock = f"{key}:lock"
+    if cache.add(lock, 1, timeout=FRAGMENT_LOCK_TIMEOUT):
+        try:
+            content = render()
+            cache.set_many({key: content, stale_key: content},
+                           timeout=timeout)
+        finally:
+            cache.delete(lock)
+        return content
+    stale = cache.get(stale_key)
+    if stale is not None:
+        return stale
+    return render()
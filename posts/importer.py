@@ -0,0 +1,318 @@
+"""Массовый импорт постов и комментариев (manage.py import_posts).
+
+Файл читается потоком по записи: JSONL — один пост на строку,
+комментарии во вложенном списке; CSV — столбцы author, text, group,
+pub_date, только посты. Авторы и группы ищутся по словарям в памяти,
+которые дополняются одним запросом на порцию. Каждая порция
+вставляется через bulk_create в своей транзакции, вместе с
+изменением счётчиков, месяцев и лент подписчиков: сигналы post_save
+при bulk_create не отправляются. Индекс поиска обновляют триггеры.
+
+После каждой порции номер последней записи пишется в файл
+контрольной точки, и прерванный импорт продолжается с него. Ещё до
+коммита порции в файл пишется её конец и id её последнего поста:
+если процесс упадёт между коммитом и записью контрольной точки, по
+этому посту видно, что порция уже вставлена, и повторно она не
+вставляется.
+
+Даты из файла записываются вторым запросом (bulk_update) по
+вставленным строкам: bulk_create ставит полям с auto_now_add текущее
+время, а выключать auto_now_add нельзя — поля общие для всего
+процесса, и посты, которые сохраняются параллельно, остались бы
+без даты.
+"""
+import csv
+import json
+import os
+import time
+from collections import Counter
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.db import connection, transaction
+from django.db.models import F, Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import counters, generations, sitemaps, timeline
+from .models import Comment, Group, Post, User
+
+# сколько переменных запроса уходит в один IN (...)
+LOOKUP_BATCH_SIZE = 500
+# сколько причин пропуска записей запоминается для отчёта
+MAX_ERRORS = 20
+
+
+class InvalidRecord(ValueError):
+    pass
+
+
+def detect_format(path):
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def read_records(file, file_format):
+    """Записи файла по одной; None — строка JSONL, которую не разобрать."""
+    if file_format == "csv":
+        yield from csv.DictReader(file)
+        return
+    for line in file:
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+def _datetime(value, default):
+    if not value:
+        return default
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise InvalidRecord(f"неверная дата {value!r}")
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def _text(record):
+    text = record.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise InvalidRecord("нет текста")
+    return text
+
+
+def _last_post_id():
+    """MAX(id) постов под блокировкой на запись до конца транзакции.
+
+    Без блокировки пост, созданный параллельно (new_post), мог бы
+    занять id, назначенный посту порции.
+    """
+    if connection.vendor == "sqlite":
+        # SQLite блокирует базу целиком: UPDATE без строк берёт
+        # блокировку на запись
+        Post.objects.filter(pk=0).update(text=F("text"))
+        return Post.objects.aggregate(last=Max("pk"))["last"] or 0
+    # остальные СУБД блокируют последнюю строку и промежуток за ней
+    return (Post.objects.select_for_update().order_by("-pk")
+            .values_list("pk", flat=True).first() or 0)
+
+
+class Importer:
+    """Импорт записей порциями с контрольной точкой.
+
+    create_missing — создавать неизвестных авторов (без пароля)
+    и группы; иначе запись с ними пропускается.
+    """
+
+    def __init__(self, source, checkpoint, chunk_size=1000,
+                 create_missing=False):
+        self.source = os.path.abspath(source)
+        self.checkpoint = checkpoint
+        self.chunk_size = chunk_size
+        self.create_missing = create_missing
+        self.authors = {}
+        self.groups = {}
+        self.done = 0
+        self.posts = self.comments = self.skipped = 0
+        self.errors = []
+
+    def load_checkpoint(self):
+        """Сколько записей файла уже импортировано."""
+        try:
+            with open(self.checkpoint) as file:
+                state = json.load(file)
+        except FileNotFoundError:
+            return 0
+        if state.get("source") != self.source:
+            raise ValueError(f"контрольная точка {self.checkpoint} "
+                             f"относится к файлу {state.get('source')}")
+        last_post = state.get("last_post")
+        if (last_post is not None
+                and Post.objects.filter(pk=last_post).exists()):
+            # порция закоммичена, а контрольная точка не дописана
+            return state["pending"]
+        return state["records"]
+
+    def save_checkpoint(self, pending=None, last_post=None):
+        """Пишет контрольную точку; pending и last_post — конец порции
+        в незакоммиченной транзакции и id её последнего поста."""
+        state = {"source": self.source, "records": self.done}
+        if last_post is not None:
+            state.update(pending=pending, last_post=last_post)
+        temporary = self.checkpoint + ".tmp"
+        with open(temporary, "w") as file:
+            json.dump(state, file)
+        os.replace(temporary, self.checkpoint)
+
+    def _lookup(self, model, field, values, known):
+        values = list(values - known.keys())
+        for start in range(0, len(values), LOOKUP_BATCH_SIZE):
+            batch = values[start:start + LOOKUP_BATCH_SIZE]
+            known.update(model.objects.filter(**{f"{field}__in": batch})
+                         .values_list(field, "pk"))
+        return {value for value in values if value not in known}
+
+    def _resolve(self, records):
+        """Дополняет словари авторов и групп для порции."""
+        usernames, slugs = set(), set()
+        for record in records:
+            if not isinstance(record, dict):
+                continue
+            comments = record.get("comments")
+            for item in [record] + (comments if isinstance(comments, list)
+                                    else []):
+                if isinstance(item, dict) and item.get("author"):
+                    usernames.add(item["author"])
+            if record.get("group"):
+                slugs.add(record["group"])
+        missing_users = self._lookup(User, "username", usernames,
+                                     self.authors)
+        missing_groups = self._lookup(Group, "slug", slugs, self.groups)
+        if not self.create_missing:
+            return
+        slug_length = Group._meta.get_field("slug").max_length
+        missing_groups = {slug for slug in missing_groups
+                          if len(slug) <= slug_length}
+        if missing_users:
+            password = make_password(None)
+            User.objects.bulk_create(
+                [User(username=username, password=password)
+                 for username in missing_users])
+            self._lookup(User, "username", missing_users, self.authors)
+        if missing_groups:
+            Group.objects.bulk_create(
+                [Group(title=slug, slug=slug) for slug in missing_groups])
+            self._lookup(Group, "slug", missing_groups, self.groups)
+
+    def _author(self, item):
+        author_id = self.authors.get(item.get("author"))
+        if author_id is None:
+            raise InvalidRecord(f"неизвестный автор {item.get('author')!r}")
+        return author_id
+
+    def _build(self, record, now):
+        if not isinstance(record, dict):
+            raise InvalidRecord("запись не разобрана")
+        group_id = None
+        if record.get("group"):
+            group_id = self.groups.get(record["group"])
+            if group_id is None:
+                raise InvalidRecord(
+                    f"неизвестная группа {record['group']!r}")
+        post = Post(text=_text(record), author_id=self._author(record),
+                    group_id=group_id,
+                    pub_date=_datetime(record.get("pub_date"), now))
+        comments = [
+            Comment(author_id=self._author(item), text=_text(item),
+                    created=_datetime(item.get("created"), now))
+            for item in record.get("comments") or []
+        ]
+        post.comments_count = len(comments)
+        return post, comments
+
+    def _skip(self, number, error):
+        self.skipped += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append((number, str(error)))
+
+    def _insert(self, chunk):
+        """Вставляет порцию (номер записи, запись) одной транзакцией."""
+        now = timezone.now()
+        with transaction.atomic():
+            # id вставленных строк bulk_create возвращает только
+            # на PostgreSQL; на остальных СУБД назначаем их сами
+            last = (None if connection.vendor == "postgresql"
+                    else _last_post_id())
+            self._resolve([record for number, record in chunk])
+            built = []
+            for number, record in chunk:
+                try:
+                    built.append(self._build(record, now))
+                except (ValueError, AttributeError, TypeError) as error:
+                    self._skip(number, error)
+            if not built:
+                return
+            posts = [post for post, comments in built]
+            self._insert_posts(posts, last)
+            for post, comments in built:
+                for comment in comments:
+                    comment.post_id = post.pk
+            self._insert_comments(
+                [comment for post, comments in built for comment in comments])
+            self._count(posts)
+            self.posts += len(posts)
+            self.comments += sum(len(comments) for post, comments in built)
+            self.save_checkpoint(pending=chunk[-1][0], last_post=posts[-1].pk)
+
+    def _insert_posts(self, posts, last):
+        if last is not None:
+            for offset, post in enumerate(posts, 1):
+                post.pk = last + offset
+        # bulk_create затрёт даты полей auto_now_add
+        pub_dates = [post.pub_date for post in posts]
+        Post.objects.bulk_create(posts)
+        for post, pub_date in zip(posts, pub_dates):
+            post.pub_date = pub_date
+        Post.objects.bulk_update(posts, ["pub_date"])
+
+    def _insert_comments(self, comments):
+        if not comments:
+            return
+        created = [comment.created for comment in comments]
+        Comment.objects.bulk_create(comments)
+        if comments[0].pk is None:
+            # посты порции новые, других комментариев у них нет,
+            # а id идут в порядке вставки
+            ids = (Comment.objects
+                   .filter(post_id__gte=comments[0].post_id,
+                           post_id__lte=comments[-1].post_id)
+                   .order_by("pk").values_list("pk", flat=True))
+            for comment, pk in zip(comments, ids):
+                comment.pk = pk
+        for comment, value in zip(comments, created):
+            comment.created = value
+        Comment.objects.bulk_update(comments, ["created"])
+
+    def _count(self, posts):
+        authors = Counter(post.author_id for post in posts)
+        groups = Counter(post.group_id for post in posts
+                         if post.group_id is not None)
+        months = Counter(counters.post_month(post.pub_date)
+                         for post in posts)
+        for author_id, total in authors.items():
+            counters.change_author_posts(author_id, total)
+            timeline.fan_out_posts(
+                author_id, [post for post in posts
+                            if post.author_id == author_id])
+        for group_id, total in groups.items():
+            counters.change_group_posts(group_id, total)
+        for month, total in months.items():
+            counters.change_month_posts(month, total)
+        scopes = {generations.GLOBAL_SCOPE}
+        scopes.update(generations.author_scope(pk) for pk in authors)
+        scopes.update(generations.group_scope(pk) for pk in groups)
+        scopes.update(sitemaps.chunk_scopes(posts[0].pk, posts[-1].pk))
+        transaction.on_commit(lambda: generations.bump(*scopes))
+
+    def run(self, records, progress=None):
+        """Импортирует записи, пропуская уже импортированные.
+
+        progress(importer, секунды) вызывается после каждой порции.
+        """
+        self.done = self.load_checkpoint()
+        started = time.monotonic()
+        numbered = enumerate(islice(records, self.done, None), self.done + 1)
+        while True:
+            chunk = list(islice(numbered, self.chunk_size))
+            if not chunk:
+                break
+            self._insert(chunk)
+            self.done = chunk[-1][0]
+            self.save_checkpoint()
+            if progress is not None:
+                progress(self, time.monotonic() - started)
+        if os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        return time.monotonic() - started
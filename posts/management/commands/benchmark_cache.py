@@ -0,0 +1,76 @@
+import os
+import tempfile
+import time
+
+from django.core.cache.backends.db import DatabaseCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from yatube.sqlite_cache import SQLiteCache
+
+BENCH_TABLE = "benchmark_cache_table"
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает скорость LocMemCache, DatabaseCache и "
+            "SQLiteCache на операциях, которые делает сайт.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keys", type=int, default=2000,
+                            help="Сколько ключей писать и читать.")
+        parser.add_argument("--batch", type=int, default=10,
+                            help="Размер пачки get_many (постов на "
+                                 "странице).")
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        call_command("createcachetable", BENCH_TABLE, verbosity=0)
+        backends = {
+            "locmem": LocMemCache("benchmark", {}),
+            "db": DatabaseCache(BENCH_TABLE, {}),
+            "sqlite": SQLiteCache(
+                os.path.join(directory, "cache.sqlite3"), {}),
+        }
+        try:
+            for name, cache in backends.items():
+                cache._max_entries = options["keys"] * 2
+                self.run(name, cache, options["keys"], options["batch"])
+        finally:
+            with connection.schema_editor() as editor:
+                editor.execute(f"DROP TABLE {editor.quote_name(BENCH_TABLE)}")
+            for name in os.listdir(directory):
+                os.remove(os.path.join(directory, name))
+            os.rmdir(directory)
+
+    def run(self, name, cache, keys_count, batch):
+        keys = [f"post_card:{i}" for i in range(keys_count)]
+        value = "<div class='card'>" + "x" * 2000 + "</div>"
+        cache.clear()
+        results = {}
+
+        start = time.perf_counter()
+        for key in keys:
+            cache.set(key, value)
+        results["set"] = keys_count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for key in keys:
+            cache.get(key)
+        results["get"] = keys_count / (time.perf_counter() - start)
+
+        start = time.perf_counter()
+        for i in range(0, keys_count, batch):
+            cache.get_many(keys[i:i + batch])
+        results["get_many"] = keys_count / (time.perf_counter() - start)
+
+        cache.set("generation", 0)
+        start = time.perf_counter()
+        for _ in range(keys_count):
+            cache.incr("generation")
+        results["incr"] = keys_count / (time.perf_counter() - start)
+
+        cache.clear()
+        line = ", ".join(f"{op} {rate:,.0f}/с" for op, rate in results.items())
+        self.stdout.write(f"{name:>7}: {line}")
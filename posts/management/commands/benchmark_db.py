@@ -0,0 +1,123 @@
+import argparse
+import json
+import logging
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, close_old_connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+BENCH_USER = "benchmark"
+PROFILES = ("default", "production")
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает профили базы (обычный SQLite и DB_PROFILE="
+            "production) под смешанной нагрузкой new_post/index "
+            "из нескольких процессов.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=4,
+                            help="Сколько процессов шлют запросы.")
+        parser.add_argument("--seconds", type=float, default=10,
+                            help="Длительность прогона каждого профиля.")
+        parser.add_argument("--write-ratio", type=float, default=0.2,
+                            help="Доля запросов new_post.")
+        parser.add_argument("--posts", type=int, default=200,
+                            help="Сколько постов создать перед прогоном.")
+        # внутренние режимы дочерних процессов
+        parser.add_argument("--setup", action="store_true",
+                            help=argparse.SUPPRESS)
+        parser.add_argument("--worker", action="store_true",
+                            help=argparse.SUPPRESS)
+        parser.add_argument("--cache", help=argparse.SUPPRESS)
+
+    def handle(self, *args, **options):
+        if options["setup"]:
+            return self.setup(options["posts"])
+        if options["worker"]:
+            return self.work(options)
+        directory = tempfile.mkdtemp()
+        try:
+            for profile in PROFILES:
+                self.bench(profile, directory, options)
+        finally:
+            shutil.rmtree(directory)
+
+    def bench(self, profile, directory, options):
+        # каждый профиль — в своей базе и своём кеше, настройки
+        # профиля дочерние процессы получают из окружения
+        env = dict(os.environ, DB_PROFILE=profile, DB_REPLICAS="0",
+                   DB_PATH=os.path.join(directory, f"{profile}.sqlite3"))
+        command = [sys.executable,
+                   os.path.join(settings.BASE_DIR, "manage.py"),
+                   "benchmark_db"]
+        subprocess.run(command + ["--setup", "--posts",
+                                  str(options["posts"])],
+                       env=env, check=True)
+        workers = [
+            subprocess.Popen(
+                command + ["--worker",
+                           "--seconds", str(options["seconds"]),
+                           "--write-ratio", str(options["write_ratio"]),
+                           "--cache", os.path.join(
+                               directory, f"{profile}-cache.sqlite3")],
+                env=env, stdout=subprocess.PIPE)
+            for _ in range(options["workers"])
+        ]
+        totals = Counter()
+        for worker in workers:
+            output = worker.communicate()[0].decode().strip()
+            totals.update(json.loads(output.splitlines()[-1]))
+        seconds = options["seconds"]
+        self.stdout.write(
+            f"{profile:>10}: "
+            f"index {totals['reads'] / seconds:8.1f}/с, "
+            f"new_post {totals['writes'] / seconds:7.1f}/с, "
+            f"всего {(totals['reads'] + totals['writes']) / seconds:8.1f}/с, "
+            f"ошибок «database is locked»: {totals['errors']}")
+
+    def setup(self, posts):
+        call_command("migrate", verbosity=0)
+        author = User.objects.create_user(username=BENCH_USER)
+        Post.objects.bulk_create(
+            [Post(text=f"Пост {i}", author=author) for i in range(posts)])
+
+    def work(self, options):
+        cache = {"default": {"BACKEND": "yatube.sqlite_cache.SQLiteCache",
+                             "LOCATION": options["cache"]}}
+        counts = Counter(reads=0, writes=0, errors=0)
+        # ошибки считаются, трассировки каждой не нужны
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)
+        with override_settings(CACHES=cache):
+            client = Client()
+            client.force_login(User.objects.get(username=BENCH_USER))
+            index, new_post = reverse("index"), reverse("new_post")
+            deadline = time.monotonic() + options["seconds"]
+            while time.monotonic() < deadline:
+                write = random.random() < options["write_ratio"]
+                try:
+                    if write:
+                        client.post(new_post, {"text": "Пост из бенчмарка"})
+                    else:
+                        client.get(index)
+                    counts["writes" if write else "reads"] += 1
+                except OperationalError:
+                    counts["errors"] += 1
+                # как в конце запроса WSGI: без CONN_MAX_AGE
+                # соединение закрывается
+                close_old_connections()
+        self.stdout.write(json.dumps(counts))
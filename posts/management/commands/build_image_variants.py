@@ -0,0 +1,69 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from posts import thumbnails
+from posts.models import Post
+
+
+def build(post_id, image):
+    # выполняется в дочернем процессе; картинка берётся через поле
+    # модели, чтобы ключи sorl считались от её хранилища
+    try:
+        thumbnails.build(Post(pk=post_id, image=image).image)
+    except Exception as error:
+        return post_id, repr(error)
+    return post_id, None
+
+
+class Command(BaseCommand):
+    help = ("Строит миниатюры и их варианты для srcset для всех "
+            "картинок постов, параллельно на всех ядрах.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers", type=int, default=os.cpu_count(),
+            help="Число процессов (по умолчанию — число ядер; "
+                 "1 — без дочерних процессов).")
+        parser.add_argument(
+            "--batch-size", type=int, default=100,
+            help="Сколько картинок выбирать из базы за раз.")
+
+    def handle(self, *args, **options):
+        posts = (Post.objects.exclude(image="").exclude(image__isnull=True)
+                 .order_by("pk").values_list("pk", "image"))
+        pool = None
+        if options["workers"] > 1:
+            pool = ProcessPoolExecutor(options["workers"])
+        built, failed, last = 0, 0, 0
+        try:
+            while True:
+                batch = list(posts.filter(pk__gt=last)
+                             [:options["batch_size"]])
+                if not batch:
+                    break
+                last = batch[-1][0]
+                if pool is None:
+                    results = map(build, *zip(*batch))
+                else:
+                    # соединение родителя не должно попасть в дочерние
+                    # процессы: у каждого из них будет своё
+                    connections.close_all()
+                    results = pool.map(build, *zip(*batch))
+                done = []
+                for post_id, error in results:
+                    if error is None:
+                        done.append(post_id)
+                    else:
+                        failed += 1
+                        self.stderr.write(f"Пост {post_id}: {error}")
+                thumbnails.touch(done)
+                built += len(done)
+                self.stdout.write(f"Готово картинок: {built}")
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        self.stdout.write(self.style.SUCCESS(
+            f"Построено: {built}, с ошибками: {failed}"))
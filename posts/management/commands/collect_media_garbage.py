@@ -0,0 +1,43 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.media_gc import Collector
+
+
+class Command(BaseCommand):
+    help = ("Удаляет из MEDIA_ROOT картинки и миниатюры, на которые "
+            "не ссылается ни один пост. Прерванный запуск продолжается "
+            "с контрольной точки.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--grace-hours", type=float, default=24,
+            help="Не трогать файлы моложе стольких часов.")
+        parser.add_argument(
+            "--limit", type=int, default=None,
+            help="Просмотреть не больше стольких файлов за запуск.")
+        parser.add_argument(
+            "--checkpoint",
+            # вне MEDIA_ROOT: медиа раздаются веб-сервером целиком
+            default=os.path.join(settings.BASE_DIR, ".media_gc_checkpoint"),
+            help="Файл контрольной точки.")
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Только посчитать, ничего не удаляя.")
+
+    def handle(self, *args, **options):
+        collector = Collector(settings.MEDIA_ROOT, options["checkpoint"],
+                              options["grace_hours"] * 3600,
+                              dry_run=options["dry_run"])
+        finished = collector.run(limit=options["limit"])
+        verb = "Можно удалить" if options["dry_run"] else "Удалено"
+        self.stdout.write(
+            f"Просмотрено файлов: {collector.scanned}. {verb}: "
+            f"{collector.deleted}, {collector.reclaimed / 2 ** 20:.1f} МБ")
+        if finished:
+            self.stdout.write(self.style.SUCCESS("Обход завершён"))
+        else:
+            self.stdout.write("Обход прерван по --limit; следующий запуск "
+                              "продолжит с контрольной точки")
@@ -0,0 +1,41 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ("Выгружает посты в JSONL или CSV потоком, не загружая "
+            "выборку в память.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--author", help="Только посты автора с таким именем.")
+        parser.add_argument(
+            "--group", help="Только посты группы с таким slug.")
+        parser.add_argument(
+            "--format", choices=tuple(export.FORMATS), default="jsonl")
+        parser.add_argument(
+            "--gzip", action="store_true", help="Сжать выгрузку gzip.")
+        parser.add_argument(
+            "-o", "--output", help="Файл выгрузки; по умолчанию stdout.")
+
+    def handle(self, *args, **options):
+        posts = Post.objects.all()
+        if options["author"]:
+            posts = posts.filter(author__username=options["author"])
+        if options["group"]:
+            posts = posts.filter(group__slug=options["group"])
+        chunks = export.stream(posts, options["format"], options["gzip"])
+        if not options["output"]:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            return
+        try:
+            with open(options["output"], "wb") as file:
+                for chunk in chunks:
+                    file.write(chunk)
+        except OSError as error:
+            raise CommandError(error)
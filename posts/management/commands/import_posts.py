@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.importer import Importer, detect_format, read_records
+
+
+class Command(BaseCommand):
+    help = ("Импортирует посты и комментарии из JSONL или CSV порциями "
+            "через bulk_create. Прерванный импорт продолжается "
+            "с контрольной точки.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Файл JSONL или CSV.")
+        parser.add_argument(
+            "--format", choices=("jsonl", "csv"),
+            help="Формат файла; по умолчанию — по расширению.")
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Записей в одной транзакции.")
+        parser.add_argument(
+            "--checkpoint",
+            help="Файл контрольной точки; по умолчанию <path>.checkpoint.")
+        parser.add_argument(
+            "--create-missing", action="store_true",
+            help="Создавать неизвестных авторов и группы, "
+                 "а не пропускать их записи.")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        importer = Importer(
+            path, options["checkpoint"] or path + ".checkpoint",
+            chunk_size=options["chunk_size"],
+            create_missing=options["create_missing"])
+        file_format = options["format"] or detect_format(path)
+        progress = self.progress if options["verbosity"] > 1 else None
+        try:
+            with open(path, newline="", encoding="utf-8") as file:
+                seconds = importer.run(read_records(file, file_format),
+                                       progress)
+        except (OSError, ValueError) as error:
+            raise CommandError(error)
+        for number, reason in importer.errors:
+            self.stderr.write(f"Запись {number} пропущена: {reason}")
+        self.stdout.write(
+            f"Постов: {importer.posts}, комментариев: {importer.comments}, "
+            f"пропущено записей: {importer.skipped}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Импорт завершён за {seconds:.1f} с"))
+
+    def progress(self, importer, seconds):
+        rate = importer.posts / seconds if seconds else 0
+        self.stdout.write(f"Записей: {importer.done}, постов: "
+                          f"{importer.posts} ({rate:.0f} в секунду)")
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает денормализованные счётчики постов и "
+            "комментариев, записи по месяцам и сообщает о расхождениях.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run", action="store_true",
+            help="Только показать расхождения, ничего не исправляя.")
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Размер пачки при создании строк статистики авторов.")
+
+    def handle(self, *args, **options):
+        drift = counters.find_drift()
+        for (model, field), rows in drift.items():
+            self.stdout.write(f"{model}.{field}: расхождений {rows}")
+        if options["dry_run"]:
+            return
+        with transaction.atomic():
+            created = counters.create_missing_stats(options["batch_size"])
+            updated = counters.rebuild_counters()
+            months = counters.rebuild_months()
+        self.stdout.write(f"Создано строк статистики авторов: {created}")
+        self.stdout.write(f"Месяцев с записями: {months}")
+        for (model, field), rows in updated.items():
+            self.stdout.write(f"{model}.{field}: исправлено {rows}")
+        self.stdout.write(self.style.SUCCESS("Счётчики пересчитаны"))
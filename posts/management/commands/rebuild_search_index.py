@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import search
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ("Заново строит полнотекстовый индекс постов (FTS5) "
+            "по всем существующим записям.")
+
+    def handle(self, *args, **options):
+        if not search.is_available():
+            raise CommandError("Полнотекстовый индекс есть только на SQLite")
+        search.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Индекс перестроен, постов: {Post.objects.count()}"))
@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from yatube import replicas
+
+
+class Command(BaseCommand):
+    help = ("Обновляет реплики для чтения (DATABASE_REPLICAS) копией "
+            "основной базы SQLite, когда в ней есть изменения.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Обновить реплики один раз и выйти.")
+        parser.add_argument(
+            "--interval", type=float, default=10.0,
+            help="Пауза в секундах между обновлениями.")
+
+    def handle(self, *args, **options):
+        aliases = replicas.replicas()
+        if not aliases:
+            self.stdout.write("Реплики не настроены (DB_REPLICAS)")
+            return
+        version = None
+        while True:
+            # без изменений копии и эпоха остаются прежними,
+            # и кеши, собранные по репликам, не сбрасываются
+            current = replicas.primary_version()
+            if current != version:
+                started = time.monotonic()
+                for alias in aliases:
+                    replicas.refresh(alias)
+                replicas.bump_epoch()
+                version = current
+                self.stdout.write(
+                    f"Реплики {', '.join(aliases)} обновлены за "
+                    f"{time.monotonic() - started:.2f} с")
+            if options["once"]:
+                break
+            time.sleep(options["interval"])
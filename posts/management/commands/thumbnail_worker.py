@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+
+
+class Command(BaseCommand):
+    help = ("Фоновый процесс: строит миниатюры загруженных картинок "
+            "по очереди задач.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--once", action="store_true",
+            help="Разобрать очередь и выйти, не дожидаясь новых задач.")
+        parser.add_argument(
+            "--interval", type=float, default=1.0,
+            help="Пауза в секундах, когда очередь пуста.")
+
+    def handle(self, *args, **options):
+        built = 0
+        while True:
+            job = thumbnails.claim()
+            if job is None:
+                if options["once"]:
+                    break
+                time.sleep(options["interval"])
+                continue
+            try:
+                thumbnails.process(job)
+            except Exception as error:
+                self.stderr.write(f"Пост {job.post_id}: {error!r}")
+                continue
+            built += 1
+            self.stdout.write(f"Пост {job.post_id}: миниатюры готовы")
+        self.stdout.write(self.style.SUCCESS(f"Обработано задач: {built}"))
@@ -0,0 +1,176 @@
+"""Сборка мусора в MEDIA_ROOT.
+
+После правки и удаления постов их картинки (posts/) и миниатюры
+(cache/) остаются на диске. Здесь дерево обходится через os.scandir
+в постоянном (отсортированном) порядке, а файлы, на которые больше
+нет ссылок, удаляются. Обход можно прервать: последний пройденный
+путь пишется в файл контрольной точки, и следующий запуск продолжает
+с него.
+
+Ссылки проверяются пачками между контрольными точками,
+непосредственно перед удалением: на загруженные картинки — одним
+запросом image__in по индексу post_image, на миниатюры — одним
+потоковым проходом по картинкам постов (имя миниатюры вычисляется
+из картинки, обратно его не развернуть). В памяти держится только
+пачка путей, а не имена миниатюр всех постов.
+"""
+import os
+import time
+
+from sorl.thumbnail.conf import settings as thumbnail_settings
+
+from . import thumbnails
+from .models import Post
+
+UPLOAD_DIRS = ("posts",)
+
+
+# SQLite ограничивает число параметров в одном запросе
+QUERY_BATCH = 500
+
+
+def referenced_thumbnails(paths):
+    """Те из paths (относительно MEDIA_ROOT), что являются миниатюрой
+    картинки какого-нибудь поста."""
+    paths = set(paths)
+    referenced = set()
+    if not paths:
+        return referenced
+    images = (Post.objects.exclude(image="").exclude(image__isnull=True)
+              .order_by().values_list("pk", "image")
+              .iterator(chunk_size=2000))
+    for post_id, image in images:
+        referenced.update(paths & thumbnails.thumbnail_names(
+            Post(pk=post_id, image=image).image))
+    return referenced
+
+
+def referenced_uploads(paths):
+    """Те из paths, на которые ссылается какой-нибудь пост."""
+    referenced = set()
+    for start in range(0, len(paths), QUERY_BATCH):
+        referenced.update(
+            Post.objects.filter(image__in=paths[start:start + QUERY_BATCH])
+            .order_by().values_list("image", flat=True))
+    return referenced
+
+
+def _parts(path):
+    # порядок обхода: по компонентам пути, а не по строке целиком
+    return path.split(os.sep)
+
+
+def _walk(root, directory, after):
+    """Файлы поддерева в отсортированном порядке: (путь, DirEntry).
+
+    Поддеревья, целиком лежащие до пути after, не открываются.
+    """
+    try:
+        with os.scandir(os.path.join(root, directory)) as entries:
+            entries = sorted(entries, key=lambda entry: entry.name)
+    except FileNotFoundError:
+        return
+    for entry in entries:
+        path = os.path.join(directory, entry.name)
+        parts = _parts(path)
+        if entry.is_dir(follow_symlinks=False):
+            if after is None or parts >= after[:len(parts)]:
+                yield from _walk(root, path, after)
+        elif entry.is_file(follow_symlinks=False):
+            if after is None or parts > after:
+                yield path, entry
+
+
+def thumbnail_dir():
+    return thumbnail_settings.THUMBNAIL_PREFIX.strip("/")
+
+
+def media_files(root, after=None):
+    """Файлы каталогов загрузок и миниатюр, начиная после after."""
+    after = _parts(after) if after else None
+    for directory in sorted(UPLOAD_DIRS + (thumbnail_dir(),)):
+        if after is None or [directory] >= after[:1]:
+            yield from _walk(root, directory, after)
+
+
+class Collector:
+    """Один проход сборщика с контрольной точкой.
+
+    Удаляются файлы без ссылок, которые старше grace секунд: свежий
+    файл может принадлежать посту, который ещё сохраняется.
+    """
+
+    def __init__(self, root, checkpoint, grace, dry_run=False):
+        self.root = root
+        self.checkpoint = checkpoint
+        self.grace = grace
+        self.dry_run = dry_run
+        self.scanned = self.deleted = self.reclaimed = 0
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint) as file:
+                return file.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save_checkpoint(self, path):
+        if self.dry_run:
+            return
+        temporary = self.checkpoint + ".tmp"
+        with open(temporary, "w") as file:
+            file.write(path)
+        os.replace(temporary, self.checkpoint)
+
+    def is_thumbnail(self, path):
+        return _parts(path)[0] == thumbnail_dir()
+
+    def delete_unreferenced(self, candidates):
+        """Удаляет кандидатов, на которых не ссылается ни один пост.
+
+        Ссылки проверяются прямо перед удалением: на файл с тем же
+        содержимым мог сослаться пост, созданный уже во время обхода.
+        """
+        uploads, thumbnail_paths = [], []
+        for path, _, _ in candidates:
+            if self.is_thumbnail(path):
+                thumbnail_paths.append(path)
+            else:
+                uploads.append(path)
+        referenced = (referenced_uploads(uploads)
+                      | referenced_thumbnails(thumbnail_paths))
+        for path, full_path, size in candidates:
+            if path in referenced:
+                continue
+            if not self.dry_run:
+                try:
+                    os.remove(full_path)
+                except FileNotFoundError:
+                    continue
+            self.deleted += 1
+            self.reclaimed += size
+        candidates.clear()
+
+    def run(self, limit=None, checkpoint_every=1000):
+        """Проходит до limit файлов; True, если дерево пройдено."""
+        deadline = time.time() - self.grace
+        candidates = []
+        last = None
+        for path, entry in media_files(self.root, self.load_checkpoint()):
+            if limit is not None and self.scanned >= limit:
+                self.delete_unreferenced(candidates)
+                if last is not None:
+                    self.save_checkpoint(last)
+                return False
+            self.scanned += 1
+            last = path
+            stat = entry.stat(follow_symlinks=False)
+            if stat.st_mtime < deadline:
+                candidates.append((path, entry.path, stat.st_size))
+            if self.scanned % checkpoint_every == 0:
+                self.delete_unreferenced(candidates)
+                self.save_checkpoint(path)
+        self.delete_unreferenced(candidates)
+        if not self.dry_run and os.path.exists(self.checkpoint):
+            os.remove(self.checkpoint)
+        return True
@@ -0,0 +1,15 @@
+from . import thumbnails
+
+
+class ThumbnailLookupsMiddleware:
+    """Заголовок X-Thumbnail-Lookups: сколько раз за запрос
+    пришлось обращаться к хранилищу миниатюр."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        thumbnails.reset_lookups()
+        response = self.get_response(request)
+        response["X-Thumbnail-Lookups"] = thumbnails.lookups()
+        return response
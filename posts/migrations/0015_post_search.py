@@ -0,0 +1,19 @@
+# Generated by Django 2.2.6 on 2026-10-18 19:40
+
+from django.db import migrations
+
+
+def build_index(apps, schema_editor):
+    from posts import search
+    search.rebuild(schema_editor.connection)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(build_index, migrations.RunPython.noop),
+    ]
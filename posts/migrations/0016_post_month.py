@@ -0,0 +1,40 @@
+# Generated by Django 2.2.6 on 2026-10-18 20:05
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+
+def fill_months(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    PostMonth = apps.get_model('posts', 'PostMonth')
+    rows = (Post.objects.order_by()
+            .annotate(month=TruncMonth('pub_date'))
+            .values('month').annotate(total=Count('pk')))
+    PostMonth.objects.bulk_create(
+        [PostMonth(month=timezone.localtime(row['month']).date(),
+                   posts_count=row['total']) for row in rows],
+        batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostMonth',
+            fields=[
+                ('month', models.DateField(primary_key=True, serialize=False, verbose_name='Месяц')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Количество записей')),
+            ],
+            options={
+                'verbose_name': 'Записи за месяц',
+                'verbose_name_plural': 'Записи по месяцам',
+            },
+        ),
+        migrations.RunPython(fill_months, migrations.RunPython.noop),
+    ]
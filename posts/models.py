@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 User = get_user_model()
@@ -10,6 +11,11 @@ class Group(models.Model):
     slug = models.SlugField(unique=True, verbose_name=_("Строка-ключ"),
                             max_length=10)
     description = models.TextField(max_length=200, verbose_name=_("Описание"))
+    # Счётчик поддерживается сигналами, см. posts/signals.py
+    posts_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name=_("Количество записей")
+    )
 
     def __str__(self):
         return self.title
@@ -19,6 +25,15 @@ class Group(models.Model):
         verbose_name_plural = _("Группы")
 
 
+class PostQuerySet(models.QuerySet):
+    def for_list(self):
+        """Посты для ленты: автор и группа в том же запросе.
+
+        Число комментариев хранится в самом посте (comments_count).
+        """
+        return self.select_related("author", "group")
+
+
 class Post(models.Model):
 
     text = models.TextField(
@@ -29,6 +44,12 @@ class Post(models.Model):
         auto_now_add=True,
         verbose_name=_("Дата публикации")
     )
+    # меняется при любом изменении карточки поста, в том числе
+    # при новых комментариях; входит в ключ кеша карточки
+    modified = models.DateTimeField(
+        auto_now=True,
+        verbose_name=_("Дата изменения")
+    )
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name="posts",
@@ -43,15 +64,43 @@ class Post(models.Model):
     )
     # Аргумент upload_to указывает куда загружаться пользовательским файлам
     image = models.ImageField(upload_to='posts/', blank=True, null=True)
+    comments_count = models.PositiveIntegerField(
+        default=0, editable=False,
+        verbose_name=_("Количество комментариев")
+    )
+
+    objects = PostQuerySet.as_manager()
 
     def __str__(self):
         return (f"автор: {self.author.username}, группа: {self.group}, "
                 f"дата: {self.pub_date}, текст:{self.text[:15]}.")
 
+    def save(self, *args, **kwargs):
+        # счётчики обновляются сигналами в той же транзакции
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = _("Пост")
         verbose_name_plural = _("Посты")
         ordering = ("-pub_date",)
+        # индексы (..., modified) нужны для ETag,
+        # см. posts/conditional.py
+        indexes = [
+            # ленты: главная, группа и профиль с курсором (pub_date, id)
+            models.Index(fields=("pub_date", "id"), name="post_pub_date_id"),
+            models.Index(fields=("author", "pub_date", "id"),
+                         name="post_author_pub_date"),
+            models.Index(fields=("group", "pub_date", "id"),
+                         name="post_group_pub_date"),
+            models.Index(fields=("modified",), name="post_modified"),
+            models.Index(fields=("author", "modified"),
+                         name="post_author_modified"),
+            models.Index(fields=("group", "modified"),
+                         name="post_group_modified"),
+            # проверка ссылок на файлы сборщиком мусора в MEDIA_ROOT
+            models.Index(fields=("image",), name="post_image"),
+        ]
 
 
 class Comment(models.Model):
@@ -74,3 +123,142 @@ class Comment(models.Model):
         auto_now_add=True,
         verbose_name=_("Дата комментария")
     )
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=("post", "created", "id"),
+                         name="comment_post_created"),
+        ]
+
+
+class AuthorStats(models.Model):
+    """Денормализованные счётчики автора."""
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+        verbose_name=_("Автор")
+    )
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Количество записей")
+    )
+    followers_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Количество подписчиков")
+    )
+    following_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Количество подписок")
+    )
+
+    def __str__(self):
+        return f"статистика: {self.user_id}"
+
+    class Meta:
+        verbose_name = _("Статистика автора")
+        verbose_name_plural = _("Статистика авторов")
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name="follower",
+        verbose_name=_("Подписчик")
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name="following",
+        verbose_name=_("Автор")
+    )
+
+    def __str__(self):
+        return f"{self.user_id} подписан на {self.author_id}"
+
+    class Meta:
+        verbose_name = _("Подписка")
+        verbose_name_plural = _("Подписки")
+        constraints = [
+            models.UniqueConstraint(fields=("user", "author"),
+                                    name="unique_follow"),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Запись персональной ленты подписчика.
+
+    Лента материализуется при публикации поста (fan-out on write),
+    поэтому чтение ленты — один диапазон по индексу
+    (owner, pub_date, post). См. posts/timeline.py.
+    """
+    owner = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name="timeline",
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    # копии полей поста: по ним строится индекс ленты
+    # и удаляются записи автора при отписке
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name="+",
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=("owner", "post"),
+                                    name="unique_timeline_entry"),
+        ]
+        indexes = [
+            models.Index(fields=("owner", "pub_date", "post"),
+                         name="timeline_owner_pub_date"),
+            models.Index(fields=("owner", "author"),
+                         name="timeline_owner_author"),
+        ]
+
+
+class PostMonth(models.Model):
+    """Число постов за месяц для навигации по датам в админке.
+
+    Месяц — первое число месяца по местному времени (TIME_ZONE),
+    как в фильтре date_hierarchy. Счётчик поддерживается сигналами.
+    """
+    month = models.DateField(primary_key=True, verbose_name=_("Месяц"))
+    posts_count = models.PositiveIntegerField(
+        default=0,
+        verbose_name=_("Количество записей")
+    )
+
+    def __str__(self):
+        return f"{self.month:%Y-%m}: {self.posts_count}"
+
+    class Meta:
+        verbose_name = _("Записи за месяц")
+        verbose_name_plural = _("Записи по месяцам")
+
+
+class ThumbnailJob(models.Model):
+    """Задача построить миниатюры картинки поста.
+
+    На пост приходится не больше одной задачи; новая картинка
+    перезапускает её. См. posts/thumbnails.py.
+    """
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE,
+        related_name="thumbnail_job",
+    )
+    # время постановки в очередь; по нему воркер понимает,
+    # что пока он работал, картинку заменили
+    queued = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(blank=True, null=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+
+    def __str__(self):
+        return f"миниатюры поста {self.post_id}"
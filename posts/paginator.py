@@ -0,0 +1,253 @@
+import base64
+import binascii
+import json
+
+from django.core.exceptions import ValidationError
+from django.core.paginator import Page, Paginator
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.db.models import Q
+from django.http import Http404, QueryDict
+from django.utils.functional import cached_property
+
+# Параметры запроса, в которых передаётся курсор
+AFTER_PARAM = "after"
+BEFORE_PARAM = "before"
+
+
+class CursorPage(Page):
+    """Страница курсорного паджинатора.
+
+    Номера страниц и общее количество записей не вычисляются:
+    вместо них страница отдаёт курсоры соседних страниц.
+    """
+
+    def __init__(self, object_list, paginator, params,
+                 has_next, has_previous, cursor_key="first"):
+        super().__init__(object_list, None, paginator)
+        self.params = params
+        self.cursor_key = cursor_key
+        self.next_cursor = self.previous_cursor = None
+        if object_list and has_next:
+            self.next_cursor = paginator.encode_cursor(object_list[-1])
+        if object_list and has_previous:
+            self.previous_cursor = paginator.encode_cursor(object_list[0])
+        # у пустой страницы (курсор за краем выборки) нет записи,
+        # от которой строится курсор, — и ссылок на соседние нет
+        self._has_next = self.next_cursor is not None
+        self._has_previous = self.previous_cursor is not None
+
+    def __repr__(self):
+        # входит в ключи кеша фрагментов страницы
+        return f"<CursorPage {self.cursor_key}>"
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    def has_other_pages(self):
+        return self._has_next or self._has_previous
+
+    def _query(self, param, cursor):
+        query = QueryDict(mutable=True)
+        query.update(self.params)
+        query.pop(AFTER_PARAM, None)
+        query.pop(BEFORE_PARAM, None)
+        query[param] = cursor
+        return query.urlencode()
+
+    @property
+    def next_query(self):
+        """Строка запроса для ссылки на следующую страницу."""
+        if self.next_cursor is None:
+            return None
+        return self._query(AFTER_PARAM, self.next_cursor)
+
+    @property
+    def previous_query(self):
+        """Строка запроса для ссылки на предыдущую страницу."""
+        if self.previous_cursor is None:
+            return None
+        return self._query(BEFORE_PARAM, self.previous_cursor)
+
+
+def cursor_params(params):
+    """Только параметры курсора из запроса.
+
+    Для страниц, закешированных целиком: ссылки соседних страниц
+    не должны уносить в кеш посторонние параметры первого зрителя.
+    """
+    query = QueryDict(mutable=True)
+    for param in (AFTER_PARAM, BEFORE_PARAM):
+        if param in params:
+            query[param] = params[param]
+    return query
+
+
+class CursorPaginator(Paginator):
+    """Паджинатор по ключу (keyset pagination).
+
+    Вместо OFFSET и COUNT(*) страница выбирается условием
+    «строго после (до) курсора» по полям сортировки, поэтому
+    глубокие страницы стоят столько же, сколько первая.
+    Последнее поле сортировки должно быть уникальным (обычно id).
+    """
+
+    def __init__(self, object_list, per_page,
+                 ordering=("-pub_date", "-id")):
+        self.ordering = tuple(ordering)
+        self.fields = tuple(field.lstrip("-") for field in self.ordering)
+        self.descending = self.ordering[0].startswith("-")
+        super().__init__(object_list.order_by(*self.ordering), per_page)
+
+    def _field_value(self, obj, field):
+        if isinstance(obj, dict):
+            return obj[field]
+        return getattr(obj, field)
+
+    def encode_values(self, values):
+        values = [value.isoformat() if hasattr(value, "isoformat")
+                  else value for value in values]
+        raw = json.dumps(values, separators=(",", ":")).encode()
+        return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+    def encode_cursor(self, obj):
+        return self.encode_values(
+            [self._field_value(obj, field) for field in self.fields])
+
+    def decode_cursor(self, cursor):
+        """Возвращает значения полей курсора или None, если он битый."""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            values = json.loads(raw)
+        except (binascii.Error, ValueError, TypeError):
+            return None
+        if not isinstance(values, list) or len(values) != len(self.fields):
+            return None
+        try:
+            return self.convert_cursor(values)
+        except (ValidationError, TypeError, ValueError):
+            return None
+
+    def convert_cursor(self, values):
+        """Приводит значения из курсора к типам полей модели."""
+        opts = self.object_list.model._meta
+        return [opts.get_field(field).to_python(value)
+                for field, value in zip(self.fields, values)]
+
+    def seek(self, queryset, values, forward=True, fields=None):
+        """Условие «после курсора» (или «до», если forward=False).
+
+        Условие записано как ``a <= x AND (a < x OR ...)``, чтобы SQLite
+        мог использовать диапазон по первому полю индекса.
+        fields позволяет применить курсор к другому queryset
+        с иначе названными полями.
+        """
+        after = self.descending == forward
+        strict, loose = ("lt", "lte") if after else ("gt", "gte")
+        condition = None
+        fields = fields or self.fields
+        for field, value in reversed(list(zip(fields, values))):
+            if condition is None:
+                condition = Q(**{f"{field}__{strict}": value})
+            else:
+                condition = (Q(**{f"{field}__{loose}": value})
+                             & (Q(**{f"{field}__{strict}": value})
+                                | condition))
+        return queryset.filter(condition)
+
+    def fetch(self, values, forward, limit):
+        """Выбирает до limit записей от курсора в порядке показа."""
+        queryset = self.object_list
+        if values is not None:
+            queryset = self.seek(queryset, values, forward)
+        if forward:
+            return list(queryset[:limit])
+        return list(queryset.reverse()[:limit])[::-1]
+
+    def parse_cursor(self, params):
+        """Курсор из параметров запроса: (param, значения полей).
+
+        Без курсора — (None, None). Курсор, который не разбирается,
+        даёт 404: иначе каждая произвольная строка в ?after=
+        порождала бы свою запись в кеше страниц.
+        """
+        for param in (BEFORE_PARAM, AFTER_PARAM):
+            cursor = params.get(param)
+            if cursor:
+                values = self.decode_cursor(cursor)
+                if values is None:
+                    raise Http404("Некорректный курсор страницы")
+                return param, values
+        return None, None
+
+    def cursor_key(self, params):
+        """Нормализованный курсор запроса для ключей кеша."""
+        return self._cursor_key(*self.parse_cursor(params))
+
+    def _cursor_key(self, param, values):
+        if param is None:
+            return "first"
+        return f"{param}:{self.encode_values(values)}"
+
+    def get_page(self, params):
+        """Возвращает страницу по параметрам запроса after/before."""
+        limit = self.per_page + 1
+        param, values = self.parse_cursor(params)
+        key = self._cursor_key(param, values)
+        if param == BEFORE_PARAM:
+            rows = self.fetch(values, False, limit)
+            has_previous = len(rows) > self.per_page
+            rows = rows[-self.per_page:]
+            return CursorPage(rows, self, params, has_next=True,
+                              has_previous=has_previous, cursor_key=key)
+        rows = self.fetch(values, True, limit)
+        has_next = len(rows) > self.per_page
+        return CursorPage(rows[:self.per_page], self, params,
+                          has_next=has_next,
+                          has_previous=values is not None, cursor_key=key)
+
+
+def table_estimate(model, using=None):
+    """Число строк таблицы по статистике ANALYZE (sqlite_stat1).
+
+    Первое число в поле stat — количество строк на момент
+    последнего ANALYZE. None, если статистики нет.
+    """
+    connection = connections[using or DEFAULT_DB_ALIAS]
+    if connection.vendor != "sqlite":
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl = %s "
+                           "LIMIT 1", [model._meta.db_table])
+            row = cursor.fetchone()
+    except DatabaseError:
+        return None
+    return int(row[0].split()[0]) if row else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """Паджинатор с приблизительным числом записей вместо COUNT(*).
+
+    estimate() возвращает оценку для текущей выборки или None;
+    без неё для выборки без фильтров берётся статистика таблицы.
+    Если оценки нет, считается честный COUNT(*).
+    """
+
+    def __init__(self, *args, estimate=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.estimate = estimate
+
+    @cached_property
+    def count(self):
+        estimate = None
+        if self.estimate is not None:
+            estimate = self.estimate()
+        elif not self.object_list.query.where:
+            estimate = table_estimate(self.object_list.model,
+                                      self.object_list.db)
+        if estimate is None:
+            return super().count
+        return estimate
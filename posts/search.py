@@ -0,0 +1,131 @@
+"""Полнотекстовый поиск по постам на SQLite FTS5.
+
+Индекс posts_post_fts — FTS5-таблица с внешним содержимым
+(content='posts_post'): сам текст хранится только в posts_post,
+а триггеры поддерживают индекс при вставке, изменении и удалении
+постов. При пересоздании таблицы постов миграцией SQLite удаляет её
+триггеры, поэтому install() вызывается после каждой миграции.
+
+На других СУБД поиск деградирует до ``text__icontains``.
+"""
+import re
+
+from django.core.paginator import Paginator
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Post
+from .paginator import CursorPaginator
+
+FTS_TABLE = "posts_post_fts"
+
+INSTALL_SQL = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+    "text, content='posts_post', content_rowid='id', "
+    "tokenize='unicode61 remove_diacritics 2')",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert "
+    "AFTER INSERT ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete "
+    "AFTER DELETE ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update "
+    "AFTER UPDATE OF text ON posts_post BEGIN "
+    f"INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, text) "
+    "VALUES ('delete', old.id, old.text); "
+    f"INSERT INTO {FTS_TABLE}(rowid, text) VALUES (new.id, new.text); END",
+)
+
+
+def is_available(using=None):
+    return (using or connection).vendor == "sqlite"
+
+
+def install(using=None):
+    """Создаёт FTS-таблицу и триггеры, если их ещё нет."""
+    using = using or connection
+    if not is_available(using):
+        return
+    with using.cursor() as cursor:
+        for sql in INSTALL_SQL:
+            cursor.execute(sql)
+
+
+def rebuild(using=None):
+    """Заново строит индекс по всем постам одной командой FTS5."""
+    using = using or connection
+    install(using)
+    with using.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) "
+                       "VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) "
+                       "VALUES ('optimize')")
+
+
+def match_query(text):
+    """Запрос пользователя -> выражение MATCH.
+
+    Каждое слово ищется по префиксу, все слова обязательны.
+    Синтаксис FTS5 из пользовательского ввода не пропускаем.
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words)
+
+
+def matching_ids(text):
+    """Подзапрос id постов, подходящих под запрос (для фильтров)."""
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} "
+                  f"WHERE {FTS_TABLE} MATCH %s", (match_query(text),))
+
+
+class SearchPaginator(CursorPaginator):
+    """Выдача поиска по релевантности с курсором (ранг, id).
+
+    Ранг — bm25() из FTS5 (чем меньше, тем релевантнее). Страница
+    выбирается из индекса одним запросом, а посты с авторами и
+    группами — вторым.
+    """
+
+    def __init__(self, text, per_page):
+        self.match = match_query(text)
+        self.ordering = self.fields = ("search_rank", "id")
+        self.descending = False
+        # ранга нет среди полей модели, поэтому order_by не вызываем
+        Paginator.__init__(self, Post.objects.for_list(), per_page)
+
+    def convert_cursor(self, values):
+        return [float(values[0]), int(values[1])]
+
+    def fetch(self, values, forward, limit):
+        if not self.match:
+            return []
+        rank = f"bm25({FTS_TABLE})"
+        sql = (f"SELECT rowid, {rank} FROM {FTS_TABLE} "
+               f"WHERE {FTS_TABLE} MATCH %s")
+        params = [self.match]
+        if values is not None:
+            op = ">" if forward else "<"
+            sql += f" AND ({rank} {op} %s OR ({rank} = %s AND rowid {op} %s))"
+            params += [values[0], values[0], values[1]]
+        direction = "" if forward else " DESC"
+        sql += f" ORDER BY {rank}{direction}, rowid{direction} LIMIT %s"
+        params.append(limit)
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            ranks = dict(cursor.fetchall())
+        posts = self.object_list.in_bulk(list(ranks))
+        found = []
+        for post_id, rank in ranks.items():
+            if post_id in posts:
+                posts[post_id].search_rank = rank
+                found.append(posts[post_id])
+        return found if forward else found[::-1]
+
+
+def search_paginator(text, per_page):
+    """Паджинатор выдачи: FTS5 на SQLite, LIKE на остальных СУБД."""
+    if is_available():
+        return SearchPaginator(text, per_page)
+    return CursorPaginator(Post.objects.for_list().filter(
+        text__icontains=text), per_page)
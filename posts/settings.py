@@ -1,3 +1,54 @@
 # константа для количества постов на странице для Paginator
 POSTS_ON_PAGE = 10
 POSTS_ON_PROFILE_PAGE = 4
+# комментариев на странице поста и в каждой догружаемой порции
+COMMENTS_ON_PAGE = 20
+# записей на странице JSON API
+API_PAGE_SIZE = 20
+# записей в RSS/Atom-лентах
+FEED_ITEMS = 20
+# сколько секунд хранится тело ленты одного поколения
+FEED_CACHE_TIMEOUT = 24 * 60 * 60
+# карта сайта: диапазон id постов в одной части (не больше 50 000 адресов)
+SITEMAP_CHUNK_SIZE = 10000
+# сколько секунд хранится тело части карты сайта одного поколения
+SITEMAP_CACHE_TIMEOUT = 24 * 60 * 60
+
+# Подписки: новый пост раскладывается по лентам подписчиков пачками
+FANOUT_BATCH_SIZE = 500
+# У авторов с таким числом подписчиков и больше посты не раскладываются,
+# а подмешиваются в ленту при чтении
+FANOUT_FOLLOWERS_LIMIT = 10000
+# Сколько последних постов автора добавить в ленту при подписке
+FOLLOW_BACKFILL_POSTS = 50
+
+# Кеш фрагментов: сколько секунд держится блокировка перестроения
+FRAGMENT_LOCK_TIMEOUT = 10
+
+# Миниатюры картинок постов: имя -> (геометрия, параметры sorl-thumbnail).
+# Строятся фоновым процессом thumbnail_worker сразу после загрузки.
+THUMBNAILS = {
+    "card": ("960x339", {"crop": "center", "upscale": True}),
+}
+# Варианты миниатюры для srcset: ширины (высота — по пропорции
+# основной геометрии), форматы и атрибут sizes для <img>
+RESPONSIVE_IMAGES = {
+    "card": {
+        "widths": (320, 640, 960),
+        "formats": ("WEBP", "JPEG"),
+        "sizes": "(max-width: 1000px) 100vw, 960px",
+    },
+}
+# На сколько секунд воркер забирает задачу; потом её возьмёт другой
+THUMBNAIL_JOB_LOCK = 60
+# После стольких неудачных попыток задача снимается
+THUMBNAIL_JOB_ATTEMPTS = 3
+
+# Загрузка картинок: больше стольких байт файл не принимается
+# (проверяется по мере приёма, до разбора картинки)
+IMAGE_UPLOAD_MAX_BYTES = 20 * 1024 * 1024
+# Картинки больше стольких пикселей не декодируются вовсе
+IMAGE_MAX_PIXELS = 50_000_000
+# Длинная сторона сохраняемой картинки и предел её размера в байтах
+IMAGE_MAX_SIDE = 2560
+IMAGE_MAX_STORED_BYTES = 1536 * 1024
@@ -0,0 +1,189 @@
+from django.db import transaction
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from . import (bulk, counters, generations, sitemaps, thumbnails,
+               timeline)
+from .models import Comment, Follow, Group, Post, User
+
+# поля группы и автора, которые видны на их страницах
+PAGE_FIELDS = {
+    Group: ("title", "slug", "description"),
+    User: ("username", "first_name", "last_name"),
+}
+# ...и в карточках постов
+CARD_FIELDS = {
+    Group: {"title", "slug"},
+    User: {"username"},
+}
+
+
+@receiver(pre_save, sender=Post)
+def remember_previous_group(sender, instance, raw=False, **kwargs):
+    # при редактировании пост может сменить группу и картинку
+    instance._previous_group_id = instance._previous_image = None
+    if raw or instance._state.adding or instance.pk is None:
+        return
+    instance._previous_group_id, instance._previous_image = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list("group_id", "image").first() or (None, None)
+    )
+
+
+@receiver(post_save, sender=Post)
+def count_saved_post(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.change_author_posts(instance.author_id, 1)
+        counters.change_group_posts(instance.group_id, 1)
+        counters.change_month_posts(counters.post_month(instance.pub_date), 1)
+        # раскладываем пост по лентам только после коммита,
+        # чтобы не держать блокировку на время рассылки
+        transaction.on_commit(lambda: timeline.fan_out(instance))
+        return
+    previous = getattr(instance, "_previous_group_id", None)
+    if previous != instance.group_id:
+        counters.change_group_posts(previous, -1)
+        counters.change_group_posts(instance.group_id, 1)
+
+
+@receiver(post_save, sender=Post)
+def enqueue_thumbnails(sender, instance, raw=False, **kwargs):
+    # посты с картинками приходят не только из форм сайта,
+    # но и из админки и API
+    if not raw and instance.image and (
+            instance.image.name != getattr(instance, "_previous_image", None)):
+        thumbnails.enqueue(instance)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.change_author_posts(instance.author_id, -1)
+    counters.change_group_posts(instance.group_id, -1)
+    counters.change_month_posts(counters.post_month(instance.pub_date), -1)
+
+
+@receiver(post_save, sender=Comment)
+def count_saved_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_post_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.change_post_comments(instance.post_id, -1)
+
+
+def bump_post_generations(author_id, *group_ids):
+    scopes = set(generations.post_scopes(author_id))
+    scopes.update(generations.group_scope(group_id)
+                  for group_id in group_ids if group_id is not None)
+    # новое поколение начинаем после коммита: иначе параллельный
+    # запрос успел бы закешировать старые данные под новым ключом
+    transaction.on_commit(lambda: generations.bump(*scopes))
+
+
+@receiver(post_save, sender=Post)
+def bump_saved_post(sender, instance, raw=False, **kwargs):
+    if not raw:
+        bump_post_generations(instance.author_id, instance.group_id,
+                              getattr(instance, "_previous_group_id", None))
+
+
+@receiver(post_delete, sender=Post)
+def bump_deleted_post(sender, instance, **kwargs):
+    bump_post_generations(instance.author_id, instance.group_id)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_sitemap_chunk(sender, instance, raw=False, **kwargs):
+    # карта сайта перестраивается только в части этого поста
+    if not raw:
+        sitemaps.bump_posts([instance.pk])
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_comment_post(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    post = (Post.objects.filter(pk=instance.post_id)
+            .values("author_id", "group_id").first())
+    if post is not None:
+        bump_post_generations(post["author_id"], post["group_id"])
+
+
+def bump_follow_generations(follow):
+    # на страницах профилей видны счётчики подписок и кнопка подписки
+    scopes = (generations.author_scope(follow.author_id),
+              generations.author_scope(follow.user_id))
+    transaction.on_commit(lambda: generations.bump(*scopes))
+
+
+@receiver(post_save, sender=Follow)
+def count_saved_follow(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.change_follows(instance.user_id, instance.author_id, 1)
+        transaction.on_commit(lambda: timeline.backfill(
+            instance.user_id, instance.author_id))
+        bump_follow_generations(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.change_follows(instance.user_id, instance.author_id, -1)
+    timeline.remove(instance.user_id, instance.author_id)
+    bump_follow_generations(instance)
+
+
+def changed_fields(instance, fields, update_fields=None):
+    """Какие из fields изменились в сохраняемом объекте."""
+    if update_fields is not None:
+        fields = [field for field in fields if field in update_fields]
+    if not fields or instance._state.adding or instance.pk is None:
+        return set()
+    saved = (type(instance).objects.filter(pk=instance.pk)
+             .values(*fields).first())
+    if saved is None:
+        return set()
+    return {field for field in fields
+            if saved[field] != getattr(instance, field)}
+
+
+def owner_scope(sender, instance):
+    if sender is Group:
+        return generations.group_scope(instance.pk)
+    return generations.author_scope(instance.pk)
+
+
+@receiver(pre_save, sender=Group)
+@receiver(pre_save, sender=User)
+def remember_page_changes(sender, instance, raw=False, update_fields=None,
+                          **kwargs):
+    instance._page_changes = set()
+    if not raw:
+        instance._page_changes = changed_fields(
+            instance, PAGE_FIELDS[sender], update_fields)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_save, sender=User)
+def bump_owner_pages(sender, instance, raw=False, **kwargs):
+    changes = getattr(instance, "_page_changes", set())
+    if raw or not changes:
+        return
+    # заголовок группы и имя автора — в ETag и кеше их страниц
+    scope = owner_scope(sender, instance)
+    transaction.on_commit(lambda: generations.bump(scope))
+    if changes & CARD_FIELDS[sender]:
+        # карточки постов кешируются под modified поста
+        bulk.touch_posts(instance.posts.all())
+
+
+@receiver(pre_delete, sender=Group)
+def touch_group_cards(sender, instance, **kwargs):
+    # посты остаются без группы (SET_NULL) без сигналов Post
+    bulk.touch_posts(instance.posts.all())
@@ -0,0 +1,147 @@
+"""Карта сайта для постов.
+
+django.contrib.sitemaps листает посты Paginator'ом с COUNT(*)
+и OFFSET, что на миллионах постов дорого. Здесь карта разбита
+на части по диапазонам id: часть N — посты с id от
+N * SITEMAP_CHUNK_SIZE + 1 до (N + 1) * SITEMAP_CHUNK_SIZE.
+Индекс (sitemap.xml) стоит одного запроса MAX(id).
+
+Часть читается из базы потоком по values_list().iterator() и
+кешируется под поколением этой части. Перестраивает её только один
+воркер (generations.single_flight), остальные тем временем отдают
+прежнюю версию. Новое поколение начинается только у части
+поста, у которого изменилось modified: сигналы — при сохранении
+и удалении, а UPDATE в обход сигналов (счётчик комментариев,
+массовые операции, миниатюры, смена имени автора) вызывают
+bump_posts или bump_chunks. Остальные части берутся из кеша, а на
+условный запрос с тем же ETag отвечают 304 без обращения к базе.
+ETag есть только у построенной части, поэтому несуществующая часть
+всегда отвечает 404. Тела прежних поколений вытесняются по сроку
+SITEMAP_CACHE_TIMEOUT.
+"""
+import hashlib
+from xml.sax.saxutils import escape
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Min
+from django.http import Http404, HttpResponse
+from django.urls import reverse
+from django.utils.http import quote_etag
+from django.views.decorators.http import condition
+
+from . import generations
+from .models import Post
+from .settings import SITEMAP_CACHE_TIMEOUT, SITEMAP_CHUNK_SIZE
+
+XMLNS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+ITERATOR_CHUNK_SIZE = 2000
+
+
+def chunk_of(post_id):
+    return (post_id - 1) // SITEMAP_CHUNK_SIZE
+
+
+def chunk_scopes(first_id, last_id):
+    """Области поколений частей, в которые попадают id first..last."""
+    return [generations.sitemap_scope(chunk) for chunk
+            in range(chunk_of(first_id), chunk_of(last_id) + 1)]
+
+
+def bump_posts(post_ids):
+    """Новое поколение (после коммита) для частей с этими постами."""
+    scopes = {generations.sitemap_scope(chunk_of(pk)) for pk in post_ids}
+    if scopes:
+        transaction.on_commit(lambda: generations.bump(*scopes))
+
+
+def bump_chunks(queryset):
+    """Новое поколение (после коммита) для частей с постами выборки."""
+    bounds = queryset.aggregate(first=Min("pk"), last=Max("pk"))
+    if bounds["first"] is None:
+        return
+    scopes = chunk_scopes(bounds["first"], bounds["last"])
+    transaction.on_commit(lambda: generations.bump(*scopes))
+
+
+def _base(request):
+    return f"{request.scheme}://{request.get_host()}"
+
+
+def _key(request, chunk):
+    generation = generations.get_generation(generations.sitemap_scope(chunk))
+    return f"sitemap:{_base(request)}:{chunk}:{generation}"
+
+
+def _etag_key(key):
+    return f"{key}:etag"
+
+
+def _chunk_etag(request, chunk):
+    # ETag запоминается при построении части: на угаданный ETag
+    # части, которой нет, condition() не ответит 304 вместо 404
+    return cache.get(_etag_key(_key(request, chunk)))
+
+
+def index(request):
+    last = Post.objects.aggregate(last=Max("pk"))["last"]
+    chunks = chunk_of(last) + 1 if last else 0
+    lines = ['<?xml version="1.0" encoding="UTF-8"?>\n',
+             f'<sitemapindex xmlns="{XMLNS}">\n']
+    for chunk in range(chunks):
+        url = _base(request) + reverse("sitemap_chunk", args=[chunk])
+        lines.append(f"<sitemap><loc>{escape(url)}</loc></sitemap>\n")
+    lines.append("</sitemapindex>\n")
+    return HttpResponse("".join(lines), content_type="application/xml")
+
+
+def _urls(request, chunk):
+    """Строки <url> части, потоком из базы."""
+    base = _base(request)
+    first = chunk * SITEMAP_CHUNK_SIZE + 1
+    rows = (Post.objects
+            .filter(pk__gte=first, pk__lt=first + SITEMAP_CHUNK_SIZE)
+            .order_by("pk")
+            .values_list("pk", "author__username", "modified")
+            .iterator(chunk_size=ITERATOR_CHUNK_SIZE))
+    for post_id, username, modified in rows:
+        url = base + reverse("post", args=[username, post_id])
+        yield (f"<url><loc>{escape(url)}</loc>"
+               f"<lastmod>{modified.date().isoformat()}</lastmod></url>\n")
+
+
+def _render(request, chunk):
+    return "".join([
+        '<?xml version="1.0" encoding="UTF-8"?>\n',
+        f'<urlset xmlns="{XMLNS}">\n',
+        *_urls(request, chunk),
+        "</urlset>\n",
+    ])
+
+
+@condition(etag_func=_chunk_etag)
+def chunk(request, chunk):
+    key = _key(request, chunk)
+    content = cache.get(key)
+    if content is not None:
+        return HttpResponse(content, content_type="application/xml")
+    last = Post.objects.aggregate(last=Max("pk"))["last"]
+    if last is None or chunk > chunk_of(last):
+        raise Http404
+    etag = hashlib.md5(key.encode()).hexdigest()
+    rendered = []
+
+    def render():
+        rendered.append(True)
+        content = _render(request, chunk)
+        cache.set(_etag_key(key), etag, timeout=SITEMAP_CACHE_TIMEOUT)
+        return content
+
+    content = generations.single_flight(
+        key, f"sitemap:{_base(request)}:{chunk}:stale", render,
+        timeout=SITEMAP_CACHE_TIMEOUT)
+    response = HttpResponse(content, content_type="application/xml")
+    if rendered:
+        # прежняя версия из stale-ключа идёт без ETag
+        response["ETag"] = quote_etag(etag)
+    return response
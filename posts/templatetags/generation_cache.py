@@ -0,0 +1,50 @@
+from django import template
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+
+from posts import generations
+
+register = template.Library()
+
+
+class GenerationCacheNode(template.Node):
+    def __init__(self, nodelist, fragment_name, scope, vary_on):
+        self.nodelist = nodelist
+        self.fragment_name = fragment_name
+        self.scope = scope
+        self.vary_on = vary_on
+
+    def render(self, context):
+        scope = self.scope.resolve(context)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        stale_key = make_template_fragment_key(self.fragment_name, vary_on)
+        key = f"{stale_key}:{generations.get_generation(scope)}"
+        content = cache.get(key)
+        if content is None:
+            content = generations.single_flight(
+                key, stale_key, lambda: self.nodelist.render(context))
+        return content
+
+
+@register.tag("generation_cache")
+def do_generation_cache(parser, token):
+    """Кеширует фрагмент до смены поколения области.
+
+    Использование::
+
+        {% generation_cache "имя_фрагмента" "область" [переменные...] %}
+        ...
+        {% endgeneration_cache %}
+    """
+    nodelist = parser.parse(("endgeneration_cache",))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{tokens[0]}' tag requires at least 2 arguments.")
+    fragment_name = tokens[1].strip("'\"")
+    return GenerationCacheNode(
+        nodelist, fragment_name,
+        parser.compile_filter(tokens[2]),
+        [parser.compile_filter(var) for var in tokens[3:]],
+    )
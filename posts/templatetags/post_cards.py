@@ -0,0 +1,39 @@
+from django import template
+
+from posts.cards import fill_edit_slots, render_cards
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, shared=False):
+    """Карточки постов страницы из кеша:
+    {% post_cards page as cards %}
+
+    Внутри общего для всех зрителей фрагмента —
+    {% post_cards page shared=True as cards %}, а сам фрагмент
+    оборачивается в {% edit_slots %}.
+    """
+    return render_cards(list(posts), context.get("user"), shared=shared)
+
+
+class EditSlotsNode(template.Node):
+    def __init__(self, nodelist):
+        self.nodelist = nodelist
+
+    def render(self, context):
+        return fill_edit_slots(self.nodelist.render(context),
+                               context.get("user"))
+
+
+@register.tag("edit_slots")
+def do_edit_slots(parser, token):
+    """Вставляет кнопки редактирования зрителя в карточки внутри:
+
+        {% edit_slots %}
+        ...
+        {% endedit_slots %}
+    """
+    nodelist = parser.parse(("endedit_slots",))
+    parser.delete_first_token()
+    return EditSlotsNode(nodelist)
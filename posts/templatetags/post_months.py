@@ -0,0 +1,68 @@
+import datetime
+
+from django import template
+from django.utils import formats
+from django.utils.text import capfirst
+from django.utils.translation import gettext as _
+
+from posts.models import PostMonth
+
+register = template.Library()
+
+
+def _number(value, low, high):
+    """Число из параметра запроса или None, если оно не в [low, high]"""
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None
+    return number if low <= number <= high else None
+
+
+@register.inclusion_tag("admin/date_hierarchy.html")
+def post_month_hierarchy(cl):
+    """date_hierarchy админки по таблице PostMonth:
+    {% post_month_hierarchy cl %}
+
+    Стандартный тег строит уровни запросом DISTINCT по всем постам;
+    здесь годы и месяцы берутся из готовых счётчиков, а навигация
+    заканчивается на месяце.
+    """
+    field = cl.date_hierarchy
+    year_field, month_field = f"{field}__year", f"{field}__month"
+    # Параметры из адреса: неверный год или месяц не фильтрует,
+    # а показывает уровень выше.
+    year = _number(cl.params.get(year_field), datetime.MINYEAR,
+                   datetime.MAXYEAR)
+    month = _number(cl.params.get(month_field), 1, 12) if year else None
+    months = PostMonth.objects.filter(posts_count__gt=0).order_by("month")
+
+    def link(filters):
+        return cl.get_query_string(filters, [f"{field}__"])
+
+    if year and month:
+        day = datetime.date(year, month, 1)
+        return {
+            "show": True,
+            "back": {"link": link({year_field: year}), "title": str(year)},
+            "choices": [{"title": capfirst(
+                formats.date_format(day, "YEAR_MONTH_FORMAT"))}],
+        }
+    if year:
+        return {
+            "show": True,
+            "back": {"link": link({}), "title": _("All dates")},
+            "choices": [{
+                "link": link({year_field: year,
+                              month_field: row.month.month}),
+                "title": capfirst(
+                    formats.date_format(row.month, "YEAR_MONTH_FORMAT")),
+            } for row in months.filter(month__year=year)],
+        }
+    years = months.dates("month", "year")
+    return {
+        "show": True,
+        "back": None,
+        "choices": [{"link": link({year_field: str(row.year)}),
+                     "title": str(row.year)} for row in years],
+    }
@@ -0,0 +1,20 @@
+from django import template
+
+from posts import thumbnails
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post, name):
+    """Готовая миниатюра или заглушка, без построения на лету:
+    {% post_thumbnail post "card" as im %}
+
+    Если страница уже нашла миниатюры пачкой (thumbnails.prefetch),
+    отдельного обращения к хранилищу не будет."""
+    if not post.image:
+        return None
+    prefetched = getattr(post, "thumbnails", None)
+    if prefetched is not None:
+        return prefetched[name]
+    return thumbnails.lookup(post.image, name)
@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from django.test import Client, TestCase
+
+from posts import bulk
+from posts.counters import post_month
+from posts.models import (AuthorStats, Comment, Group, Post, PostMonth,
+                          TimelineEntry, User)
+from posts.templatetags.post_months import post_month_hierarchy
+
+CHANGELIST = '/admin/posts/post/'
+
+
+class PostAdminTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client = Client()
+        self.client.login(username='admin', password='pass')
+        self.group = Group.objects.create(title="Тест-название",
+                                          slug='test_slug',
+                                          description="Тест-описание")
+        self.user = User.objects.create_user(username='IvanovI')
+        self.posts = [Post.objects.create(text=f'пост {i}', author=self.user,
+                                          group=self.group)
+                      for i in range(3)]
+        self.month = post_month(self.posts[0].pub_date)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_month_buckets_follow_posts(self):
+        """Счётчик месяца меняется при создании и удалении постов"""
+        self.assertEqual(PostMonth.objects.get(month=self.month).posts_count,
+                         3)
+        self.posts[0].delete()
+        self.assertEqual(PostMonth.objects.get(month=self.month).posts_count,
+                         2)
+
+    def test_changelist_queries(self):
+        """Список постов не считает COUNT(*) по таблице и не делает
+        запросов на каждого автора и группу"""
+        self.client.get(CHANGELIST)
+        with self.assertNumQueries(5) as context:
+            response = self.client.get(CHANGELIST)
+        self.assertContains(response, 'пост 2')
+        for query in context.captured_queries:
+            self.assertNotIn('COUNT(*)', query['sql'])
+        self.assertEqual(response.context['cl'].result_count, 3)
+
+    def test_month_hierarchy_from_buckets(self):
+        """Навигация по датам берёт годы и месяцы из PostMonth"""
+        PostMonth.objects.create(month='2001-02-01', posts_count=1)
+        response = self.client.get(CHANGELIST)
+        self.assertContains(response, '?pub_date__year=2001')
+        response = self.client.get(CHANGELIST, {'pub_date__year': 2001})
+        self.assertContains(response, 'pub_date__month=2')
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+    def test_month_hierarchy_invalid_params(self):
+        """Неверный год или месяц в адресе не роняет навигацию по датам"""
+        PostMonth.objects.create(month='2001-02-01', posts_count=1)
+        cl = self.client.get(CHANGELIST).context['cl']
+        for params, link in (({'pub_date__year': 'abc'},
+                              '?pub_date__year=2001'),
+                             ({'pub_date__year': '2001',
+                               'pub_date__month': '13'},
+                              'pub_date__month=2'),
+                             ({'pub_date__year': '2001',
+                               'pub_date__month': 'x'},
+                              'pub_date__month=2')):
+            with self.subTest(params=params):
+                cl.params = params
+                choices = post_month_hierarchy(cl)['choices']
+                self.assertIn(link, choices[0]['link'])
+                response = self.client.get(CHANGELIST, params)
+                self.assertIn(response.status_code, (200, 302))
+
+    def test_bulk_delete(self):
+        """Массовое удаление меняет счётчики без сохранения постов"""
+        Comment.objects.create(post=self.posts[0], author=self.user,
+                               text='комментарий')
+        TimelineEntry.objects.create(owner=self.admin, post=self.posts[0],
+                                     author=self.user,
+                                     pub_date=self.posts[0].pub_date)
+        with self.assertNumQueries(13):
+            deleted = bulk.delete_posts(Post.objects.filter(
+                pk__in=[post.pk for post in self.posts[:2]]))
+        self.assertEqual(deleted, 2)
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(TimelineEntry.objects.exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(AuthorStats.objects.get(user=self.user).posts_count,
+                         1)
+        self.assertEqual(PostMonth.objects.get(month=self.month).posts_count,
+                         1)
+
+    def test_clear_group_action(self):
+        """Действие «убрать из групп» — один UPDATE и счётчик группы"""
+        response = self.client.post(CHANGELIST, {
+            'action': 'clear_group',
+            '_selected_action': [post.pk for post in self.posts],
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
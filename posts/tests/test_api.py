@@ -0,0 +1,89 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from posts.api import QUERY_BUDGET
+from posts.models import Comment, Follow, Group, Post, User
+from posts.settings import API_PAGE_SIZE
+
+
+class ApiTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='ivan')
+        self.group = Group.objects.create(title='Коты', slug='cats')
+        self.posts = [
+            Post.objects.create(text=f'пост {i}', author=self.author,
+                                group=self.group)
+            for i in range(API_PAGE_SIZE + 5)
+        ]
+        self.post = self.posts[0]
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='комментарий')
+        Follow.objects.create(user=User.objects.create_user(username='petr'),
+                              author=self.author)
+        self.urls = {
+            'api_posts': reverse('api_posts'),
+            'api_group_posts': reverse('api_group_posts', args=['cats']),
+            'api_user_posts': reverse('api_user_posts', args=['ivan']),
+            'api_comments': reverse('api_comments', args=[self.post.pk]),
+            'api_user': reverse('api_user', args=['ivan']),
+            'api_groups': reverse('api_groups'),
+        }
+
+    def test_query_budget(self):
+        """Каждый эндпоинт укладывается в свой бюджет запросов"""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                with self.assertNumQueries(QUERY_BUDGET[name]):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_cursor_pagination(self):
+        """Курсор проходит все посты по (pub_date, id) без повторов"""
+        url, ids = self.urls['api_posts'], []
+        while url:
+            data = self.client.get(url).json()
+            ids.extend(row['id'] for row in data['results'])
+            url = data['next']
+        self.assertEqual(ids, [post.pk for post in reversed(self.posts)])
+
+    def test_sparse_fields(self):
+        """?fields= оставляет только запрошенные поля"""
+        data = self.client.get(self.urls['api_posts'],
+                               {'fields': 'text,author'}).json()
+        self.assertEqual(data['results'][0],
+                         {'text': self.posts[-1].text, 'author': 'ivan'})
+        self.assertIn('fields=text', data['next'])
+        response = self.client.get(self.urls['api_posts'],
+                                   {'fields': 'text,password'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['error'])
+
+    def test_etag(self):
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_comments(self):
+        url = self.urls['api_comments']
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='ещё')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def test_user_and_not_found(self):
+        data = self.client.get(self.urls['api_user']).json()
+        self.assertEqual(data['posts_count'], len(self.posts))
+        self.assertEqual(data['followers_count'], 1)
+        for url in [reverse('api_user', args=['nobody']),
+                    reverse('api_user_posts', args=['nobody']),
+                    reverse('api_group_posts', args=['nothing']),
+                    reverse('api_comments', args=[999])]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertEqual(response.json(), {'error': 'not found'})
@@ -1 +1,114 @@
-from django.core.cache import caches
\ No newline at end of file
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts import generations
+from posts.models import Comment, Post, User
+from posts.paginator import CursorPaginator
+from posts.settings import POSTS_ON_PAGE
+
+HOME_PAGE = reverse('index')
+
+
+class IndexCacheTest(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.user = User.objects.create_user(username='IvanovI')
+        self.post = Post.objects.create(text='первый пост', author=self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_index_is_cached_until_posts_change(self):
+        """Главная отдаётся из кеша, пока не изменились посты"""
+        content = self.guest_client.get(HOME_PAGE).content
+        # запись в обход сигналов не меняет поколение
+        Post.objects.filter(pk=self.post.pk).update(text='изменён')
+        self.assertEqual(self.guest_client.get(HOME_PAGE).content, content)
+
+        Post.objects.create(text='новый пост', author=self.user)
+        self.assertContains(self.guest_client.get(HOME_PAGE), 'новый пост')
+
+    def test_comment_invalidates_index(self):
+        """Новый комментарий сбрасывает кеш главной"""
+        self.guest_client.get(HOME_PAGE)
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='комментарий')
+        self.assertContains(self.guest_client.get(HOME_PAGE),
+                            'Комментариев: 1')
+
+    def test_cursor_direction_is_part_of_key(self):
+        """after=X и before=X не делят закешированный фрагмент"""
+        for i in range(POSTS_ON_PAGE * 3):
+            Post.objects.create(text=f'пост {i}', author=self.user)
+        second = self.guest_client.get(HOME_PAGE).context['page'].next_query
+        cursor = self.guest_client.get(
+            f'{HOME_PAGE}?{second}').context['page'].next_cursor
+        before = self.guest_client.get(HOME_PAGE, {'before': cursor})
+        after = self.guest_client.get(HOME_PAGE, {'after': cursor})
+        self.assertNotEqual(before.content, after.content)
+        third = CursorPaginator(Post.objects.all(), POSTS_ON_PAGE).get_page(
+            {'after': cursor})
+        for post in third:
+            self.assertContains(after, f'/{post.id}/')
+
+    def test_fragment_is_shared_by_viewers(self):
+        """Один фрагмент на всех: кнопка правки — только автору,
+        а попадание в кеш не выбирает страницу из базы"""
+        other = User.objects.create_user(username='PetrovP')
+        edit = reverse('post_edit', args=[self.user.username, self.post.pk])
+        self.guest_client.get(HOME_PAGE)
+        author_client, other_client = Client(), Client()
+        author_client.force_login(self.user)
+        other_client.force_login(other)
+        with mock.patch.object(CursorPaginator, 'fetch') as fetch:
+            own = author_client.get(HOME_PAGE)
+            foreign = other_client.get(HOME_PAGE)
+        fetch.assert_not_called()
+        self.assertContains(own, edit)
+        self.assertNotContains(foreign, edit)
+        self.assertNotContains(foreign, 'post-edit-slot')
+
+
+class GenerationsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_bump_changes_only_given_scope(self):
+        """bump меняет поколение только своей области"""
+        group = generations.group_scope(1)
+        before = generations.get_generation(group)
+        other = generations.get_generation(generations.GLOBAL_SCOPE)
+        generations.bump(group)
+        self.assertNotEqual(generations.get_generation(group), before)
+        self.assertEqual(
+            generations.get_generation(generations.GLOBAL_SCOPE), other)
+
+    def test_single_flight_serves_stale_while_locked(self):
+        """Пока фрагмент перестраивает другой воркер,
+        отдаётся предыдущая версия"""
+        cache.set('fragment:stale', 'старый')
+        cache.add('fragment:2:lock', 1)
+
+        def render():
+            raise AssertionError('фрагмент не должен рендериться')
+
+        self.assertEqual(
+            generations.single_flight('fragment:2', 'fragment:stale',
+                                      render),
+            'старый')
+
+    def test_single_flight_stores_fragment(self):
+        """Воркер с блокировкой сохраняет фрагмент и снимает блокировку"""
+        content = generations.single_flight('fragment:3', 'fragment:stale',
+                                            lambda: 'новый')
+        self.assertEqual(content, 'новый')
+        self.assertEqual(cache.get('fragment:3'), 'новый')
+        self.assertEqual(cache.get('fragment:stale'), 'новый')
+        self.assertIsNone(cache.get('fragment:3:lock'))
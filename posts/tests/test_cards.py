@@ -0,0 +1,87 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.cards import EDIT_SLOT, card_key, render_cards
+from posts.models import Group, Post, User
+
+
+class PostCardsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='IvanovI')
+        self.user_2 = User.objects.create_user(username='PetrovP')
+        self.posts = [Post.objects.create(text=f'пост {i}', author=self.user)
+                      for i in range(3)]
+        self.edit_page = reverse('post_edit',
+                                 args=[self.user.username, self.posts[0].id])
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_cards_are_cached_without_viewer_parts(self):
+        """В кеше карточки нет кнопки редактирования, только метка"""
+        render_cards(self.posts, self.user)
+        card = cache.get(card_key(self.posts[0]))
+        self.assertIn(EDIT_SLOT, card)
+        self.assertNotIn(self.edit_page, card)
+
+    def test_edit_button_only_for_author(self):
+        """Кнопка редактирования видна только автору поста"""
+        own = render_cards(self.posts, self.user)[0]
+        foreign = render_cards(self.posts, self.user_2)[0]
+        guest = render_cards(self.posts, AnonymousUser())[0]
+        self.assertIn(self.edit_page, own)
+        self.assertNotIn(self.edit_page, foreign)
+        self.assertNotIn(self.edit_page, guest)
+        self.assertNotIn(EDIT_SLOT, own + foreign + guest)
+
+    def test_only_missing_cards_are_rendered(self):
+        """Из кеша берутся готовые карточки, рендерятся только промахи"""
+        cache.set(card_key(self.posts[0]), 'из кеша')
+        cards = render_cards(self.posts, self.user)
+        self.assertEqual(cards[0], 'из кеша')
+        self.assertIn('пост 1', cards[1])
+
+    def test_changed_post_gets_new_card(self):
+        """Изменённый пост получает новую карточку"""
+        render_cards(self.posts)
+        post = self.posts[0]
+        post.text = 'новый текст'
+        post.save()
+        self.assertIn('новый текст', render_cards([post])[0])
+
+    def test_group_and_author_changes_renew_cards(self):
+        """Правка группы и имени автора обновляет карточки постов"""
+        group = Group.objects.create(title='Старое', slug='old')
+        post = Post.objects.create(text='текст', author=self.user,
+                                   group=group)
+
+        def card():
+            post.refresh_from_db()
+            return render_cards([post])[0]
+
+        self.assertIn('#Старое', card())
+        group.title, group.slug = 'Новое', 'new'
+        group.save()
+        self.assertIn('#Новое', card())
+        self.assertIn(reverse('group_posts', args=['new']), card())
+        self.user.username = 'renamed'
+        self.user.save()
+        self.assertIn('@renamed', card())
+        group.delete()
+        self.assertNotIn('/group/', card())
+
+    def test_login_does_not_touch_posts(self):
+        """Вход пользователя (last_login) не обновляет его посты"""
+        before = Post.objects.get(pk=self.posts[0].pk).modified
+        Client().force_login(self.user)
+        self.assertEqual(Post.objects.get(pk=self.posts[0].pk).modified,
+                         before)
+
+    def test_profile_page_uses_cached_cards(self):
+        """Лента профиля показывает карточки из кеша"""
+        cache.set(card_key(self.posts[0]), 'из кеша')
+        response = Client().get(reverse('profile', args=[self.user.username]))
+        self.assertContains(response, 'из кеша')
@@ -0,0 +1,119 @@
+from django.core.cache import cache
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(title="Тест-название",
+                                          slug='test_slug',
+                                          description="Тест-описание")
+        self.user = User.objects.create_user(username='IvanovI')
+        self.guest_client = Client()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.post = Post.objects.create(text="Ж" * 50, group=self.group,
+                                        author=self.user)
+        self.urls = [
+            reverse('index'),
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.user.username]),
+            reverse('post', args=[self.user.username, self.post.id]),
+        ]
+
+    def tearDown(self):
+        cache.clear()
+
+    def test_unchanged_page_returns_304(self):
+        """Повторный запрос с тем же ETag получает 304"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(url)
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertIn('Cookie', response['Vary'])
+                etag = response['ETag']
+                with self.assertNumQueries(1):
+                    response = self.guest_client.get(
+                        url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_invalidate_etag(self):
+        """Новый комментарий меняет ETag всех страниц поста"""
+        etags = {url: self.guest_client.get(url)['ETag']
+                 for url in self.urls}
+        Comment.objects.create(post=self.post, author=self.user,
+                               text='комментарий')
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=etags[url])
+                self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        """У гостя и пользователя разные ETag"""
+        url = self.urls[0]
+        self.assertNotEqual(self.guest_client.get(url)['ETag'],
+                            self.authorized_client.get(url)['ETag'])
+
+    def test_missing_objects_are_not_found(self):
+        """Для несуществующих объектов по-прежнему 404"""
+        for url in [reverse('group_posts', args=['missing']),
+                    reverse('post', args=[self.user.username, 999])]:
+            with self.subTest(url=url):
+                self.assertEqual(self.guest_client.get(url).status_code, 404)
+
+
+class ConditionalInvalidationTest(TransactionTestCase):
+    # поколения меняются в transaction.on_commit
+    def setUp(self):
+        cache.clear()
+        self.group = Group.objects.create(title="Тест-название",
+                                          slug='test_slug',
+                                          description="Тест-описание")
+        self.user = User.objects.create_user(username='IvanovI')
+        self.post = Post.objects.create(text="текст", group=self.group,
+                                        author=self.user)
+        self.group_page = reverse('group_posts', args=[self.group.slug])
+        self.profile_page = reverse('profile', args=[self.user.username])
+
+    def tearDown(self):
+        cache.clear()
+
+    def assertChanged(self, url, change):
+        etag = self.client.get(url)['ETag']
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_group_and_author_edits_change_etag(self):
+        """Правка описания группы и имени автора меняет ETag"""
+        def describe():
+            self.group.description = 'Новое описание'
+            self.group.save()
+
+        def rename():
+            self.user.first_name = 'Иван'
+            self.user.save()
+
+        self.assertChanged(self.group_page, describe)
+        self.assertChanged(self.profile_page, rename)
+
+    def test_delete_and_follow_change_etag(self):
+        """Удаление поста и подписка меняют ETag, хотя время
+        изменения оставшихся постов прежнее"""
+        other = Post.objects.create(text="другой", author=self.user)
+        follower = User.objects.create_user(username='PetrovP')
+        self.assertChanged(self.profile_page, other.delete)
+        self.assertChanged(
+            self.profile_page,
+            lambda: Follow.objects.create(user=follower, author=self.user))
+
+    def test_if_modified_since_alone_is_not_304(self):
+        """Без ETag страница не считается неизменной"""
+        response = self.client.get(
+            self.profile_page,
+            HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
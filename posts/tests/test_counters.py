@@ -0,0 +1,77 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import AuthorStats, Comment, Group, Post, User
+
+
+class CountersTest(TestCase):
+    def setUp(self):
+        self.group = Group.objects.create(title="Тест-название",
+                                          slug='test_slug',
+                                          description="Тест-описание")
+        self.group_2 = Group.objects.create(title="Другая группа",
+                                            slug='other',
+                                            description="Тест-описание")
+        self.user = User.objects.create_user(username='IvanovI')
+        self.post = Post.objects.create(text="Ж" * 50,
+                                        group=self.group,
+                                        author=self.user)
+
+    def assertCounters(self, group, group_2, author, comments):
+        self.group.refresh_from_db()
+        self.group_2.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual(self.group.posts_count, group)
+        self.assertEqual(self.group_2.posts_count, group_2)
+        self.assertEqual(self.user.stats.posts_count, author)
+        self.assertEqual(self.post.comments_count, comments)
+
+    def test_counters_follow_create_and_delete(self):
+        """Счётчики меняются при создании и удалении записей"""
+        self.assertCounters(1, 0, 1, 0)
+        comment = Comment.objects.create(post=self.post, author=self.user,
+                                         text='комментарий')
+        self.assertCounters(1, 0, 1, 1)
+        comment.delete()
+        self.assertCounters(1, 0, 1, 0)
+        Post.objects.create(text="Ж", author=self.user)
+        self.user.stats.refresh_from_db()
+        self.assertCounters(1, 0, 2, 0)
+
+    def test_group_change_moves_counter(self):
+        """Смена группы поста переносит счётчик между группами"""
+        self.post.group = self.group_2
+        self.post.save()
+        self.assertCounters(0, 1, 1, 0)
+
+    def test_drifted_counters_do_not_block_delete(self):
+        """Отставший счётчик не мешает удалению и не уходит ниже нуля"""
+        comment = Comment.objects.create(post=self.post, author=self.user,
+                                         text='комментарий')
+        Post.objects.filter(pk=self.post.pk).update(comments_count=0)
+        Group.objects.update(posts_count=0)
+        AuthorStats.objects.update(posts_count=0)
+        comment.delete()
+        self.post.delete()
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(AuthorStats.objects.get(user=self.user).posts_count,
+                         0)
+
+    def test_rebuild_command_fixes_drift(self):
+        """Команда rebuild_counters находит и исправляет расхождения"""
+        Post.objects.filter(pk=self.post.pk).update(comments_count=5)
+        Group.objects.update(posts_count=7)
+        AuthorStats.objects.all().delete()
+        out = StringIO()
+        call_command('rebuild_counters', '--dry-run', stdout=out)
+        self.assertIn('Post.comments_count: расхождений 1', out.getvalue())
+        self.assertIn('Group.posts_count: расхождений 2', out.getvalue())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 5)
+
+        call_command('rebuild_counters', stdout=StringIO())
+        self.user = User.objects.get(pk=self.user.pk)
+        self.assertCounters(1, 0, 1, 0)
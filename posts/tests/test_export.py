@@ -0,0 +1,84 @@
+import csv
+import gzip
+import json
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+
+from posts import export
+from posts.models import Group, Post, User
+
+
+class ExportPostsTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='ivan')
+        self.group = Group.objects.create(title='Коты', slug='cats')
+        self.posts = [
+            Post.objects.create(text=f'пост {i}\nвторая строка',
+                                author=self.author,
+                                group=self.group if i % 2 else None)
+            for i in range(5)
+        ]
+        Post.objects.create(text='чужой', author=User.objects.create_user(
+            username='petr'))
+        self.client.force_login(self.author)
+        self.url = reverse('profile_export', args=['ivan'])
+
+    def content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_jsonl_has_all_post_fields(self):
+        """В выгрузке все поля Post, автор и группа — по имени и slug"""
+        with self.assertNumQueries(3):
+            # сессия, пользователь, автор выгрузки; посты — при чтении
+            response = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            lines = self.content(response).decode().splitlines()
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[1]), {field.name for field
+                                        in Post._meta.concrete_fields})
+        self.assertEqual(rows[1]['author'], 'ivan')
+        self.assertEqual(rows[1]['group'], 'cats')
+        self.assertEqual(rows[0]['group'], None)
+        self.assertEqual([row['id'] for row in rows],
+                         [post.pk for post in self.posts])
+
+    def test_csv_gzip(self):
+        response = self.client.get(
+            reverse('group_export', args=['cats']),
+            {'format': 'csv', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('group-cats.csv.gz', response['Content-Disposition'])
+        text = gzip.decompress(self.content(response)).decode()
+        rows = list(csv.DictReader(StringIO(text)))
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows[0]['text'], 'пост 1\nвторая строка')
+
+    def test_export_requires_login(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_blocks_are_bounded(self):
+        """Строки склеиваются в блоки, а не отдаются по одной"""
+        blocks = list(export.stream(Post.objects.all()))
+        self.assertEqual(len(blocks), 1)
+
+    def test_command_roundtrip(self):
+        """Выгрузку команды можно снова загрузить через import_posts"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'posts.jsonl')
+        call_command('export_posts', '--author', 'ivan', '-o', path)
+        Post.objects.filter(author=self.author).delete()
+        call_command('import_posts', path, stdout=StringIO())
+        self.assertEqual(
+            list(Post.objects.filter(author=self.author).order_by('pk')
+                 .values_list('text', 'group__slug', 'pub_date')),
+            [(post.text, post.group and post.group.slug, post.pub_date)
+             for post in self.posts])
@@ -0,0 +1,73 @@
+from django.core.cache import cache
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Group, Post, User
+
+
+class FeedsTest(TransactionTestCase):
+    # поколения кеша меняются в transaction.on_commit
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='ivan')
+        self.group = Group.objects.create(title='Коты', slug='cats',
+                                          description='Про котов')
+        self.post = Post.objects.create(text='пост в группе',
+                                        author=self.author, group=self.group)
+        self.other = Post.objects.create(
+            text='чужой пост',
+            author=User.objects.create_user(username='petr'))
+        self.urls = [
+            reverse('posts_rss'), reverse('posts_atom'),
+            reverse('group_rss', args=['cats']),
+            reverse('group_atom', args=['cats']),
+            reverse('author_rss', args=['ivan']),
+            reverse('author_atom', args=['ivan']),
+        ]
+
+    def test_feed_items_by_scope(self):
+        response = self.client.get(reverse('posts_rss'))
+        self.assertContains(response, 'пост в группе')
+        self.assertContains(response, 'чужой пост')
+        for url in self.urls[2:]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(response, 'пост в группе')
+                self.assertNotContains(response, 'чужой пост')
+        self.assertEqual(
+            self.client.get(reverse('group_atom', args=['cats']))
+            ['Content-Type'], 'application/atom+xml; charset=utf-8')
+
+    def test_cached_feed_costs_one_query(self):
+        """Повторный опрос: только запрос состояния, тело из кеша"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                first = self.client.get(url)
+                with self.assertNumQueries(1):
+                    second = self.client.get(url)
+                self.assertEqual(first.content, second.content)
+
+    def test_not_modified(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                etag = self.client.get(url)['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code, 304)
+
+    def test_feed_changes_with_posts(self):
+        """Новый пост группы обновляет ленты группы, но не чужого автора"""
+        author_feed = reverse('author_rss', args=['petr'])
+        before = self.client.get(author_feed).content
+        self.client.get(reverse('group_rss', args=['cats']))
+        Post.objects.create(text='новый пост', author=self.author,
+                            group=self.group)
+        self.assertContains(self.client.get(
+            reverse('group_rss', args=['cats'])), 'новый пост')
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(author_feed).content, before)
+
+    def test_unknown_scope(self):
+        for url in [reverse('group_rss', args=['nothing']),
+                    reverse('author_atom', args=['nobody'])]:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 404)
@@ -0,0 +1,111 @@
+from unittest import mock
+
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+
+from posts.models import Follow, Post, TimelineEntry, User
+
+FOLLOW_INDEX = reverse('follow_index')
+
+
+class FollowViewsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='IvanovI')
+        self.author = User.objects.create_user(username='PetrovP')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        self.follow_page = reverse('profile_follow',
+                                   args=[self.author.username])
+        self.unfollow_page = reverse('profile_unfollow',
+                                     args=[self.author.username])
+
+    def test_follow_and_unfollow(self):
+        """Пользователь подписывается и отписывается, счётчики верны"""
+        self.authorized_client.post(self.follow_page)
+        self.authorized_client.post(self.follow_page)
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+        self.assertEqual(self.user.stats.following_count, 1)
+
+        self.authorized_client.post(self.unfollow_page)
+        self.assertFalse(Follow.objects.exists())
+        self.author.stats.refresh_from_db()
+        self.assertEqual(self.author.stats.followers_count, 0)
+
+    def test_cannot_follow_self(self):
+        """Подписаться на самого себя нельзя"""
+        self.authorized_client.post(
+            reverse('profile_follow', args=[self.user.username]))
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_requires_post(self):
+        """GET не подписывает и не отписывает"""
+        for page in (self.follow_page, self.unfollow_page):
+            with self.subTest(page=page):
+                response = self.authorized_client.get(page)
+                self.assertEqual(response.status_code, 405)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_follow_requires_csrf_token(self):
+        """Подписка без CSRF-токена отклоняется"""
+        client = Client(enforce_csrf_checks=True)
+        client.force_login(self.user)
+        response = client.post(self.follow_page)
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_profile_has_follow_form(self):
+        """На странице профиля — форма подписки с CSRF-токеном"""
+        response = self.authorized_client.get(
+            reverse('profile', args=[self.author.username]))
+        self.assertContains(
+            response, f'<form method="post" action="{self.follow_page}">')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+
+    def test_guest_redirected_to_login(self):
+        """Гость не может смотреть ленту подписок"""
+        response = Client().get(FOLLOW_INDEX)
+        self.assertRedirects(response,
+                             reverse('login') + '?next=' + FOLLOW_INDEX)
+
+
+class TimelineTest(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='IvanovI')
+        self.author = User.objects.create_user(username='PetrovP')
+        self.stranger = User.objects.create_user(username='SidorovS')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+        Follow.objects.create(user=self.user, author=self.author)
+
+    def feed(self):
+        return list(self.authorized_client.get(FOLLOW_INDEX).context['page'])
+
+    def test_new_post_is_fanned_out_to_followers(self):
+        """Пост подписанного автора попадает в ленту, чужой — нет"""
+        post = Post.objects.create(text='пост автора', author=self.author)
+        Post.objects.create(text='чужой пост', author=self.stranger)
+        self.assertTrue(TimelineEntry.objects.filter(
+            owner=self.user, post=post).exists())
+        self.assertEqual(self.feed(), [post])
+
+    def test_follow_backfills_and_unfollow_clears_timeline(self):
+        """При подписке лента дополняется, при отписке очищается"""
+        post = Post.objects.create(text='чужой пост', author=self.stranger)
+        follow = Follow.objects.create(user=self.user, author=self.stranger)
+        self.assertEqual(self.feed(), [post])
+        follow.delete()
+        self.assertEqual(self.feed(), [])
+
+    @mock.patch('posts.timeline.FANOUT_FOLLOWERS_LIMIT', 2)
+    def test_popular_author_is_merged_at_read_time(self):
+        """Посты популярного автора не раскладываются,
+        а подмешиваются в ленту при чтении"""
+        Follow.objects.create(user=self.stranger, author=self.author)
+        Follow.objects.create(user=self.user, author=self.stranger)
+        first = Post.objects.create(text='первый', author=self.author)
+        second = Post.objects.create(text='второй', author=self.stranger)
+        third = Post.objects.create(text='третий', author=self.author)
+        self.assertFalse(TimelineEntry.objects.filter(post=first).exists())
+        self.assertTrue(TimelineEntry.objects.filter(post=second).exists())
+        self.assertEqual(self.feed(), [third, second, first])
@@ -0,0 +1,155 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from posts import counters
+from posts.importer import Importer, read_records
+from posts.models import (AuthorStats, Comment, Follow, Group, Post,
+                          PostMonth, TimelineEntry, User)
+
+RECORDS = [
+    {"author": "ivan", "text": "первый", "group": "cats",
+     "pub_date": "2019-03-01T10:00:00",
+     "comments": [{"author": "petr", "text": "ответ",
+                   "created": "2019-03-02T10:00:00"}]},
+    {"author": "ivan", "text": "второй", "pub_date": "2019-04-01T10:00:00"},
+    {"author": "nobody", "text": "неизвестный автор"},
+    {"author": "petr", "text": ""},
+    {"author": "petr", "text": "третий"},
+]
+
+
+class ImportPostsTest(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.ivan = User.objects.create_user(username='ivan')
+        self.petr = User.objects.create_user(username='petr')
+        self.group = Group.objects.create(title='Коты', slug='cats')
+        Follow.objects.create(user=self.petr, author=self.ivan)
+        self.path = self.write('posts.jsonl', RECORDS)
+
+    def write(self, name, records):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as file:
+            for record in records:
+                file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            file.write('не json\n')
+        return path
+
+    def run_import(self, *args):
+        output, errors = StringIO(), StringIO()
+        call_command('import_posts', self.path, *args,
+                     stdout=output, stderr=errors)
+        return output.getvalue(), errors.getvalue()
+
+    def test_import_keeps_dates_and_counters(self):
+        """Посты, комментарии, даты и счётчики как при обычном создании"""
+        output, errors = self.run_import('--chunk-size', '2')
+        self.assertIn('Постов: 3, комментариев: 1, пропущено записей: 3',
+                      output)
+        self.assertIn('неизвестный автор', errors)
+        first = Post.objects.get(text='первый')
+        self.assertEqual(first.pub_date, timezone.make_aware(
+            datetime(2019, 3, 1, 10)))
+        self.assertEqual(first.group, self.group)
+        self.assertEqual(first.comments_count, 1)
+        self.assertEqual(Comment.objects.get().created, timezone.make_aware(
+            datetime(2019, 3, 2, 10)))
+        self.assertEqual(AuthorStats.objects.get(user=self.ivan).posts_count,
+                         2)
+        self.group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(PostMonth.objects.count(), 3)
+        self.assertFalse(any(counters.find_drift().values()))
+        self.assertEqual(TimelineEntry.objects.filter(owner=self.petr)
+                         .count(), 2)
+        # auto_now_add возвращается на место
+        self.assertNotEqual(Post.objects.create(
+            text='новый', author=self.ivan).pub_date.year, 2019)
+
+    def test_import_resumes_from_checkpoint(self):
+        """Прерванный импорт продолжается без повторов"""
+        checkpoint = self.path + '.checkpoint'
+        importer = Importer(self.path, checkpoint, chunk_size=2)
+
+        def interrupt(importer, seconds):
+            raise KeyboardInterrupt
+
+        with open(self.path, encoding='utf-8') as file:
+            with self.assertRaises(KeyboardInterrupt):
+                importer.run(read_records(file, 'jsonl'), interrupt)
+        self.assertTrue(os.path.exists(checkpoint))
+        self.assertEqual(Post.objects.count(), 2)
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertFalse(os.path.exists(checkpoint))
+
+    def test_csv_and_create_missing(self):
+        self.path = os.path.join(self.directory, 'posts.csv')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            file.write('author,text,group,pub_date\n'
+                       'anna,"строка\nвторая",dogs,2020-01-01T00:00:00\n')
+        output, errors = self.run_import('--create-missing')
+        post = Post.objects.get(author__username='anna')
+        self.assertEqual(post.text, 'строка\nвторая')
+        self.assertEqual(post.group.slug, 'dogs')
+        self.assertFalse(post.author.has_usable_password())
+
+    def test_dates_leave_fields_unchanged(self):
+        """Даты из файла не выключают auto_now_add у полей модели:
+        их видят посты, которые сохраняются параллельно"""
+        fields = [Post._meta.get_field('pub_date'),
+                  Comment._meta.get_field('created')]
+        bulk_create = Post.objects.bulk_create
+
+        def check(*args, **kwargs):
+            self.assertTrue(all(field.auto_now_add for field in fields))
+            return bulk_create(*args, **kwargs)
+
+        with mock.patch.object(Post.objects, 'bulk_create', check):
+            self.run_import()
+        self.assertEqual(Post.objects.get(text='первый').pub_date,
+                         timezone.make_aware(datetime(2019, 3, 1, 10)))
+
+    def test_ids_are_read_under_write_lock(self):
+        """MAX(id) читается после блокировки таблицы на запись"""
+        with CaptureQueriesContext(connection) as queries:
+            self.run_import()
+        sql = [query['sql'] for query in queries.captured_queries]
+        last = next(number for number, query in enumerate(sql)
+                    if 'MAX(' in query)
+        self.assertTrue(any(query.startswith('UPDATE "posts_post"')
+                            for query in sql[:last]))
+        self.assertEqual(Post.objects.count(), 3)
+
+    def test_committed_chunk_is_not_imported_twice(self):
+        """Падение между коммитом порции и записью контрольной
+        точки не вставляет порцию повторно"""
+        checkpoint = self.path + '.checkpoint'
+        importer = Importer(self.path, checkpoint, chunk_size=2)
+        save = importer.save_checkpoint
+
+        def crash(**kwargs):
+            if not kwargs:
+                raise KeyboardInterrupt
+            save(**kwargs)
+
+        with open(self.path, encoding='utf-8') as file, \
+                mock.patch.object(importer, 'save_checkpoint', crash):
+            with self.assertRaises(KeyboardInterrupt):
+                importer.run(read_records(file, 'jsonl'))
+        self.assertEqual(Post.objects.count(), 2)
+        self.run_import()
+        self.assertEqual(Post.objects.count(), 3)
+        self.assertEqual(Comment.objects.count(), 1)
@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import Client, TestCase, override_settings
+
+from yatube.media import IMMUTABLE, MUTABLE
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = b'0123456789'
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_ACCEL='')
+class MediaTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        self.client = Client()
+        self.name = default_storage.save('posts/file.txt',
+                                         ContentFile(CONTENT))
+        self.url = '/media/' + self.name
+
+    def test_names_contain_content_hash(self):
+        """Имя файла содержит хеш; те же байты — тот же файл"""
+        self.assertRegex(self.name, r'^posts/file\.[0-9a-f]{12}\.txt$')
+        same = default_storage.save('posts/file.txt', ContentFile(CONTENT))
+        other = default_storage.save('posts/file.txt', ContentFile(b'x'))
+        self.assertEqual(same, self.name)
+        self.assertNotEqual(other, self.name)
+
+    def test_hashed_file_is_immutable(self):
+        """Файл с хешем в имени кешируется навсегда"""
+        response = self.client.get(self.url)
+        self.assertEqual(b''.join(response.streaming_content), CONTENT)
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+        self.assertEqual(response['Accept-Ranges'], 'bytes')
+
+    def test_old_names_are_not_immutable(self):
+        """Файлы со старыми именами без хеша кешируются ненадолго"""
+        with open(f'{MEDIA_ROOT}/old.txt', 'wb') as file:
+            file.write(CONTENT)
+        response = self.client.get('/media/old.txt')
+        self.assertEqual(response['Cache-Control'], MUTABLE)
+
+    def test_ranges(self):
+        """Django отдаёт части файла по заголовку Range"""
+        cases = {
+            'bytes=2-5': (206, b'2345', 'bytes 2-5/10'),
+            'bytes=7-': (206, b'789', 'bytes 7-9/10'),
+            'bytes=-3': (206, b'789', 'bytes 7-9/10'),
+            'bytes=20-': (416, b'', 'bytes */10'),
+        }
+        for header, (status, body, content_range) in cases.items():
+            with self.subTest(range=header):
+                response = self.client.get(self.url, HTTP_RANGE=header)
+                self.assertEqual(response.status_code, status)
+                self.assertEqual(response['Content-Range'], content_range)
+                content = (b''.join(response.streaming_content)
+                           if response.streaming else response.content)
+                self.assertEqual(content, body)
+
+    @override_settings(MEDIA_ACCEL='nginx')
+    def test_nginx_serves_bytes(self):
+        """С nginx Django отдаёт только заголовок X-Accel-Redirect"""
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'],
+                         '/protected-media/' + self.name)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Cache-Control'], IMMUTABLE)
+
+    @override_settings(MEDIA_ACCEL='sendfile')
+    def test_sendfile(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Sendfile'], default_storage.path(
+            self.name))
+
+    def test_paths_outside_media_root(self):
+        """Пути за пределами MEDIA_ROOT и отсутствующие файлы — 404"""
+        for path in ['/media/../manage.py', '/media/%2e%2e/manage.py',
+                     '/media/posts/missing.txt', '/media/posts/']:
+            with self.subTest(path=path):
+                self.assertEqual(self.client.get(path).status_code, 404)
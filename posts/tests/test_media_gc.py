@@ -0,0 +1,120 @@
+import os
+import shutil
+import tempfile
+import time
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from posts import thumbnails
+from posts.media_gc import Collector, referenced_thumbnails
+from posts.models import Post, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+OLD = time.time() - 3 * 24 * 3600
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class MediaGarbageTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        self.user = User.objects.create_user(username='IvanovI')
+        self.post = Post.objects.create(text='текст', author=self.user)
+        self.post.image.save('kept.png', ContentFile(b'kept'))
+        self.kept = self.post.image.name
+        self.thumbnail = sorted(thumbnails.thumbnail_names(
+            self.post.image))[0]
+        self.orphans = ['posts/a.txt', 'posts/b.txt', 'cache/00/11/c.jpg']
+        for name in [self.thumbnail] + self.orphans:
+            self.write(name)
+        self.write('posts/fresh.txt', old=False)
+        for name in [self.kept]:
+            os.utime(self.path(name), (OLD, OLD))
+        self.checkpoint = os.path.join(MEDIA_ROOT, '.checkpoint')
+
+    def path(self, name):
+        return os.path.join(MEDIA_ROOT, name)
+
+    def write(self, name, old=True):
+        os.makedirs(os.path.dirname(self.path(name)), exist_ok=True)
+        with open(self.path(name), 'wb') as file:
+            file.write(b'x' * 10)
+        if old:
+            os.utime(self.path(name), (OLD, OLD))
+
+    def exists(self, name):
+        return os.path.exists(self.path(name))
+
+    def test_deletes_only_old_unreferenced_files(self):
+        """Удаляются старые файлы без ссылок, остальные остаются"""
+        output = StringIO()
+        call_command('collect_media_garbage', '--checkpoint',
+                     self.checkpoint, stdout=output)
+        for name in self.orphans:
+            self.assertFalse(self.exists(name), name)
+        for name in [self.kept, self.thumbnail, 'posts/fresh.txt']:
+            self.assertTrue(self.exists(name), name)
+        self.assertIn('Удалено: 3', output.getvalue())
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_dry_run_deletes_nothing(self):
+        call_command('collect_media_garbage', '--dry-run', '--checkpoint',
+                     self.checkpoint, stdout=StringIO())
+        for name in self.orphans:
+            self.assertTrue(self.exists(name), name)
+
+    def test_resumes_from_checkpoint(self):
+        """Прерванный обход продолжается с контрольной точки"""
+        first = Collector(MEDIA_ROOT, self.checkpoint, grace=3600)
+        self.assertFalse(first.run(limit=2, checkpoint_every=1))
+        self.assertTrue(os.path.exists(self.checkpoint))
+        second = Collector(MEDIA_ROOT, self.checkpoint, grace=3600)
+        self.assertTrue(second.run())
+        self.assertEqual(first.scanned + second.scanned, 6)
+        self.assertEqual(first.deleted + second.deleted, 3)
+        self.assertEqual(first.reclaimed + second.reclaimed, 30)
+
+    def test_file_referenced_after_scan_start_is_kept(self):
+        """Файл, на который сослался новый пост, не удаляется"""
+        Post.objects.create(text='новый', author=self.user,
+                            image='posts/a.txt')
+        Collector(MEDIA_ROOT, self.checkpoint, grace=3600).run()
+        self.assertTrue(self.exists('posts/a.txt'))
+
+    def test_references_checked_in_batches(self):
+        """Ссылки на загрузки проверяются одним запросом на пачку"""
+        for i in range(20):
+            self.write(f'posts/orphan{i}.txt')
+        collector = Collector(MEDIA_ROOT, self.checkpoint, grace=3600)
+        # по одной проверке миниатюр и загрузок на пачку
+        with self.assertNumQueries(2):
+            collector.run()
+        self.assertEqual(collector.deleted, 23)
+
+    def test_thumbnails_checked_against_batch(self):
+        """Миниатюры сверяются с пачкой путей, а не собираются
+        для всех постов"""
+        self.assertEqual(
+            referenced_thumbnails([self.thumbnail, 'cache/00/11/c.jpg']),
+            {self.thumbnail})
+        with self.assertNumQueries(0):
+            self.assertEqual(referenced_thumbnails([]), set())
+
+    def test_resumed_run_skips_thumbnail_scan(self):
+        """Продолжение за каталогом миниатюр не перебирает все посты"""
+        first = Collector(MEDIA_ROOT, self.checkpoint, grace=3600)
+        self.assertFalse(first.run(limit=2, checkpoint_every=1))
+        second = Collector(MEDIA_ROOT, self.checkpoint, grace=3600)
+        with self.assertNumQueries(1):
+            self.assertTrue(second.run())
+        self.assertEqual(first.deleted + second.deleted, 3)
+        self.assertTrue(self.exists(self.kept))
@@ -0,0 +1,88 @@
+from django.http import QueryDict
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Post, User
+from posts.paginator import CursorPaginator
+from posts.settings import POSTS_ON_PAGE
+
+HOME_PAGE = reverse('index')
+POSTS_COUNT = POSTS_ON_PAGE * 2 + 3
+
+
+class CursorPaginatorTest(TestCase):
+    def setUp(self):
+        self.guest_client = Client()
+        author = User.objects.create_user(username='test_user')
+        for i in range(POSTS_COUNT):
+            Post.objects.create(text=f'Пост {i}', author=author)
+        # одинаковая дата у всех постов: порядок держится только на id
+        Post.objects.update(pub_date=timezone.now())
+        self.expected = list(Post.objects.order_by('-pub_date', '-id'))
+
+    def walk_forward(self):
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_PAGE)
+        pages = [paginator.get_page(QueryDict())]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(
+                QueryDict(pages[-1].next_query)))
+        return paginator, pages
+
+    def test_pages_cover_all_posts_in_order(self):
+        """Курсоры проходят все записи без пропусков и повторов"""
+        _, pages = self.walk_forward()
+        posts = [post for page in pages for post in page]
+        self.assertEqual(posts, self.expected)
+        self.assertFalse(pages[0].has_previous())
+        self.assertTrue(pages[-1].has_previous())
+
+    def test_previous_cursor_returns_previous_page(self):
+        """Курсор before возвращает предыдущую страницу"""
+        paginator, pages = self.walk_forward()
+        page = paginator.get_page(QueryDict(pages[1].previous_query))
+        self.assertEqual(list(page), list(pages[0]))
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_invalid_cursor_is_not_found(self):
+        """Битый курсор — 404, а не новая страница в кеше"""
+        for cursor in ('!!!', 'WyJ4Il0', 'WzEsMl0'):
+            with self.subTest(cursor=cursor):
+                response = self.guest_client.get(HOME_PAGE,
+                                                 {'after': cursor})
+                self.assertEqual(response.status_code, 404)
+
+    def test_cursor_key_is_normalized(self):
+        """Одинаковые курсоры в разной записи дают один ключ"""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_PAGE)
+        cursor = paginator.encode_cursor(self.expected[3])
+        # base64 допускает дописанные «=»
+        self.assertEqual(paginator.cursor_key({'after': cursor}),
+                         paginator.cursor_key({'after': cursor + '=='}))
+        self.assertNotEqual(paginator.cursor_key({'after': cursor}),
+                            paginator.cursor_key({'before': cursor}))
+        self.assertEqual(paginator.cursor_key({}), 'first')
+
+    def test_page_does_not_count_rows(self):
+        """Страница не выполняет COUNT(*) и OFFSET"""
+        _, pages = self.walk_forward()
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_PAGE)
+        with self.assertNumQueries(1) as queries:
+            paginator.get_page(QueryDict(pages[1].next_query))
+        sql = queries.captured_queries[0]['sql']
+        self.assertNotIn('COUNT(', sql)
+        self.assertNotIn('OFFSET', sql)
+
+    def test_empty_page_has_no_links(self):
+        """Курсор за краем выборки даёт пустую страницу без ссылок"""
+        paginator = CursorPaginator(Post.objects.all(), POSTS_ON_PAGE)
+        for param, post in (('before', self.expected[0]),
+                            ('after', self.expected[-1])):
+            with self.subTest(param=param):
+                query = {param: paginator.encode_cursor(post)}
+                page = paginator.get_page(query)
+                self.assertEqual(list(page), [])
+                self.assertFalse(page.has_other_pages())
+                response = self.guest_client.get(HOME_PAGE, query)
+                self.assertNotContains(response, '?None')
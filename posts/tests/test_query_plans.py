@@ -0,0 +1,99 @@
+import re
+import unittest
+
+from django.db import connection
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+
+from posts import conditional, media_gc
+from posts.models import Comment, Group, Post, User
+from posts.paginator import CursorPaginator
+from posts.settings import POSTS_ON_PAGE
+
+# полный проход по таблице без индекса: «SCAN posts_post» без USING
+FULL_SCAN = re.compile(r'\bSCAN (posts_\w+)(?! USING)(?: AS \w+)?\s*$')
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite',
+                     'EXPLAIN QUERY PLAN есть только в SQLite')
+class FeedQueryPlansTest(TestCase):
+    """Запросы лент должны идти по индексу: без полного прохода
+    по таблице и без сортировки во временном B-дереве."""
+
+    def setUp(self):
+        self.group = Group.objects.create(title="Тест-название",
+                                          slug='test_slug',
+                                          description="Тест-описание")
+        self.author = User.objects.create_user(username='test_user')
+        for i in range(POSTS_ON_PAGE + 1):
+            Post.objects.create(text="Ж" * i, group=self.group,
+                                author=self.author)
+        self.post = Post.objects.first()
+
+    def explain(self, query):
+        """План запроса: queryset или готовый SQL."""
+        if isinstance(query, str):
+            sql, params = query, ()
+        else:
+            sql, params = query.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            return [row[-1] for row in cursor.fetchall()]
+
+    def assertIndexed(self, queryset):
+        plan = self.explain(queryset)
+        for step in plan:
+            self.assertNotIn('TEMP B-TREE', step, plan)
+            self.assertIsNone(FULL_SCAN.search(step), plan)
+
+    def pages(self, queryset):
+        """Запросы первой и следующей страницы ленты."""
+        paginator = CursorPaginator(queryset, POSTS_ON_PAGE)
+        cursor = paginator.encode_cursor(self.post)
+        values = paginator.decode_cursor(cursor)
+        return [paginator.object_list,
+                paginator.seek(paginator.object_list, values),
+                paginator.seek(paginator.object_list, values,
+                               forward=False).reverse()]
+
+    def test_feed_queries_use_indexes(self):
+        feeds = {
+            'index': Post.objects.for_list(),
+            'group': self.group.posts.for_list(),
+            'profile': Post.objects.for_list().filter(author=self.author),
+        }
+        for name, queryset in feeds.items():
+            for page in self.pages(queryset):
+                with self.subTest(feed=name, query=str(page.query)):
+                    self.assertIndexed(page[:POSTS_ON_PAGE + 1])
+
+    def test_comment_thread_uses_index(self):
+        comments = (Comment.objects.filter(post=self.post)
+                    .order_by('created', 'id'))
+        self.assertIndexed(comments[:POSTS_ON_PAGE + 1])
+
+    def test_validator_queries_use_indexes(self):
+        """Запросы состояния для ETag — те самые, что выполняют
+        функции из posts/conditional.py."""
+        request = RequestFactory().get('/')
+        states = {
+            'index': (conditional.index_state, ()),
+            'group': (conditional.group_state, (self.group.slug,)),
+            'profile': (conditional.profile_state,
+                        (self.author.username,)),
+            'post': (conditional.post_state,
+                     (self.author.username, self.post.pk)),
+        }
+        for name, (state, args) in states.items():
+            with CaptureQueriesContext(connection) as queries:
+                self.assertIsNotNone(state(request, *args))
+            for query in queries.captured_queries:
+                with self.subTest(state=name, query=query['sql']):
+                    self.assertIndexed(query['sql'])
+
+    def test_media_references_use_index(self):
+        """Сборщик мусора проверяет ссылки на загрузки по индексу"""
+        with CaptureQueriesContext(connection) as queries:
+            media_gc.referenced_uploads(['posts/a.png', 'posts/b.png'])
+        self.assertEqual(len(queries), 1)
+        self.assertIndexed(queries.captured_queries[0]['sql'])
@@ -0,0 +1,162 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connections
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase,
+                         TransactionTestCase, override_settings)
+
+from posts import generations
+from posts.models import Post, User
+from yatube import replicas
+
+REPLICAS = ['replica1', 'replica2']
+
+
+@override_settings(DATABASE_REPLICAS=REPLICAS, REPLICA_PIN_SECONDS=30)
+class ReplicaRouterTest(SimpleTestCase):
+    def setUp(self):
+        self.router = replicas.ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def request(self, view, cookies=None):
+        """Прогоняет view через middleware; возвращает (база чтения, ответ)."""
+        seen = []
+
+        def get_response(request):
+            view()
+            seen.append(self.router.db_for_read(Post))
+            return HttpResponse()
+
+        request = self.factory.get('/')
+        request.COOKIES.update(cookies or {})
+        response = replicas.ReplicaMiddleware(get_response)(request)
+        return seen[0], response
+
+    def test_reads_go_to_replicas_only_in_requests(self):
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+        database, response = self.request(lambda: None)
+        self.assertIn(database, REPLICAS)
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+    def test_writer_is_pinned_to_primary(self):
+        """После записи запрос дочитывает из default и ставит cookie"""
+        database, response = self.request(
+            lambda: self.router.db_for_write(Post))
+        self.assertEqual(database, 'default')
+        cookie = response.cookies[replicas.PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 30)
+        database, response = self.request(
+            lambda: None, {replicas.PIN_COOKIE: '1'})
+        self.assertEqual(database, 'default')
+
+    def test_transactions_read_from_primary(self):
+        def view():
+            with mock.patch.object(connections['default'],
+                                   'in_atomic_block', True):
+                view.database = self.router.db_for_read(Post)
+
+        self.request(view)
+        self.assertEqual(view.database, 'default')
+
+    def test_generations_include_replica_epoch(self):
+        """Эпоха реплик входит в поколение только изменённой области,
+        пока реплики могут не содержать изменение"""
+        scope, other = generations.GLOBAL_SCOPE, generations.author_scope(1)
+
+        def view():
+            view.generations = [generations.get_generation(scope),
+                                generations.get_generation(other)]
+
+        self.request(view)
+        before = view.generations
+        self.assertEqual(before, [generations.get_generation(scope),
+                                  generations.get_generation(other)])
+        generations.bump(scope)
+        primary = generations.get_generation(scope)
+        self.request(view)
+        lagging = view.generations
+        self.assertNotEqual(lagging[0], primary)
+        self.assertEqual(lagging[1], before[1])
+        # копия, снятая одновременно с изменением, его не гарантирует
+        replicas.bump_epoch()
+        self.request(view)
+        self.assertNotIn(view.generations[0], (primary, lagging[0]))
+        replicas.bump_epoch()
+        self.request(view)
+        self.assertEqual(view.generations, [primary, before[1]])
+        # закреплённый за default читает свежие данные: без эпохи
+        generations.bump(scope)
+        self.request(view, {replicas.PIN_COOKIE: '1'})
+        self.assertEqual(view.generations[0],
+                         generations.get_generation(scope))
+
+    def test_no_migrations_on_replicas(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+
+
+class RefreshReplicaTest(TransactionTestCase):
+    # backup API ждёт конца открытой транзакции
+
+    def test_refresh_copies_primary(self):
+        User.objects.create_user(username='ivan')
+        directory = tempfile.mkdtemp()
+        path = os.path.join(directory, 'db.replica1.sqlite3')
+        self.addCleanup(shutil.rmtree, directory)
+        databases = {'replica1': {'NAME': path}}
+        with override_settings(DATABASES=databases):
+            replicas.refresh('replica1')
+        copy = sqlite3.connect(path)
+        try:
+            usernames = copy.execute(
+                'SELECT username FROM auth_user').fetchall()
+        finally:
+            copy.close()
+        self.assertEqual(usernames, [('ivan',)])
+        self.assertEqual(os.listdir(directory), ['db.replica1.sqlite3'])
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+@mock.patch('yatube.replicas.refresh')
+class RefreshReplicasCommandTest(TransactionTestCase):
+    def run_twice(self, between):
+        """Два прохода команды; between выполняется между ними."""
+        def sleep(seconds):
+            if sleep.calls:
+                raise KeyboardInterrupt
+            sleep.calls += 1
+            between()
+
+        sleep.calls = 0
+        with mock.patch('time.sleep', sleep):
+            with self.assertRaises(KeyboardInterrupt):
+                call_command('refresh_replicas', '--interval', '0',
+                             stdout=StringIO())
+
+    def test_unchanged_primary_keeps_epoch(self, refresh):
+        before = replicas.epoch()
+        self.run_twice(lambda: None)
+        self.assertEqual(refresh.call_count, 1)
+        self.assertEqual(replicas.epoch(), before + 1)
+
+    def test_changed_primary_is_copied_again(self, refresh):
+        def write():
+            # запись из другого соединения, как из воркера сайта
+            connection = sqlite3.connect(
+                connections['default'].settings_dict['NAME'], uri=True)
+            try:
+                connection.execute('CREATE TABLE touched (id INTEGER)')
+                connection.commit()
+            finally:
+                connection.close()
+
+        before = replicas.epoch()
+        self.run_twice(write)
+        self.assertEqual(refresh.call_count, 2)
+        self.assertEqual(replicas.epoch(), before + 2)
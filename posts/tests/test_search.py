@@ -0,0 +1,100 @@
+import unittest
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import search
+from posts.models import Post, User
+
+
+@unittest.skipUnless(connection.vendor == 'sqlite',
+                     'FTS5 есть только в SQLite')
+class SearchTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='IvanovI')
+        self.client = Client()
+
+    def tearDown(self):
+        cache.clear()
+
+    def find(self, text, per_page=10, params=None):
+        return search.SearchPaginator(text, per_page).get_page(params or {})
+
+    def test_index_follows_post_changes(self):
+        """Индекс обновляется при создании, изменении и удалении поста"""
+        post = Post.objects.create(text='утренний кофе', author=self.user)
+        self.assertEqual(list(self.find('кофе')), [post])
+        post.text = 'вечерний чай'
+        post.save()
+        self.assertEqual(list(self.find('кофе')), [])
+        self.assertEqual(list(self.find('чай')), [post])
+        post.delete()
+        self.assertEqual(list(self.find('чай')), [])
+
+    def test_prefix_and_all_words(self):
+        """Слова ищутся по префиксу, нужны все слова запроса"""
+        first = Post.objects.create(text='программирование на python',
+                                    author=self.user)
+        Post.objects.create(text='программа передач', author=self.user)
+        self.assertEqual(len(self.find('програм')), 2)
+        self.assertEqual(list(self.find('програм pyth')), [first])
+
+    def test_user_syntax_is_escaped(self):
+        """Операторы FTS5 во вводе не ломают запрос"""
+        Post.objects.create(text='текст', author=self.user)
+        for query in ['"', 'текст AND', 'NEAR(', '*', 'текст OR -']:
+            with self.subTest(query=query):
+                list(self.find(query))
+
+    def test_results_are_ranked(self):
+        """Более релевантные посты идут первыми"""
+        weak = Post.objects.create(text='кот ' + 'слово ' * 30,
+                                   author=self.user)
+        strong = Post.objects.create(text='кот кот кот', author=self.user)
+        self.assertEqual(list(self.find('кот')), [strong, weak])
+
+    def test_pages_by_cursor(self):
+        """Страницы выдачи идут по курсору без повторов и пропусков"""
+        posts = [Post.objects.create(text='кот ' + 'слово ' * i,
+                                     author=self.user) for i in range(5)]
+        first = self.find('кот', per_page=2)
+        second = self.find('кот', 2, {'after': first.next_cursor})
+        third = self.find('кот', 2, {'after': second.next_cursor})
+        found = list(first) + list(second) + list(third)
+        self.assertEqual(found, posts)
+        self.assertFalse(third.has_next())
+        back = self.find('кот', 2, {'before': second.previous_cursor})
+        self.assertEqual(list(back), list(first))
+
+    def test_rebuild_command(self):
+        """Команда перестраивает индекс по существующим постам"""
+        post = Post.objects.create(text='старый пост', author=self.user)
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {search.FTS_TABLE}"
+                           f"({search.FTS_TABLE}) VALUES ('delete-all')")
+        self.assertEqual(list(self.find('старый')), [])
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(list(self.find('старый')), [post])
+
+    def test_search_page(self):
+        """Страница поиска показывает найденные посты"""
+        Post.objects.create(text='найди меня', author=self.user)
+        Post.objects.create(text='другой текст', author=self.user)
+        response = self.client.get(reverse('search'), {'q': 'найди'})
+        self.assertContains(response, 'найди меня')
+        self.assertNotContains(response, 'другой текст')
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке находит посты через индекс"""
+        User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.client.login(username='admin', password='pass')
+        Post.objects.create(text='найди меня', author=self.user)
+        Post.objects.create(text='другой текст', author=self.user)
+        response = self.client.get('/admin/posts/post/', {'q': 'найд'})
+        self.assertContains(response, 'найди меня')
+        self.assertNotContains(response, 'другой текст')
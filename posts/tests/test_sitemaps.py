@@ -0,0 +1,127 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TransactionTestCase
+from django.urls import reverse
+
+from posts import sitemaps, thumbnails
+from posts.bulk import clear_group, delete_posts
+from posts.models import Comment, Group, Post, User
+
+
+@mock.patch('posts.sitemaps.SITEMAP_CHUNK_SIZE', 3)
+class SitemapTest(TransactionTestCase):
+    # поколения частей меняются в transaction.on_commit
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username='ivan')
+        self.posts = [Post.objects.create(text=f'пост {i}',
+                                          author=self.author)
+                      for i in range(7)]
+
+    def chunk_url(self, post):
+        # id постов в тесте начинаются не с 1
+        return reverse('sitemap_chunk', args=[(post.pk - 1) // 3])
+
+    def get(self, url):
+        return self.client.get(url).content.decode()
+
+    def test_index_lists_chunks(self):
+        content = self.get(reverse('sitemap'))
+        last = (self.posts[-1].pk - 1) // 3
+        self.assertEqual(content.count('<sitemap>'), last + 1)
+        self.assertIn(f'http://testserver/sitemap-{last}.xml', content)
+
+    def test_chunk_contains_its_posts(self):
+        post = self.posts[3]
+        content = self.get(self.chunk_url(post))
+        url = reverse('post', args=['ivan', post.pk])
+        self.assertIn(f'<loc>http://testserver{url}</loc>', content)
+        self.assertLessEqual(content.count('<url>'), 3)
+
+    def test_only_touched_chunk_is_rebuilt(self):
+        """Правка поста перестраивает только его часть"""
+        edited, other = self.posts[0], self.posts[-1]
+        for post in (edited, other):
+            self.get(self.chunk_url(post))
+        edited.text = 'правка'
+        edited.save()
+        with self.assertNumQueries(0):
+            self.get(self.chunk_url(other))
+        with self.assertNumQueries(2):
+            # MAX(id) и сама часть
+            self.get(self.chunk_url(edited))
+
+    def test_updates_without_signals_rebuild_chunk(self):
+        """UPDATE поля modified в обход сигналов перестраивает часть"""
+        group = Group.objects.create(title='Группа', slug='group')
+        post = Post.objects.create(text='в группе', author=self.author,
+                                   group=group)
+        changes = {
+            'comment': lambda: Comment.objects.create(
+                post=post, author=self.author, text='комментарий'),
+            'clear_group': lambda: clear_group(
+                Post.objects.filter(pk=post.pk)),
+            'thumbnails': lambda: thumbnails.touch([post.pk]),
+        }
+        for name, change in changes.items():
+            with self.subTest(change=name):
+                self.get(self.chunk_url(post))
+                change()
+                with self.assertNumQueries(2):
+                    self.get(self.chunk_url(post))
+
+    def test_bulk_delete_rebuilds_chunks(self):
+        post = self.posts[-1]
+        url = reverse('post', args=['ivan', post.pk])
+        self.assertIn(url, self.get(self.chunk_url(post)))
+        delete_posts(Post.objects.filter(pk=post.pk))
+        self.assertNotIn(url, self.get(self.chunk_url(post)))
+
+    def test_not_modified_without_queries(self):
+        url = self.chunk_url(self.posts[0])
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+    def test_chunk_after_last_post(self):
+        url = reverse('sitemap_chunk', args=[1000])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_guessed_etag_after_last_post(self):
+        """Условный запрос к несуществующей части получает 404,
+        а не 304"""
+        etag = self.client.get(self.chunk_url(self.posts[0]))['ETag']
+        url = reverse('sitemap_chunk', args=[1000])
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(url, HTTP_IF_NONE_MATCH='*')
+        self.assertEqual(response.status_code, 404)
+
+    def test_concurrent_miss_serves_previous_version(self):
+        """Пока часть перестраивает другой воркер, отдаётся прежняя
+        версия без выборки постов"""
+        post = self.posts[0]
+        url = self.chunk_url(post)
+        previous = self.get(url)
+        post.text = 'правка'
+        post.save()
+        chunk = (post.pk - 1) // 3
+        key = sitemaps._key(RequestFactory().get(url), chunk)
+        cache.add(f'{key}:lock', 1)
+        with self.assertNumQueries(1):
+            # только MAX(id)
+            response = self.client.get(url)
+        self.assertEqual(response.content.decode(), previous)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_author_rename_rebuilds_chunk(self):
+        """Смена имени автора меняет адреса его постов в карте"""
+        url = self.chunk_url(self.posts[0])
+        self.get(url)
+        self.author.username = 'ivan_petrov'
+        self.author.save()
+        self.assertIn(reverse('post', args=['ivan_petrov',
+                                            self.posts[0].pk]),
+                      self.get(url))
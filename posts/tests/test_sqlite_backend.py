@@ -0,0 +1,51 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from django.db import connection
+from django.test import TransactionTestCase
+
+from yatube.sqlite_backend.base import DatabaseWrapper
+
+
+class ProductionBackendTest(TransactionTestCase):
+    # своё соединение с отдельным файлом, в connections не добавляется
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'db.sqlite3')
+        settings_dict = dict(connection.settings_dict, NAME=self.path,
+                             PRAGMAS={'cache_size': -1000})
+        self.database = DatabaseWrapper(settings_dict, alias='production')
+        self.addCleanup(self.database.close)
+
+    def pragma(self, name):
+        with self.database.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas(self):
+        """Новое соединение получает PRAGMA профиля и из настроек"""
+        self.assertEqual(self.pragma('journal_mode'), 'wal')
+        self.assertEqual(self.pragma('synchronous'), 1)
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -1000)
+
+    def test_transaction_takes_write_lock_at_start(self):
+        """Транзакция начинается с BEGIN IMMEDIATE"""
+        with self.database.cursor() as cursor:
+            cursor.execute('CREATE TABLE item (id INTEGER)')
+        other = sqlite3.connect(self.path, timeout=0)
+        self.addCleanup(other.close)
+        # так транзакцию открывает atomic() на SQLite
+        self.database.set_autocommit(
+            False, force_begin_transaction_with_broken_autocommit=True)
+        try:
+            # ничего не записано, но блокировка уже у нас
+            with self.assertRaisesMessage(sqlite3.OperationalError,
+                                          'database is locked'):
+                other.execute('INSERT INTO item VALUES (1)')
+        finally:
+            self.database.rollback()
+            self.database.set_autocommit(True)
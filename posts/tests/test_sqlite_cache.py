@@ -0,0 +1,81 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.test import SimpleTestCase
+
+from yatube.sqlite_cache import SQLiteCache
+
+INCR_PROCESSES, INCR_TIMES = 4, 50
+
+
+def incr_many(location):
+    cache = SQLiteCache(location, {})
+    for _ in range(INCR_TIMES):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_set_get_and_get_many(self):
+        """Значения любых типов читаются по одному и пачкой"""
+        self.cache.set_many({'a': 1, 'b': {'x': [1, 2]}, 'c': 'строка'})
+        self.assertEqual(self.cache.get('b'), {'x': [1, 2]})
+        self.assertEqual(self.cache.get_many(['a', 'c', 'missing']),
+                         {'a': 1, 'c': 'строка'})
+        self.assertEqual(self.cache.get('missing', 'нет'), 'нет')
+
+    def test_timeout_and_add(self):
+        """add не перезаписывает живой ключ, но занимает истёкший"""
+        self.assertTrue(self.cache.add('lock', 1, timeout=0.05))
+        self.assertFalse(self.cache.add('lock', 2))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('lock'))
+        self.assertTrue(self.cache.add('lock', 3))
+        self.assertEqual(self.cache.get('lock'), 3)
+
+    def test_incr_is_atomic_between_processes(self):
+        """incr из нескольких процессов не теряет приращений"""
+        self.cache.set('counter', 0)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        processes = [multiprocessing.Process(target=incr_many,
+                                             args=(self.location,))
+                     for _ in range(INCR_PROCESSES)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'),
+                         INCR_PROCESSES * INCR_TIMES)
+
+    def test_values_are_shared_between_instances(self):
+        """Разные экземпляры (процессы) видят один и тот же кеш"""
+        self.cache.set('shared', 'значение')
+        other = SQLiteCache(self.location, {})
+        self.assertEqual(other.get('shared'), 'значение')
+        other.delete('shared')
+        self.assertFalse(self.cache.has_key('shared'))
+
+    def test_cull_evicts_least_recently_used(self):
+        """При переполнении вытесняются давно не читанные записи"""
+        cache = SQLiteCache(self.location, {
+            'OPTIONS': {'MAX_ENTRIES': 4, 'CULL_FREQUENCY': 2}})
+        cache.CULL_CHECK_PROBABILITY = 0
+        cache.ACCESS_RESOLUTION = 0
+        for i in range(5):
+            cache.set(f'key{i}', i)
+        cache.get('key0')
+        cache._cull()
+        self.assertIn('key0', cache.get_many([f'key{i}' for i in range(5)]))
+        self.assertEqual(len(cache.get_many([f'key{i}'
+                                             for i in range(5)])), 3)
@@ -0,0 +1,174 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+from sorl.thumbnail import default
+from sorl.thumbnail.models import KVStore
+
+from posts import thumbnails
+from posts.models import Post, ThumbnailJob, User
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def uploaded_image(name='photo.png'):
+    content = BytesIO()
+    Image.new('RGB', (40, 20), 'red').save(content, 'PNG')
+    return SimpleUploadedFile(name, content.getvalue(),
+                              content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ThumbnailWorkerTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='IvanovI')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def work(self):
+        call_command('thumbnail_worker', '--once', stdout=StringIO(),
+                     stderr=StringIO())
+
+    def test_upload_enqueues_and_worker_builds(self):
+        """Загрузка ставит задачу, воркер строит миниатюру,
+        до этого на странице заглушка"""
+        self.client.post(reverse('new_post'),
+                         {'text': 'с картинкой', 'image': uploaded_image()})
+        post = Post.objects.get()
+        self.assertTrue(ThumbnailJob.objects.filter(post=post).exists())
+        self.assertIsNone(thumbnails.lookup(post.image, 'card').url)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'Картинка обрабатывается')
+
+        self.work()
+        self.assertFalse(ThumbnailJob.objects.exists())
+        thumbnail = thumbnails.lookup(post.image, 'card')
+        self.assertIsNotNone(thumbnail.url)
+        self.assertEqual((thumbnail.width, thumbnail.height), (960, 339))
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_page_looks_thumbnails_up_in_one_batch(self):
+        """Миниатюры страницы ищутся пачкой, а не по одной"""
+        posts = [Post.objects.create(text=f'пост {i}', author=self.user,
+                                     image=uploaded_image(f'{i}.png'))
+                 for i in range(3)]
+        for post in posts:
+            thumbnails.enqueue(post)
+        self.work()
+        # без карточек и без кеша sorl: get_many и один запрос к БД
+        cache.clear()
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response['X-Thumbnail-Lookups'], '2')
+        for post in posts:
+            self.assertContains(response,
+                                thumbnails.lookup(post.image, 'card').url)
+        # карточки в кеше: к миниатюрам обращаться не нужно
+        response = self.client.get(reverse('index'))
+        self.assertEqual(response['X-Thumbnail-Lookups'], '0')
+
+    def test_card_offers_webp_and_jpeg_variants(self):
+        """Карточка предлагает варианты разной ширины в WebP и JPEG"""
+        post = Post.objects.create(text='текст', author=self.user,
+                                   image=uploaded_image())
+        thumbnails.enqueue(post)
+        self.work()
+        thumbnail = thumbnails.lookup(post.image, 'card')
+        self.assertEqual(set(thumbnail.srcsets),
+                         {'image/webp', 'image/jpeg'})
+        webp = thumbnail.srcsets['image/webp'].split(', ')
+        self.assertEqual([entry.split()[1] for entry in webp],
+                         ['320w', '640w', '960w'])
+        self.assertTrue(all('.webp ' in entry for entry in webp))
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, 'srcset="%s"' % thumbnail.srcsets[
+            'image/webp'])
+        self.assertContains(response, 'type="image/webp"')
+
+    def test_backfill_command(self):
+        """Команда строит варианты для уже загруженных картинок"""
+        post = Post.objects.create(text='текст', author=self.user,
+                                   image=uploaded_image())
+        modified = post.modified
+        call_command('build_image_variants', '--workers', '1',
+                     stdout=StringIO())
+        thumbnail = thumbnails.lookup(post.image, 'card')
+        self.assertIsNotNone(thumbnail.url)
+        self.assertEqual(len(thumbnail.srcsets), 2)
+        post.refresh_from_db()
+        self.assertGreater(post.modified, modified)
+
+    def test_edit_without_new_image_does_not_enqueue(self):
+        """Правка текста без новой картинки не ставит задачу"""
+        post = Post.objects.create(text='текст', author=self.user,
+                                   image=uploaded_image())
+        ThumbnailJob.objects.all().delete()
+        edit = reverse('post_edit', args=[self.user.username, post.pk])
+        self.client.post(edit, {'text': 'новый текст'})
+        self.assertFalse(ThumbnailJob.objects.exists())
+        self.client.post(edit, {'text': 'текст',
+                                'image': uploaded_image('other.png')})
+        self.assertTrue(ThumbnailJob.objects.filter(post=post).exists())
+
+    def test_image_saved_outside_forms_is_enqueued(self):
+        """Картинка, сохранённая не через формы сайта (админка, API),
+        тоже ставит задачу"""
+        post = Post.objects.create(text='текст', author=self.user,
+                                   image=uploaded_image())
+        self.assertTrue(ThumbnailJob.objects.filter(post=post).exists())
+        ThumbnailJob.objects.all().delete()
+        post.text = 'новый текст'
+        post.save()
+        self.assertFalse(ThumbnailJob.objects.exists())
+        post.image = uploaded_image('other.png')
+        post.save()
+        self.assertTrue(ThumbnailJob.objects.filter(post=post).exists())
+
+    def test_lookup_miss_does_not_hide_built_thumbnail(self):
+        """Промах поиска не затирает в кеше миниатюру, которую воркер
+        записал между чтением таблицы sorl и записью в кеш"""
+        post = Post.objects.create(text='текст', author=self.user,
+                                   image=uploaded_image())
+        self.work()
+        url = thumbnails.lookup(post.image, 'card').url
+        kvstore = default.kvstore
+        # поиск прочитал кеш и таблицу до того, как воркер их заполнил
+        with mock.patch.object(kvstore.cache, 'get_many', return_value={}), \
+                mock.patch.object(KVStore.objects, 'filter',
+                                  return_value=KVStore.objects.none()):
+            self.assertIsNone(thumbnails.lookup(post.image, 'card').url)
+        self.assertEqual(thumbnails.lookup(post.image, 'card').url, url)
+
+    def test_claimed_job_is_not_taken_twice(self):
+        """Заблокированную задачу не забирает второй воркер"""
+        post = Post.objects.create(text='текст', author=self.user,
+                                   image=uploaded_image())
+        thumbnails.enqueue(post)
+        self.assertIsNotNone(thumbnails.claim())
+        self.assertIsNone(thumbnails.claim())
+
+    def test_broken_image_does_not_stop_worker(self):
+        """Битая картинка не валит воркер, задача снимается"""
+        post = Post.objects.create(
+            text='текст', author=self.user,
+            image=SimpleUploadedFile('bad.png', b'not an image'))
+        thumbnails.enqueue(post)
+        with self.assertLogs('sorl.thumbnail', level='ERROR'):
+            self.work()
+        self.assertFalse(ThumbnailJob.objects.exists())
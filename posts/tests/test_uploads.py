@@ -0,0 +1,106 @@
+import shutil
+import tempfile
+from io import BytesIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from PIL import Image, ImageFile
+
+from posts.models import Post, User
+from posts.settings import IMAGE_MAX_SIDE
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def jpeg(size, exif=False, name='photo.jpg'):
+    content = BytesIO()
+    image = Image.new('RGB', size, 'green')
+    options = {}
+    if exif:
+        data = image.getexif()
+        data[0x010F] = 'Camera maker'
+        options['exif'] = data.tobytes()
+    image.save(content, 'JPEG', **options)
+    return SimpleUploadedFile(name, content.getvalue(),
+                              content_type='image/jpeg')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class ImageUploadTest(TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='IvanovI')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def tearDown(self):
+        cache.clear()
+
+    def upload(self, image):
+        return self.client.post(reverse('new_post'),
+                                {'text': 'картинка', 'image': image})
+
+    def test_small_image_is_kept_as_is(self):
+        """Картинка в пределах сохраняется без пересжатия"""
+        image = jpeg((100, 50))
+        self.upload(image)
+        image.seek(0)
+        self.assertEqual(Post.objects.get().image.read(), image.read())
+
+    def test_large_image_is_reduced_and_stripped(self):
+        """Большая картинка уменьшается, EXIF не сохраняется"""
+        self.upload(jpeg((IMAGE_MAX_SIDE * 2, IMAGE_MAX_SIDE), exif=True))
+        post = Post.objects.get()
+        with Image.open(post.image.path) as image:
+            self.assertEqual(image.size, (IMAGE_MAX_SIDE,
+                                          IMAGE_MAX_SIDE // 2))
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_exif_is_stripped_from_small_image(self):
+        """EXIF удаляется и у картинок в пределах размера"""
+        self.upload(jpeg((100, 50), exif=True))
+        with Image.open(Post.objects.get().image.path) as image:
+            self.assertEqual(len(image.getexif()), 0)
+
+    def test_too_many_bytes(self):
+        """Слишком большой файл обрывается при приёме"""
+        with mock.patch('posts.uploads.IMAGE_UPLOAD_MAX_BYTES', 100):
+            response = self.upload(jpeg((100, 50)))
+        self.assertFormError(response, 'form', 'image',
+                             'Файл больше 0 МБ')
+        self.assertFalse(Post.objects.exists())
+
+    def test_too_many_pixels(self):
+        """Картинка больше предела пикселей не декодируется"""
+        image = jpeg((100, 50))
+        with mock.patch('posts.uploads.IMAGE_MAX_PIXELS', 4000), \
+                mock.patch.object(ImageFile.ImageFile, 'load') as load:
+            response = self.upload(image)
+        self.assertTrue(response.context['form'].has_error(
+            'image', 'too_many_pixels'))
+        load.assert_not_called()
+        self.assertFalse(Post.objects.exists())
+
+    def test_transparent_image_fits_stored_limit(self):
+        """Прозрачная картинка тоже уменьшается до предела байтов"""
+        content = BytesIO()
+        Image.effect_noise((400, 400), 100).convert('RGBA').save(
+            content, 'PNG')
+        image = SimpleUploadedFile('noise.png', content.getvalue(),
+                                   content_type='image/png')
+        limit = content.tell() // 4
+        with mock.patch('posts.uploads.IMAGE_MAX_STORED_BYTES', limit):
+            self.upload(image)
+        post = Post.objects.get()
+        self.assertLessEqual(post.image.size, limit)
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.mode, 'RGBA')
+            self.assertLess(stored.size[0], 400)
@@ -2,12 +2,15 @@ import shutil
 import tempfile
 
 from django.conf import settings
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Group, Post, User
-from posts.settings import POSTS_ON_PAGE
+from posts.models import Comment, Group, Post, User
+from posts.settings import COMMENTS_ON_PAGE, POSTS_ON_PAGE
 
 HOME_PAGE, NEW_POST = reverse('index'), reverse('new_post')
 
@@ -138,3 +141,114 @@ class PaginatorViewsTest(TestCase):
                 response = self.guest_client.get(url)
                 len_list = len(response.context.get('page').object_list)
                 self.assertEqual(len_list, length)
+
+
+class ListQueriesTest(TestCase):
+    def setUp(self):
+        self.guest_client = Client()
+        self.group = Group.objects.create(title="Тест-название",
+                                          slug='test_slug',
+                                          description="Тест-описание")
+        self.author = User.objects.create_user(username='test_user')
+        self.add_posts(2)
+        self.urls = [
+            HOME_PAGE,
+            reverse('group_posts', args=[self.group.slug]),
+            reverse('profile', args=[self.author.username]),
+        ]
+
+    def add_posts(self, count):
+        for i in range(count):
+            post = Post.objects.create(text="Ж" * i,
+                                       group=self.group,
+                                       author=self.author)
+            Comment.objects.create(post=post, author=self.author,
+                                   text='комментарий')
+
+    def count_queries(self, url):
+        # поколения в TestCase не меняются (нет коммита):
+        # считаем запросы промаха закешированного фрагмента
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.guest_client.get(url)
+        return len(queries)
+
+    def test_query_count_does_not_depend_on_posts_count(self):
+        """Число запросов ленты не зависит от числа постов на странице"""
+        before = {url: self.count_queries(url) for url in self.urls}
+        self.add_posts(POSTS_ON_PAGE)
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.count_queries(url), before[url])
+
+    def test_post_page_uses_fixed_queries(self):
+        """Страница поста загружает пост, автора и группу одним
+        запросом, первую страницу комментариев с авторами — вторым
+        (ещё один — проверка ETag)"""
+        post = Post.objects.first()
+        url = reverse('post', args=[self.author.username, post.id])
+        for _ in range(COMMENTS_ON_PAGE):
+            Comment.objects.create(post=post, author=self.author,
+                                   text='комментарий')
+        with self.assertNumQueries(3):
+            response = self.guest_client.get(url)
+        self.assertEqual(response.context['post'].comments_count,
+                         COMMENTS_ON_PAGE + 1)
+        self.assertEqual(len(response.context['page']), COMMENTS_ON_PAGE)
+        self.assertTrue(response.context['page'].has_next())
+
+
+class CommentThreadTest(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username='test_user')
+        self.post = Post.objects.create(text='текст', author=self.author)
+        self.comments = [
+            Comment.objects.create(post=self.post, author=self.author,
+                                   text=f'комментарий {i}')
+            for i in range(COMMENTS_ON_PAGE * 2 + 1)
+        ]
+        self.url = reverse('post', args=[self.author.username,
+                                         self.post.id])
+
+    def test_comments_are_loaded_in_order_by_cursor(self):
+        """Порции комментариев идут по порядку, без пропусков"""
+        response = self.client.get(self.url)
+        loaded = list(response.context['page'])
+        page = response.context['page']
+        while page.has_next():
+            response = self.client.get(
+                reverse('post_comments',
+                        args=[self.author.username, self.post.id])
+                + '?' + page.next_query)
+            page = response.context['page']
+            loaded.extend(page)
+        self.assertEqual(loaded, self.comments)
+        self.assertNotContains(response, '<html')
+
+    def test_comments_fragment_unknown_post(self):
+        url = reverse('post_comments', args=[self.author.username, 999])
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_comment_form_on_post_page(self):
+        """Форма комментария есть только у авторизованного"""
+        add_url = reverse('add_comment', args=[self.author.username,
+                                               self.post.id])
+        self.assertNotContains(self.client.get(self.url),
+                               f'action="{add_url}"')
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(self.url),
+                            f'action="{add_url}"')
+
+    def test_invalid_comment_renders_post_page(self):
+        """Пустой комментарий возвращает страницу поста с ошибкой,
+        GET на адрес формы ведёт на страницу поста"""
+        add_url = reverse('add_comment', args=[self.author.username,
+                                               self.post.id])
+        self.client.force_login(self.author)
+        response = self.client.post(add_url, {'text': ''})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['form'].errors)
+        self.assertContains(response, f'action="{add_url}"')
+        self.assertEqual(list(response.context['page']),
+                         self.comments[:COMMENTS_ON_PAGE])
+        self.assertRedirects(self.client.get(add_url), self.url)
@@ -0,0 +1,273 @@
+"""Миниатюры картинок постов.
+
+Тег {% thumbnail %} строит миниатюру при первом показе: первый запрос
+ждёт Pillow, а параллельные запросы режут одну картинку одновременно.
+Здесь миниатюры строит фоновый процесс (manage.py thumbnail_worker)
+по очереди ThumbnailJob, которую пополняет сигнал post_save поста
+при новой картинке (сайт, админка, API).
+Шаблоны только ищут готовую миниатюру в хранилище ключей sorl и,
+пока её нет, показывают заглушку того же размера.
+
+Для страницы постов миниатюры ищутся пачкой (prefetch): один
+get_many к кешу и один запрос к таблице sorl для промахов вместо
+отдельного обращения на каждую картинку. Число обращений за запрос
+отдаёт заголовок X-Thumbnail-Lookups (ThumbnailLookupsMiddleware).
+
+Для миниатюр из RESPONSIVE_IMAGES строятся ещё варианты нескольких
+ширин в WebP и JPEG, из которых карточка собирает srcset.
+"""
+from collections import namedtuple
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as default_settings
+from sorl.thumbnail.conf import settings as thumbnail_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores import cached_db_kvstore
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.models import KVStore as KVStoreModel
+from sorl.thumbnail.parsers import parse_geometry
+
+from . import generations, sitemaps
+from .models import Post, ThumbnailJob
+from .settings import (RESPONSIVE_IMAGES, THUMBNAIL_JOB_ATTEMPTS,
+                       THUMBNAIL_JOB_LOCK, THUMBNAILS)
+
+# url=None — миниатюры ещё нет, нужна заглушка width x height;
+# srcsets — {MIME-тип: строка srcset} из готовых вариантов
+Thumbnail = namedtuple("Thumbnail", "url width height srcsets sizes")
+
+MIME_TYPES = {"WEBP": "image/webp", "JPEG": "image/jpeg"}
+
+
+def _geometries():
+    """Все миниатюры для построения: имя или (имя, ширина, формат)
+    -> (геометрия, параметры)."""
+    geometries = dict(THUMBNAILS)
+    for name, responsive in RESPONSIVE_IMAGES.items():
+        geometry, options = THUMBNAILS[name]
+        width, height = parse_geometry(geometry)
+        for variant_width in responsive["widths"]:
+            variant_height = round(height * variant_width / width)
+            for image_format in responsive["formats"]:
+                geometries[name, variant_width, image_format] = (
+                    f"{variant_width}x{variant_height}",
+                    dict(options, format=image_format))
+    return geometries
+
+
+GEOMETRIES = _geometries()
+
+
+def _options(source, options):
+    """Параметры миниатюры так же, как их дополняет get_thumbnail().
+
+    От них зависит имя файла миниатюры, поэтому без точного
+    совпадения поиск не найдёт построенную воркером миниатюру.
+    """
+    backend = default.backend
+    options = dict(options)
+    if thumbnail_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(thumbnail_settings, attr)
+        if value != getattr(default_settings, attr):
+            options.setdefault(key, value)
+    return options
+
+
+def placeholder(name):
+    geometry = THUMBNAILS[name][0]
+    width, height = parse_geometry(geometry)
+    return Thumbnail(None, width, height or width, {}, None)
+
+
+def _filename(image, name):
+    geometry, options = GEOMETRIES[name]
+    source = ImageFile(image)
+    return default.backend._get_thumbnail_filename(
+        source, geometry, _options(source, options))
+
+
+def _kv_key(image, name):
+    """Ключ миниатюры в хранилище ключей sorl (без обращения к нему)."""
+    return add_prefix(ImageFile(_filename(image, name), default.storage).key)
+
+
+def thumbnail_names(image):
+    """Имена файлов всех миниатюр картинки, построенных или нет."""
+    return {_filename(image, name) for name in GEOMETRIES}
+
+
+# обращения к хранилищу миниатюр за текущий запрос
+_lookups = ContextVar("thumbnail_lookups", default=0)
+
+
+def reset_lookups():
+    _lookups.set(0)
+
+
+def lookups():
+    return _lookups.get()
+
+
+def _count(calls=1):
+    _lookups.set(_lookups.get() + calls)
+
+
+def _fetch(keys):
+    """{ключ: миниатюра} для ключей, у которых миниатюра уже есть.
+
+    С хранилищем cached_db (по умолчанию) это один get_many к кешу
+    и, если есть промахи, один запрос к таблице sorl; промахи, как
+    и в самом sorl, запоминаются в кеше пустым значением.
+
+    Пустое значение кладётся через add: воркер мог построить
+    миниатюру между нашим запросом и записью в кеш, и его значение
+    перезаписывать нельзя.
+    """
+    kvstore, empty = default.kvstore, cached_db_kvstore.EMPTY_VALUE
+    if isinstance(kvstore, cached_db_kvstore.KVStore):
+        values = kvstore.cache.get_many(keys)
+        _count()
+        missing = [key for key in keys if key not in values]
+        if missing:
+            rows = dict(KVStoreModel.objects.filter(key__in=missing)
+                        .values_list("key", "value"))
+            _count()
+            timeout = thumbnail_settings.THUMBNAIL_CACHE_TIMEOUT
+            kvstore.cache.set_many(rows, timeout)
+            for key in missing:
+                if key not in rows:
+                    kvstore.cache.add(key, empty, timeout)
+            values.update(rows)
+    else:
+        values = {key: kvstore._get_raw(key) for key in keys}
+        _count(len(keys))
+    return {key: deserialize_image_file(value)
+            for key, value in values.items()
+            if value and value != empty}
+
+
+def _keys(image):
+    return {name: _kv_key(image, name) for name in GEOMETRIES}
+
+
+def _thumbnail(found, keys, name):
+    thumbnail = found.get(keys[name])
+    if thumbnail is None:
+        return placeholder(name)
+    responsive = RESPONSIVE_IMAGES.get(name)
+    if responsive is None:
+        return Thumbnail(thumbnail.url, thumbnail.width, thumbnail.height,
+                         {}, None)
+    srcsets = {}
+    for image_format in responsive["formats"]:
+        variants = [found.get(keys[name, width, image_format])
+                    for width in responsive["widths"]]
+        srcset = ", ".join(f"{variant.url} {variant.width}w"
+                           for variant in variants if variant)
+        if srcset:
+            srcsets[MIME_TYPES[image_format]] = srcset
+    return Thumbnail(thumbnail.url, thumbnail.width, thumbnail.height,
+                     srcsets, responsive["sizes"])
+
+
+def lookup(image, name):
+    """Готовая миниатюра картинки или заглушка; ничего не строит."""
+    keys = _keys(image)
+    return _thumbnail(_fetch(list(set(keys.values()))), keys, name)
+
+
+def prefetch(posts):
+    """Находит миниатюры всех постов страницы одной пачкой.
+
+    Результат кладётся в post.thumbnails ({имя: Thumbnail}),
+    откуда его берёт тег {% post_thumbnail %}.
+    """
+    keys = {post.pk: _keys(post.image) for post in posts if post.image}
+    found = _fetch(list({key for post_keys in keys.values()
+                         for key in post_keys.values()})) if keys else {}
+    for post in posts:
+        if post.image:
+            post.thumbnails = {name: _thumbnail(found, keys[post.pk], name)
+                               for name in THUMBNAILS}
+
+
+def build(image):
+    """Строит все миниатюры и их варианты (вызывается воркером)."""
+    for geometry, options in GEOMETRIES.values():
+        get_thumbnail(image, geometry, **options)
+
+
+def touch(post_ids):
+    """Обновляет карточки постов, у которых появились миниатюры.
+
+    В закешированной карточке стоит заглушка: новое modified
+    даёт карточке новый ключ, поколения — новым фрагментам.
+    """
+    posts = Post.objects.filter(pk__in=post_ids)
+    scopes = set()
+    for author_id, group_id in posts.values_list("author_id", "group_id"):
+        scopes.update(generations.post_scopes(author_id, group_id))
+    posts.update(modified=timezone.now())
+    generations.bump(*scopes)
+    sitemaps.bump_posts(post_ids)
+
+
+def enqueue(post):
+    """Ставит в очередь построение миниатюр картинки поста."""
+    if not post.image:
+        return
+    ThumbnailJob.objects.update_or_create(
+        post=post, defaults={"queued": timezone.now(),
+                             "locked_until": None, "attempts": 0})
+
+
+def claim():
+    """Забирает свободную задачу или возвращает None.
+
+    Задача блокируется на THUMBNAIL_JOB_LOCK секунд условным UPDATE,
+    поэтому воркеров может быть несколько.
+    """
+    now = timezone.now()
+    free = (ThumbnailJob.objects
+            .filter(Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+            .order_by("pk"))
+    for job in free[:10]:
+        locked_until = now + timedelta(seconds=THUMBNAIL_JOB_LOCK)
+        claimed = (ThumbnailJob.objects
+                   .filter(pk=job.pk, locked_until=job.locked_until)
+                   .update(locked_until=locked_until,
+                           attempts=job.attempts + 1))
+        if claimed:
+            job.locked_until = locked_until
+            job.attempts += 1
+            return job
+    return None
+
+
+def process(job):
+    """Строит миниатюры по задаче и снимает её.
+
+    При ошибке задача остаётся заблокированной до конца
+    THUMBNAIL_JOB_LOCK и потом повторяется, но не больше
+    THUMBNAIL_JOB_ATTEMPTS раз.
+    """
+    done = ThumbnailJob.objects.filter(pk=job.pk, queued=job.queued)
+    post = Post.objects.filter(pk=job.post_id).first()
+    try:
+        if post is not None and post.image:
+            build(post.image)
+    except Exception:
+        if job.attempts >= THUMBNAIL_JOB_ATTEMPTS:
+            done.delete()
+        raise
+    done.delete()
+    if post is not None:
+        touch([post.pk])
@@ -0,0 +1,111 @@
+"""Персональная лента подписок.
+
+Новый пост копируется в ленты подписчиков автора пачками
+(fan-out on write). Посты авторов с очень большим числом подписчиков
+не копируются: их посты подмешиваются в ленту при чтении.
+"""
+from .models import AuthorStats, Follow, Post, TimelineEntry
+from .paginator import CursorPaginator
+from .settings import (FANOUT_BATCH_SIZE, FANOUT_FOLLOWERS_LIMIT,
+                       FOLLOW_BACKFILL_POSTS)
+
+
+def is_fanned_out(author_id):
+    """Раскладываются ли посты автора по лентам подписчиков."""
+    followers = (AuthorStats.objects.filter(user_id=author_id)
+                 .values_list("followers_count", flat=True).first())
+    return (followers or 0) < FANOUT_FOLLOWERS_LIMIT
+
+
+def _entries(owner_ids, post):
+    return [TimelineEntry(owner_id=owner_id, post_id=post.pk,
+                          author_id=post.author_id, pub_date=post.pub_date)
+            for owner_id in owner_ids]
+
+
+def fan_out(post):
+    """Добавляет пост в ленты всех подписчиков автора."""
+    fan_out_posts(post.author_id, [post])
+
+
+def fan_out_posts(author_id, posts):
+    """Добавляет посты одного автора в ленты его подписчиков."""
+    if not is_fanned_out(author_id):
+        return
+    followers = (Follow.objects.filter(author_id=author_id)
+                 .order_by("user_id").values_list("user_id", flat=True))
+    # в одной пачке не больше FANOUT_BATCH_SIZE записей ленты
+    size = max(FANOUT_BATCH_SIZE // len(posts), 1)
+    last = 0
+    while True:
+        batch = list(followers.filter(user_id__gt=last)[:size])
+        if not batch:
+            return
+        TimelineEntry.objects.bulk_create(
+            [entry for post in posts for entry in _entries(batch, post)],
+            ignore_conflicts=True)
+        last = batch[-1]
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту нового подписчика последние посты автора."""
+    if not is_fanned_out(author_id):
+        return
+    posts = (Post.objects.filter(author_id=author_id)
+             .order_by("-pub_date", "-id")
+             .only("pk", "author_id", "pub_date")[:FOLLOW_BACKFILL_POSTS])
+    TimelineEntry.objects.bulk_create(
+        [entry for post in posts for entry in _entries([user_id], post)],
+        ignore_conflicts=True)
+
+
+def remove(user_id, author_id):
+    """Убирает из ленты посты автора после отписки."""
+    TimelineEntry.objects.filter(owner_id=user_id,
+                                 author_id=author_id).delete()
+
+
+class FeedPaginator(CursorPaginator):
+    """Курсорный паджинатор ленты подписок.
+
+    Страница берётся диапазоном из TimelineEntry и сливается
+    с постами авторов, чьи посты не раскладываются по лентам.
+    На страницу уходит не больше трёх запросов.
+    """
+
+    def __init__(self, user, per_page):
+        entries = (TimelineEntry.objects.filter(owner=user)
+                   .select_related("post__author", "post__group"))
+        super().__init__(entries, per_page, ordering=("-pub_date", "-post"))
+        pulled = list(
+            Follow.objects.filter(
+                user=user,
+                author__stats__followers_count__gte=FANOUT_FOLLOWERS_LIMIT)
+            .values_list("author_id", flat=True))
+        self.pulled = None
+        if pulled:
+            self.pulled = (Post.objects.for_list()
+                           .filter(author_id__in=pulled)
+                           .order_by("-pub_date", "-id"))
+
+    def _field_value(self, obj, field):
+        # на странице лежат посты, а курсор строится по полям ленты
+        return super()._field_value(obj, "id" if field == "post" else field)
+
+    def fetch(self, values, forward, limit):
+        posts = [entry.post for entry in
+                 super().fetch(values, forward, limit)]
+        if self.pulled is None:
+            return posts
+        pulled = self.pulled
+        if values is not None:
+            pulled = self.seek(pulled, values, forward,
+                               fields=("pub_date", "id"))
+        if not forward:
+            pulled = pulled.reverse()
+        merged = {post.pk: post for post in posts}
+        merged.update((post.pk, post) for post in pulled[:limit])
+        ordered = sorted(merged.values(),
+                         key=lambda post: (post.pub_date, post.pk),
+                         reverse=self.descending)
+        return ordered[:limit] if forward else ordered[-limit:]
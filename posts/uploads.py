@@ -0,0 +1,142 @@
+"""Приём и подготовка картинок постов с ограниченной памятью.
+
+Загрузка пишется на диск кусками (TemporaryFileUploadHandler), а
+UploadSizeLimitHandler прерывает слишком большие файлы прямо во время
+приёма. Размер картинки в пикселях читается из заголовка, до
+декодирования. Большие картинки уменьшаются: JPEG — через draft(),
+когда декодер сразу отдаёт картинку в 1/2–1/8 размера, остальные —
+через reduce(). Если и сжатый файл больше IMAGE_MAX_STORED_BYTES,
+картинка, прозрачная или нет, уменьшается дальше. При пересжатии
+метаданные (EXIF) не сохраняются.
+Картинки, которые и так укладываются в пределы, остаются как есть.
+"""
+import os
+from io import BytesIO
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import InMemoryUploadedFile, UploadedFile
+from django.core.files.uploadhandler import FileUploadHandler
+from PIL import Image, ImageOps
+
+from .settings import (IMAGE_MAX_PIXELS, IMAGE_MAX_SIDE,
+                       IMAGE_MAX_STORED_BYTES, IMAGE_UPLOAD_MAX_BYTES)
+
+# ступени качества JPEG при подгонке под IMAGE_MAX_STORED_BYTES
+JPEG_QUALITIES = (85, 75, 65, 55)
+# во сколько раз уменьшать стороны, если и худшее качество не укладывается
+SHRINK_STEP = 0.75
+
+
+class OversizedUpload(UploadedFile):
+    """Файл, приём которого прерван: больше IMAGE_UPLOAD_MAX_BYTES."""
+
+    def __init__(self, name, content_type):
+        super().__init__(BytesIO(), name, content_type, 0)
+
+
+class UploadSizeLimitHandler(FileUploadHandler):
+    """Первый обработчик загрузки: считает принятые байты файла.
+
+    Когда файл превышает предел, остальные его куски дальше не
+    передаются, а вместо файла форма получает OversizedUpload.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.received = 0
+
+    def receive_data_chunk(self, raw_data, start):
+        self.received += len(raw_data)
+        if self.received > IMAGE_UPLOAD_MAX_BYTES:
+            return None
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.received > IMAGE_UPLOAD_MAX_BYTES:
+            return OversizedUpload(self.file_name, self.content_type)
+        return None
+
+
+def _has_metadata(image):
+    return bool(image.info.get("exif") or image.getexif())
+
+
+def _save(image, keep_alpha):
+    """Один проход сжатия: PNG для прозрачных, иначе JPEG с понижением
+    качества, пока файл больше IMAGE_MAX_STORED_BYTES."""
+    content = BytesIO()
+    if keep_alpha:
+        image.save(content, "PNG", optimize=True)
+        return content
+    for quality in JPEG_QUALITIES:
+        content = BytesIO()
+        image.save(content, "JPEG", quality=quality, optimize=True,
+                   progressive=True)
+        if content.tell() <= IMAGE_MAX_STORED_BYTES:
+            break
+    return content
+
+
+def _encode(image, keep_alpha):
+    """Сжимает картинку; если файл всё равно больше
+    IMAGE_MAX_STORED_BYTES, уменьшает её стороны на SHRINK_STEP."""
+    if not keep_alpha:
+        image = image.convert("RGB")
+    content = _save(image, keep_alpha)
+    while (content.tell() > IMAGE_MAX_STORED_BYTES
+           and max(image.size) > 1):
+        width, height = image.size
+        image = image.resize((max(1, round(width * SHRINK_STEP)),
+                              max(1, round(height * SHRINK_STEP))),
+                             Image.LANCZOS)
+        content = _save(image, keep_alpha)
+    return content, "png" if keep_alpha else "jpeg"
+
+
+def prepare_image(upload):
+    """Проверяет загруженную картинку и при необходимости пересжимает.
+
+    Возвращает исходный файл или новый, уменьшенный и без EXIF.
+    """
+    if isinstance(upload, OversizedUpload):
+        raise ValidationError(
+            f"Файл больше {IMAGE_UPLOAD_MAX_BYTES // 1024 // 1024} МБ",
+            code="file_too_large")
+    upload.seek(0)
+    # open() читает только заголовок: размер известен до декодирования
+    image = Image.open(upload)
+    width, height = image.size
+    if width * height > IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            f"Картинка больше {IMAGE_MAX_PIXELS // 1_000_000} мегапикселей",
+            code="too_many_pixels")
+    if (max(width, height) <= IMAGE_MAX_SIDE
+            and upload.size <= IMAGE_MAX_STORED_BYTES
+            and not _has_metadata(image)):
+        upload.seek(0)
+        return upload
+    keep_alpha = (image.mode in ("RGBA", "LA")
+                  or "transparency" in image.info)
+    if image.format == "JPEG":
+        image.draft("RGB", (IMAGE_MAX_SIDE, IMAGE_MAX_SIDE))
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail((IMAGE_MAX_SIDE, IMAGE_MAX_SIDE), reducing_gap=2.0)
+    content, subtype = _encode(image, keep_alpha)
+    stem = os.path.splitext(os.path.basename(upload.name))[0]
+    extension = "jpg" if subtype == "jpeg" else subtype
+    upload.close()
+    return InMemoryUploadedFile(content, None, f"{stem}.{extension}",
+                                f"image/{subtype}", content.tell(), None)
+
+
+class PostImageField(forms.ImageField):
+    """ImageField, который прогоняет новую загрузку через prepare_image."""
+
+    def to_python(self, data):
+        if isinstance(data, OversizedUpload):
+            return prepare_image(data)
+        upload = super().to_python(data)
+        if upload is None:
+            return None
+        return prepare_image(upload)
@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import feeds, views
 
 urlpatterns = [
     path("404/", views.page_not_found),
@@ -8,13 +8,31 @@ urlpatterns = [
     path('new/', views.new_post, name="new_post"),
     path('group/<slug:slug>/', views.group_posts,
          name="group_posts"),
+    path("group/<slug:slug>/export/", views.group_export,
+         name="group_export"),
+    path("group/<slug:slug>/rss/", feeds.group_rss, name="group_rss"),
+    path("group/<slug:slug>/atom/", feeds.group_atom, name="group_atom"),
+    path("rss/", feeds.posts_rss, name="posts_rss"),
+    path("atom/", feeds.posts_atom, name="posts_atom"),
+    path("follow/", views.follow_index, name="follow_index"),
+    path("search/", views.search, name="search"),
     path('<str:username>/', views.profile, name='profile'),
+    path("<str:username>/rss/", feeds.author_rss, name="author_rss"),
+    path("<str:username>/atom/", feeds.author_atom, name="author_atom"),
+    path("<str:username>/export/", views.profile_export,
+         name="profile_export"),
+    path("<str:username>/follow/", views.profile_follow,
+         name="profile_follow"),
+    path("<str:username>/unfollow/", views.profile_unfollow,
+         name="profile_unfollow"),
     # Просмотр записи
     path('<str:username>/<int:post_id>/edit/',
          views.post_edit, name='post_edit'),
     # Профайл пользователя
     path('<str:username>/<int:post_id>/', views.post_view,
          name='post'),
+    path("<str:username>/<int:post_id>/comments/", views.post_comments,
+         name="post_comments"),
     path('<username>/<int:post_id>/comment/', views.add_comment, name="add_comment"),
     path("", views.index, name="index"),
 ]
@@ -1,12 +1,18 @@
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.http import Http404, QueryDict, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
+from django.utils.functional import SimpleLazyObject
 from django.utils.translation import gettext_lazy as _
 from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
 
+from . import conditional, export
 from .forms import PostForm, CommentForm
-from .models import Group, Post, User
-from .settings import POSTS_ON_PAGE, POSTS_ON_PROFILE_PAGE
+from .models import Comment, Follow, Group, Post, User
+from .paginator import CursorPaginator, cursor_params
+from .search import search_paginator
+from .timeline import FeedPaginator
+from .settings import COMMENTS_ON_PAGE, POSTS_ON_PAGE, POSTS_ON_PROFILE_PAGE
 
 NEW_POST_SUBMIT_TITLE = _("Добавить запись")
 NEW_POST_SUBMIT_BUTTON = _("Добавить")
@@ -14,27 +20,65 @@ EDIT_POST_SUBMIT_TITLE = _("Изменить запись")
 EDIT_POST_SUBMIT_BUTTON = _("Сохранить")
 
 
+@conditional.conditional_page(conditional.index_state)
 def index(request):
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = Post.objects.for_list()
+    paginator = CursorPaginator(post_list, POSTS_ON_PAGE)
+    params = cursor_params(request.GET)
+    # страницу выбирает только перестроение фрагмента в index.html
+    page = SimpleLazyObject(lambda: paginator.get_page(params))
     return render(
         request,
         'index.html',
-        {'page': page, }
+        {'page': page, 'page_key': paginator.cursor_key(params)}
     )
 
 
+@conditional.conditional_page(conditional.group_state)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.all()
-    paginator = Paginator(post_list, POSTS_ON_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    post_list = group.posts.for_list()
+    paginator = CursorPaginator(post_list, POSTS_ON_PAGE)
+    page = paginator.get_page(request.GET)
     return render(request, "group.html", {"group": group, "page": page})
 
 
+def _export_response(request, queryset, name):
+    """Потоковая выгрузка: ?format=jsonl|csv, ?gzip=1 — сжать."""
+    file_format = request.GET.get("format", "jsonl")
+    if file_format not in export.FORMATS:
+        raise Http404
+    compress = request.GET.get("gzip") == "1"
+    name = export.filename(name, file_format, compress)
+    response = StreamingHttpResponse(
+        export.stream(queryset, file_format, compress),
+        content_type=("application/gzip" if compress
+                      else export.FORMATS[file_format]))
+    response["Content-Disposition"] = f'attachment; filename="{name}"'
+    return response
+
+
+@login_required
+def group_export(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return _export_response(request, group.posts.all(), f"group-{slug}")
+
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    return _export_response(request, author.posts.all(), f"user-{username}")
+
+
+def search(request):
+    query = request.GET.get("q", "").strip()
+    page = None
+    if query:
+        paginator = search_paginator(query, POSTS_ON_PAGE)
+        page = paginator.get_page(request.GET)
+    return render(request, "search.html", {"query": query, "page": page})
+
+
 @login_required
 def new_post(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -49,21 +93,47 @@ def new_post(request):
     return redirect("index")
 
 
+@conditional.conditional_page(conditional.profile_state)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author)
-    paginator = Paginator(posts, POSTS_ON_PROFILE_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    author = get_object_or_404(User.objects.select_related("stats"),
+                               username=username)
+    posts = Post.objects.for_list().filter(author=author)
+    paginator = CursorPaginator(posts, POSTS_ON_PROFILE_PAGE)
+    page = paginator.get_page(request.GET)
+    following = (request.user.is_authenticated and Follow.objects.filter(
+        user=request.user, author=author).exists())
 
     return render(request, 'profile.html', {'author': author,
-                                            'page': page})
+                                            'page': page,
+                                            'following': following})
 
 
+@conditional.conditional_page(conditional.post_state)
 def post_view(request, username, post_id):
-    post = Post.objects.get(id=post_id)
+    post = get_object_or_404(Post.objects.for_list(), id=post_id,
+                             author__username=username)
     author = post.author
-    return render(request, 'post.html', {'post': post, 'author': author})
+    page = _comments_page(post, QueryDict())
+    form = CommentForm() if request.user.is_authenticated else None
+    return render(request, 'post.html', {'post': post, 'author': author,
+                                         'page': page, 'form': form})
+
+
+def _comments_page(post, params):
+    # по индексу comment_post_created, без OFFSET и COUNT(*)
+    comments = Comment.objects.filter(post=post).select_related("author")
+    paginator = CursorPaginator(comments, COMMENTS_ON_PAGE,
+                                ordering=("created", "id"))
+    return paginator.get_page(params)
+
+
+@conditional.conditional_page(conditional.post_state)
+def post_comments(request, username, post_id):
+    """Следующая порция комментариев поста (фрагмент HTML)."""
+    post = get_object_or_404(Post.objects.select_related("author"),
+                             id=post_id, author__username=username)
+    page = _comments_page(post, request.GET)
+    return render(request, "comment_list.html", {"post": post, "page": page})
 
 
 @login_required
@@ -84,11 +154,17 @@ def post_edit(request, username, post_id):
 
 @login_required
 def add_comment(request, username, post_id):
-    post = get_object_or_404(Post, author__username=username, id=post_id)
-    form = CommentForm(request.POST or None)
+    post = get_object_or_404(Post.objects.for_list(),
+                             author__username=username, id=post_id)
+    if request.method != "POST":
+        # форма комментария живёт на странице поста
+        return redirect('post', username=username, post_id=post_id)
+    form = CommentForm(request.POST)
     if not form.is_valid():
-        return render(request,
-                      "comments.html", {"form": form})
+        page = _comments_page(post, QueryDict())
+        return render(request, 'post.html', {'post': post,
+                                             'author': post.author,
+                                             'page': page, 'form': form})
     comment = form.save(commit=False)
     comment.author = request.user
     comment.post = post
@@ -96,6 +172,33 @@ def add_comment(request, username, post_id):
     return redirect('post', username=username, post_id=post_id)
 
 
+@login_required
+def follow_index(request):
+    paginator = FeedPaginator(request.user, POSTS_ON_PAGE)
+    page = paginator.get_page(request.GET)
+    return render(request, "follow.html", {"page": page})
+
+
+@login_required
+@require_POST
+def profile_follow(request, username):
+    author = get_object_or_404(User, username=username)
+    if author != request.user:
+        Follow.objects.get_or_create(user=request.user, author=author)
+    return redirect("profile", username=username)
+
+
+@login_required
+@require_POST
+def profile_unfollow(request, username):
+    follow = Follow.objects.filter(user=request.user,
+                                   author__username=username).first()
+    if follow is not None:
+        # удаляем через объект, чтобы сработали сигналы счётчиков
+        follow.delete()
+    return redirect("profile", username=username)
+
+
 def page_not_found(request, exception):
     # Переменная exception содержит отладочную информацию,
     # выводить её в шаблон пользователской страницы 404 мы не станем
@@ -0,0 +1,160 @@
+"""Отдача загруженных файлов (MEDIA).
+
+Файлы сохраняются под именами с хешем содержимого
+(posts/photo.3f2a9c1b7e4d.jpg), поэтому по одному адресу всегда лежат
+одни и те же байты и ответ можно кешировать навсегда
+(Cache-Control: immutable). Миниатюры sorl в cache/ тоже неизменны:
+их имена — хеш имени исходника и параметров.
+
+serve_media проверяет путь и отдаёт сам файл веб-серверу:
+
+* MEDIA_ACCEL = "nginx" — заголовок X-Accel-Redirect на internal
+  location MEDIA_ACCEL_PREFIX;
+* MEDIA_ACCEL = "sendfile" — заголовок X-Sendfile (Apache, lighttpd);
+* иначе (локальный запуск) файл читает Django, с поддержкой Range.
+"""
+import hashlib
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.http import (FileResponse, Http404, HttpResponse,
+                         HttpResponseNotModified, StreamingHttpResponse)
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+HASH_LENGTH = 12
+HASHED_NAME = re.compile(r"\.[0-9a-f]{%d}\.\w+$" % HASH_LENGTH)
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+# файлы со старыми именами без хеша могут быть заменены
+MUTABLE = "public, max-age=3600"
+
+
+class HashedFileSystemStorage(FileSystemStorage):
+    """Хранилище, добавляющее к имени файла хеш его содержимого.
+
+    Повторная загрузка тех же байтов не создаёт второй файл.
+    """
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        stem, extension = os.path.splitext(filename)
+        suffix = f".{digest.hexdigest()[:HASH_LENGTH]}{extension.lower()}"
+        if max_length is not None:
+            # обрезаем основу имени, а не хеш
+            room = max_length - len(directory) - len(suffix) - 1
+            stem = stem[:max(room, 1)]
+        name = os.path.join(directory, stem + suffix)
+        if self.exists(name):
+            # свежее время изменения защищает файл от сборщика мусора
+            # (manage.py collect_media_garbage) на время его грейс-периода
+            os.utime(self.path(name))
+            return name
+        return super().save(name, content, max_length)
+
+
+def is_immutable(name):
+    thumbnail_prefix = getattr(settings, "THUMBNAIL_PREFIX", "cache/")
+    return bool(HASHED_NAME.search(name)) or name.startswith(thumbnail_prefix)
+
+
+def _byte_range(header, size):
+    """(начало, конец включительно) из заголовка Range или None.
+
+    Поддерживается один диапазон; ValueError — диапазон за файлом.
+    """
+    match = RANGE.match(header or "")
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if start == "":
+        # bytes=-N — последние N байт
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start = int(start)
+        end = min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read(path, start, length):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _file_response(request, path, stat, content_type):
+    try:
+        byte_range = _byte_range(request.META.get("HTTP_RANGE"),
+                                 stat.st_size)
+    except ValueError:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{stat.st_size}"
+        return response
+    if byte_range is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read(path, start, end - start + 1), status=206,
+            content_type=content_type)
+        response["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+        response["Content-Length"] = end - start + 1
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+def serve_media(request, path):
+    """Отдаёт файл из MEDIA_ROOT, по возможности силами веб-сервера."""
+    try:
+        full_path = safe_join(settings.MEDIA_ROOT, path)
+    except SuspiciousFileOperation:
+        # путь выходит за MEDIA_ROOT
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    if not was_modified_since(request.META.get("HTTP_IF_MODIFIED_SINCE"),
+                              stat.st_mtime, stat.st_size):
+        return HttpResponseNotModified()
+    content_type, encoding = mimetypes.guess_type(full_path)
+    content_type = content_type or "application/octet-stream"
+    accel = getattr(settings, "MEDIA_ACCEL", None)
+    if accel == "nginx":
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = quote(
+            settings.MEDIA_ACCEL_PREFIX + path)
+    elif accel == "sendfile":
+        response = HttpResponse(content_type=content_type)
+        response["X-Sendfile"] = full_path
+    else:
+        response = _file_response(request, full_path, stat, content_type)
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    response["Cache-Control"] = (IMMUTABLE if is_immutable(path)
+                                 else MUTABLE)
+    return response
@@ -0,0 +1,160 @@
+"""Чтение с реплик базы данных.
+
+ReplicaRouter отправляет запись в основную базу (default), а чтение —
+на одну из реплик DATABASE_REPLICAS, но только внутри HTTP-запроса,
+который прошёл через ReplicaMiddleware. Команды manage.py, воркеры
+и сигналы внутри транзакций читают из основной базы: им нужны
+свежие данные.
+
+Реплика отстаёт от основной базы, поэтому пользователь, который
+только что что-то записал, закрепляется за основной базой на
+REPLICA_PIN_SECONDS: middleware ставит ему cookie, и пока она
+жива, все его запросы читают из default. Запрос, в котором уже была
+запись, тоже дочитывает из default.
+
+Локально реплики — копии db.sqlite3, которые периодически
+обновляет manage.py refresh_replicas (DB_REPLICAS=2 в окружении).
+
+Кеши под поколениями (posts/generations.py) хранятся без срока, а
+поколение меняется сразу после коммита — раньше, чем запись дойдёт
+до реплики. Поэтому у копий реплик есть эпоха: refresh_replicas
+увеличивает её после каждого обновления, а middleware запоминает
+эпоху в начале запроса, который читает с реплик. Поколение области,
+изменённой после последних обновлений реплик, включает эту эпоху
+в ключи: фрагмент, собранный по отстающей реплике, живёт только до
+следующего обновления. Остальные области от эпохи не зависят, и их
+кеши обновление реплик не сбрасывает.
+"""
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = "primary_pin"
+EPOCH_KEY = "replicas:epoch"
+
+# можно ли читать с реплик: только в запросах через middleware
+_use_replicas = ContextVar("use_replicas", default=False)
+# была ли в этом запросе запись
+_wrote = ContextVar("wrote", default=False)
+# эпоха реплик на начало запроса, который читает с реплик
+_epoch = ContextVar("replica_epoch", default=None)
+
+
+def replicas():
+    return list(getattr(settings, "DATABASE_REPLICAS", []))
+
+
+def epoch():
+    """Номер текущих копий реплик."""
+    value = cache.get(EPOCH_KEY)
+    if value is None:
+        # как у поколений: после вытеснения не совпадёт с прежними
+        cache.add(EPOCH_KEY, int(time.time() * 1000), timeout=None)
+        value = cache.get(EPOCH_KEY)
+    return value
+
+
+def bump_epoch():
+    try:
+        cache.incr(EPOCH_KEY)
+    except ValueError:
+        cache.add(EPOCH_KEY, int(time.time() * 1000), timeout=None)
+
+
+def read_epoch():
+    """Эпоха реплик, с которых может читать текущий запрос, или None."""
+    return _epoch.get()
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        aliases = replicas()
+        if (not aliases or not _use_replicas.get() or _wrote.get()
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(aliases)
+
+    def db_for_write(self, model, **hints):
+        _wrote.set(True)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # схему реплики получают вместе с копией основной базы
+        return db not in replicas()
+
+
+class ReplicaMiddleware:
+    """Разрешает чтение с реплик и закрепляет писавших за default."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned = PIN_COOKIE in request.COOKIES
+        replicas_token = _use_replicas.set(not pinned)
+        wrote_token = _wrote.set(False)
+        # эпоха берётся до первого чтения: данные запроса не старше её
+        epoch_token = _epoch.set(
+            epoch() if replicas() and not pinned else None)
+        try:
+            response = self.get_response(request)
+            wrote = _wrote.get()
+        finally:
+            _use_replicas.reset(replicas_token)
+            _wrote.reset(wrote_token)
+            _epoch.reset(epoch_token)
+        if wrote and replicas():
+            response.set_cookie(PIN_COOKIE, "1",
+                                max_age=settings.REPLICA_PIN_SECONDS,
+                                httponly=True, samesite="Lax")
+        return response
+
+
+def primary_version():
+    """PRAGMA data_version основной базы: меняется, когда в неё
+    записывают другие соединения."""
+    with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+        cursor.execute("PRAGMA data_version")
+        return cursor.fetchone()[0]
+
+
+def refresh(alias):
+    """Заменяет файл реплики свежей копией основной базы.
+
+    Копия делается через backup API SQLite в соседний временный файл
+    и подменяется атомарно: открытые соединения дочитывают старую
+    копию, новые открывают новую.
+    """
+    path = settings.DATABASES[alias]["NAME"]
+    primary = connections[DEFAULT_DB_ALIAS]
+    primary.ensure_connection()
+    descriptor, temporary = tempfile.mkstemp(
+        dir=os.path.dirname(path) or ".", suffix=".sqlite3")
+    os.close(descriptor)
+    try:
+        copy = sqlite3.connect(temporary)
+        try:
+            primary.connection.backup(copy)
+            # без WAL у копии нет файлов -wal/-shm, которые пришлось
+            # бы подменять вместе с ней
+            copy.execute("PRAGMA journal_mode=DELETE")
+        finally:
+            copy.close()
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
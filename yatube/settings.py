@@ -50,12 +50,14 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'yatube.replicas.ReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'posts.middleware.ThumbnailLookupsMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -87,10 +89,38 @@ WSGI_APPLICATION = 'yatube.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'NAME': os.environ.get('DB_PATH',
+                               os.path.join(BASE_DIR, 'db.sqlite3')),
     }
 }
 
+# Профиль для нескольких воркеров gunicorn: DB_PROFILE=production —
+# WAL и другие PRAGMA, BEGIN IMMEDIATE (yatube/sqlite_backend)
+# и постоянные соединения. Сравнение: manage.py benchmark_db
+if os.environ.get('DB_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'ENGINE': 'yatube.sqlite_backend',
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+    })
+
+# Реплики для чтения: DB_REPLICAS=2 добавит replica1 и replica2 —
+# копии db.sqlite3, которые обновляет manage.py refresh_replicas.
+# Маршруты запросов — yatube/replicas.py
+DATABASE_REPLICAS = []
+for number in range(1, int(os.environ.get('DB_REPLICAS', '0')) + 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['yatube.replicas.ReplicaRouter']
+# сколько секунд после записи пользователь читает из основной базы;
+# должно быть больше периода обновления реплик
+REPLICA_PIN_SECONDS = int(os.environ.get('DB_REPLICA_PIN_SECONDS', '30'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -132,8 +162,24 @@ STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, "static")
 
 # Media
+# Загрузки сразу пишутся на диск кусками; слишком большие файлы
+# обрываются во время приёма, см. posts/uploads.py
+FILE_UPLOAD_HANDLERS = [
+    'posts.uploads.UploadSizeLimitHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+# Имена загруженных файлов содержат хеш содержимого, см. yatube/media.py
+DEFAULT_FILE_STORAGE = 'yatube.media.HashedFileSystemStorage'
+# sorl сохраняет миниатюры под заранее вычисленными именами
+THUMBNAIL_STORAGE = 'django.core.files.storage.FileSystemStorage'
+# Кто отдаёт байты файлов: "nginx" (X-Accel-Redirect), "sendfile"
+# (X-Sendfile) или пусто — сам Django (для локального запуска)
+MEDIA_ACCEL = os.environ.get('MEDIA_ACCEL', '')
+# internal location nginx с alias на MEDIA_ROOT
+MEDIA_ACCEL_PREFIX = '/protected-media/'
 # Login
 
 LOGIN_URL = "/auth/login/"
@@ -154,8 +200,17 @@ EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
 # Подключение бэкенда кеширования
+# Кеш в файле SQLite общий для всех воркеров на машине:
+# поколения кеша и карточки постов видны каждому процессу
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.sqlite_cache.SQLiteCache',
+        'LOCATION': os.path.join(BASE_DIR, 'cache.sqlite3'),
+        'OPTIONS': {
+            'MAX_ENTRIES': 100000,
+        },
     }
 }
+
+# Тесты работают с кешем во временном файле, а не с cache.sqlite3
+TEST_RUNNER = 'yatube.testing.TemporaryCacheRunner'
@@ -0,0 +1,40 @@
+"""SQLite для нескольких процессов-воркеров (DB_PROFILE=production).
+
+От стандартного бэкенда django.db.backends.sqlite3 отличается двумя
+вещами:
+
+* каждое новое соединение получает PRAGMA из DEFAULT_PRAGMAS (их
+  можно переопределить ключом PRAGMAS в DATABASES): журнал WAL,
+  чтобы чтения не ждали запись, synchronous=NORMAL — fsync только
+  на контрольных точках WAL, ожидание блокировки busy_timeout,
+  mmap и кеш страниц;
+* транзакции (atomic) начинаются с BEGIN IMMEDIATE. Транзакция,
+  начатая обычным BEGIN, берёт блокировку на запись только при
+  первой записи, и если другой процесс успел записать раньше,
+  SQLite сразу возвращает «database is locked», не дожидаясь
+  busy_timeout. С IMMEDIATE воркеры ждут очереди в начале
+  транзакции.
+"""
+from django.db.backends.sqlite3 import base
+
+DEFAULT_PRAGMAS = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "busy_timeout": 5000,
+    "mmap_size": 256 * 1024 * 1024,
+    # отрицательное значение — размер в килобайтах
+    "cache_size": -64000,
+    "temp_store": "MEMORY",
+}
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        connection = super().get_new_connection(conn_params)
+        pragmas = {**DEFAULT_PRAGMAS, **self.settings_dict.get("PRAGMAS", {})}
+        for name, value in pragmas.items():
+            connection.execute(f"PRAGMA {name}={value}")
+        return connection
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute("BEGIN IMMEDIATE")
@@ -0,0 +1,244 @@
+"""Кеш в файле SQLite, общий для всех процессов на машине.
+
+В отличие от LocMemCache, у всех воркеров gunicorn один и тот же кеш:
+инвалидация видна сразу всем, а память не дублируется. Файл открыт
+в режиме WAL, поэтому чтения не блокируют запись.
+
+Настройка::
+
+    CACHES = {
+        "default": {
+            "BACKEND": "yatube.sqlite_cache.SQLiteCache",
+            "LOCATION": "/path/to/cache.sqlite3",
+            "OPTIONS": {"MAX_ENTRIES": 100000},
+        }
+    }
+
+Целые числа хранятся как INTEGER, поэтому incr() выполняется
+одним UPDATE и атомарен между процессами. Вытесняются давно не
+читанные записи (LRU); время чтения обновляется не чаще раза в
+ACCESS_RESOLUTION секунд, чтобы чтения не превращались в записи.
+"""
+import os
+import pickle
+import random
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+# SQLite ограничивает число параметров в одном запросе
+MAX_VARIABLES = 900
+
+
+class SQLiteCache(BaseCache):
+    ACCESS_RESOLUTION = 60
+    # доля записей, после которых проверяется размер кеша
+    CULL_CHECK_PROBABILITY = 0.02
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location
+        options = params.get("OPTIONS", {})
+        self._busy_timeout = options.get("BUSY_TIMEOUT", 5)
+        self._local = threading.local()
+
+    # соединения
+
+    def _connection(self):
+        # после fork соединение родителя использовать нельзя
+        pid = os.getpid()
+        if getattr(self._local, "pid", None) != pid:
+            connection = sqlite3.connect(self._path,
+                                         timeout=self._busy_timeout,
+                                         isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, value BLOB NOT NULL, "
+                "expires REAL, accessed REAL NOT NULL)")
+            connection.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed "
+                "ON cache (accessed)")
+            self._local.connection = connection
+            self._local.pid = pid
+        return self._local.connection
+
+    def _write(self, sql, params=(), many=False):
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if many:
+                cursor = connection.executemany(sql, params)
+            else:
+                cursor = connection.execute(sql, params)
+            rowcount = cursor.rowcount
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if random.random() < self.CULL_CHECK_PROBABILITY:
+            self._cull()
+        return rowcount
+
+    # сериализация
+
+    @staticmethod
+    def _dumps(value):
+        # bool — подкласс int, но incr к нему неприменим
+        if type(value) is int and -2 ** 63 <= value < 2 ** 63:
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _loads(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _expires(self, timeout):
+        return self.get_backend_timeout(timeout)
+
+    # чтение
+
+    def _fetch(self, keys):
+        """Возвращает {ключ: значение} для живых ключей."""
+        connection = self._connection()
+        now = time.time()
+        found, stale = {}, []
+        for start in range(0, len(keys), MAX_VARIABLES):
+            chunk = keys[start:start + MAX_VARIABLES]
+            placeholders = ",".join("?" * len(chunk))
+            rows = connection.execute(
+                "SELECT key, value, expires, accessed FROM cache "
+                f"WHERE key IN ({placeholders})", chunk)
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = self._loads(value)
+                if accessed < now - self.ACCESS_RESOLUTION:
+                    stale.append((now, key))
+        if stale:
+            self._write("UPDATE cache SET accessed = ? WHERE key = ?",
+                        stale, many=True)
+        return found
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        return self._fetch([key]).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        found = self._fetch(list(keys))
+        return {keys[key]: value for key, value in found.items()}
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._fetch([key])
+
+    # запись
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        expires, now = self._expires(timeout), time.time()
+        rows = [(self._key(key, version), self._dumps(value), expires, now)
+                for key, value in data.items()]
+        self._write(
+            "INSERT INTO cache (key, value, expires, accessed) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+            "value = excluded.value, expires = excluded.expires, "
+            "accessed = excluded.accessed", rows, many=True)
+        return []
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        now = time.time()
+        # одна команда: запись появляется, только если ключа нет
+        # или он истёк, — это и делает add() пригодным для блокировок
+        return self._write(
+            "INSERT INTO cache (key, value, expires, accessed) "
+            "VALUES (?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+            "value = excluded.value, expires = excluded.expires, "
+            "accessed = excluded.accessed "
+            "WHERE cache.expires IS NOT NULL AND cache.expires <= ?",
+            (self._key(key, version), self._dumps(value),
+             self._expires(timeout), now, now)) > 0
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._write(
+            "UPDATE cache SET expires = ? WHERE key = ? "
+            "AND (expires IS NULL OR expires > ?)",
+            (self._expires(timeout), self._key(key, version),
+             time.time())) > 0
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            updated = connection.execute(
+                "UPDATE cache SET value = value + ? WHERE key = ? "
+                "AND typeof(value) = 'integer' "
+                "AND (expires IS NULL OR expires > ?)",
+                (delta, key, time.time())).rowcount
+            value = None
+            if updated:
+                value = connection.execute(
+                    "SELECT value FROM cache WHERE key = ?",
+                    (key,)).fetchone()[0]
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if not updated:
+            raise ValueError(f"Key '{key}' not found")
+        return value
+
+    def delete(self, key, version=None):
+        return self._write("DELETE FROM cache WHERE key = ?",
+                           (self._key(key, version),)) > 0
+
+    def delete_many(self, keys, version=None):
+        self._write("DELETE FROM cache WHERE key = ?",
+                    [(self._key(key, version),) for key in keys],
+                    many=True)
+
+    def clear(self):
+        self._write("DELETE FROM cache")
+
+    def close(self, **kwargs):
+        # соединение живёт столько же, сколько поток воркера
+        pass
+
+    # вытеснение
+
+    def _cull(self):
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "DELETE FROM cache WHERE expires IS NOT NULL "
+                "AND expires <= ?", (now,))
+            count = connection.execute(
+                "SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count > self._max_entries:
+                # как и LocMemCache, удаляем долю 1/CULL_FREQUENCY
+                # (0 — всё), начиная с давно не читанных записей
+                limit = (count // self._cull_frequency
+                         if self._cull_frequency else count)
+                connection.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache "
+                    "ORDER BY accessed LIMIT ?)", (limit,))
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
@@ -0,0 +1,43 @@
+"""Окружение тестов.
+
+Кеш по умолчанию — файл cache.sqlite3 в каталоге проекта, а тесты
+очищают кеш и заполняют его своими фрагментами. Чтобы не трогать
+кеш разработчика, на время тестов он переносится во временный файл:
+для manage.py test — через TEST_RUNNER, для pytest — фикстурой
+из conftest.py.
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+@contextmanager
+def temporary_cache():
+    """Настройки CACHES с файлами кешей во временном каталоге."""
+    directory = tempfile.mkdtemp()
+    caches = {
+        alias: dict(options,
+                    LOCATION=os.path.join(directory, f"{alias}.sqlite3"))
+        for alias, options in settings.CACHES.items()
+    }
+    try:
+        with override_settings(CACHES=caches):
+            yield
+    finally:
+        shutil.rmtree(directory)
+
+
+class TemporaryCacheRunner(DiscoverRunner):
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache = temporary_cache()
+        self._cache.__enter__()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache.__exit__(None, None, None)
+        super().teardown_test_environment(**kwargs)
@@ -19,6 +19,9 @@ from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from posts import sitemaps
+from yatube.media import serve_media
+
 handler404 = "posts.views.page_not_found" # noqa
 handler500 = "posts.views.server_error" # noqa
 
@@ -31,15 +34,20 @@ urlpatterns = [
     path("auth/", include("django.contrib.auth.urls")),
     #  раздел администратора
     path("admin/", admin.site.urls),
+    #  загруженные файлы: проверки здесь, байты отдаёт веб-сервер
+    path(settings.MEDIA_URL.lstrip("/") + "<path:path>", serve_media,
+         name="media"),
+    #  карта сайта: индекс и части по диапазонам id постов
+    path("sitemap.xml", sitemaps.index, name="sitemap"),
+    path("sitemap-<int:chunk>.xml", sitemaps.chunk, name="sitemap_chunk"),
+    #  JSON API только для чтения
+    path("api/v1/", include("posts.api_urls")),
     #  обработчик для главной страницы ищем в urls.py приложения posts
     path("", include("posts.urls")),
 ]
 
 # Этот код будет работать, когда сайт в режиме отладки.
-# Он позволяет обращаться файлам в директории, указанной в
-# MEDIA_ROOT по имени, через префикс MEDIA_URL.
+# Он позволяет обращаться к статическим файлам через префикс STATIC_URL.
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL,
-                          document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL,
                           document_root=settings.STATIC_ROOT)